@@ -7,6 +7,9 @@ Module for managing Android applications (install, uninstall, backup and restore
 
 import os
 import re
+import gzip
+import json
+import time
 import subprocess
 import questionary
 from rich.console import Console
@@ -14,10 +17,70 @@ from rich.panel import Panel
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
 from utils import logger
 from utils import ui_helper
+from utils import adb_helper
+from commands import device_check
 
 console = Console()
 log = logger.setup_logger()
 
+# Bulk package actions: label, pm command, reverse action and the output marking success
+BULK_ACTIONS = {
+    "uninstall": {
+        "label": "Uninstall",
+        "command": "pm uninstall",
+        "undo": None,
+        "success": "Success"
+    },
+    "debloat": {
+        "label": "Uninstall for user 0 (debloat)",
+        "command": "pm uninstall --user 0",
+        "undo": "restore",
+        "success": "Success"
+    },
+    "disable": {
+        "label": "Disable",
+        "command": "pm disable-user --user 0",
+        "undo": "enable",
+        "success": "new state: disabled"
+    },
+    "enable": {
+        "label": "Enable",
+        "command": "pm enable",
+        "undo": "disable",
+        "success": "new state: enabled"
+    },
+    "restore": {
+        "label": "Restore debloated package",
+        "command": "cmd package install-existing",
+        "undo": "debloat",
+        "success": "installed for user"
+    },
+    "clear": {
+        "label": "Clear app data (pm clear)",
+        "command": "pm clear",
+        "undo": None,
+        "success": "Success"
+    }
+}
+
+# Number of packages sent to the device in one remote script
+BULK_CHUNK_SIZE = 50
+
+# App data folders skipped by data backups (rebuilt by the app itself)
+DATA_BACKUP_EXCLUDES = ["cache", "code_cache"]
+
+# Read/write size when streaming data archives
+STREAM_CHUNK_SIZE = 256 * 1024
+
+# Device-side prefix for the exit status and stderr of streamed tar commands
+TRANSFER_STATUS_PREFIX = "/data/local/tmp/adb_toolbox_transfer"
+
+# Seconds a per-device storage breakdown stays valid
+STORAGE_CACHE_TTL = 300
+
+# Storage breakdown per device: {serial: (timestamp, {package: sizes})}
+_storage_cache = {}
+
 def run_adb_command(command):
     """
     Run ADB command and return result
@@ -29,7 +92,7 @@ def run_adb_command(command):
         str: Command result
     """
     try:
-        result = subprocess.run(
+        result = adb_helper.run_process(
             command,
             capture_output=True,
             text=True,
@@ -40,31 +103,183 @@ def run_adb_command(command):
         console.print(f"[bold red]Error running command: {e}[/bold red]")
         return None
 
-def get_installed_apps():
+def list_package_lines(serial=None, include_system=False, flags=None):
     """
-    Get list of installed applications
+    Run "pm list packages" and return its package lines without the "package:" prefix
     
+    Args:
+        serial (str, optional): Device serial
+        include_system (bool): Also list system packages
+        flags (list, optional): Extra pm flags (e.g. ["--show-versioncode", "-U"])
+        
     Returns:
-        list: List of package names
+        list: Package lines
     """
-    result = run_adb_command(["adb", "shell", "pm", "list", "packages", "-3"])
+    command = adb_helper.adb_base(serial) + ["shell", "pm", "list", "packages"] + (flags or [])
+    if not include_system:
+        command.append("-3")
+    result = run_adb_command(command)
     
     if not result:
         return []
         
-    packages = []
+    lines = []
     for line in result.strip().split('\n'):
         if line.startswith("package:"):
-            packages.append(line[8:])  # Remove "package:" prefix
+            lines.append(line[8:].strip())  # Remove "package:" prefix
             
-    return packages
+    return lines
+
+def get_installed_apps(serial=None, include_system=False):
+    """
+    Get list of installed applications
+    
+    Args:
+        serial (str, optional): Device serial
+        include_system (bool): Also list system packages
+        
+    Returns:
+        list: List of package names
+    """
+    return list_package_lines(serial, include_system)
+
+def get_package_index(serial=None, include_system=False):
+    """
+    Get installed packages with version code and uid in one pm call
+    
+    Args:
+        serial (str, optional): Device serial
+        include_system (bool): Also list system packages
+        
+    Returns:
+        dict: {package: {"version_code": str, "uid": int or None}}
+    """
+    index = {}
+    for line in list_package_lines(serial, include_system, ["--show-versioncode", "-U"]):
+        parts = line.split()
+        entry = {"version_code": None, "uid": None}
+        for part in parts[1:]:
+            if part.startswith("versionCode:"):
+                entry["version_code"] = part[len("versionCode:"):]
+            elif part.startswith("uid:"):
+                uid = part[len("uid:"):].split(",")[0]
+                entry["uid"] = int(uid) if uid.isdigit() else None
+        index[parts[0]] = entry
+    return index
+
+def format_size(size):
+    """
+    Format a byte count for display
+    
+    Args:
+        size (int): Size in bytes
+        
+    Returns:
+        str: Human readable size
+    """
+    for unit in ["B", "KB", "MB"]:
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} GB"
+
+def parse_diskstats(output):
+    """
+    Parse per-package sizes from "dumpsys diskstats" output
+    
+    Args:
+        output (str): Output of dumpsys diskstats
+        
+    Returns:
+        dict: {package: {"app": bytes, "data": bytes, "cache": bytes}}
+    """
+    fields = {}
+    for line in (output or "").splitlines():
+        if ":" not in line:
+            continue
+        name, value = line.split(":", 1)
+        if name.strip() in ("Package Names", "App Sizes", "App Data Sizes", "Cache Sizes"):
+            try:
+                fields[name.strip()] = json.loads(value.strip())
+            except ValueError:
+                return {}
+                
+    names = fields.get("Package Names")
+    if not names:
+        return {}
+        
+    sizes = {}
+    for i, package in enumerate(names):
+        sizes[package] = {
+            "app": fields.get("App Sizes", [])[i] if i < len(fields.get("App Sizes", [])) else 0,
+            "data": fields.get("App Data Sizes", [])[i] if i < len(fields.get("App Data Sizes", [])) else 0,
+            "cache": fields.get("Cache Sizes", [])[i] if i < len(fields.get("Cache Sizes", [])) else 0
+        }
+    return sizes
+
+def get_storage_with_du(packages, serial=None):
+    """
+    Measure package sizes with du (fallback when diskstats has no package data, needs root)
+    
+    Args:
+        packages (list): Package names
+        serial (str, optional): Device serial
+        
+    Returns:
+        dict: {package: {"app": bytes, "data": bytes, "cache": bytes}}
+    """
+    script = "\n".join(
+        f"p={adb_helper.quote(package)}; "
+        "a=$(dirname \"$(pm path $p | head -n 1 | cut -d: -f2)\"); "
+        "echo \"$p $(du -sk $a 2>/dev/null | cut -f1) $(du -sk /data/data/$p 2>/dev/null | cut -f1) "
+        "$(du -sk /data/data/$p/cache 2>/dev/null | cut -f1)\""
+        for package in packages
+    )
+    output = adb_helper.run_shell_script(script, serial=serial, as_root=True)
+    
+    sizes = {}
+    for line in (output or "").splitlines():
+        parts = line.split()
+        if len(parts) != 4 or not all(p.isdigit() for p in parts[1:]):
+            continue
+        app, data, cache = (int(p) * 1024 for p in parts[1:])
+        # du on /data/data includes the cache folder
+        sizes[parts[0]] = {"app": app, "data": max(data - cache, 0), "cache": cache}
+    return sizes
+
+def get_app_storage(serial=None, refresh=False):
+    """
+    Get app, data and cache sizes of all packages from a single dumpsys diskstats call
+    
+    Results are cached per device for STORAGE_CACHE_TTL seconds.
+    
+    Args:
+        serial (str, optional): Device serial
+        refresh (bool): Ignore the cached breakdown
+        
+    Returns:
+        dict: {package: {"app": bytes, "data": bytes, "cache": bytes}}
+    """
+    cached = _storage_cache.get(serial)
+    if cached and not refresh and time.time() - cached[0] < STORAGE_CACHE_TTL:
+        return cached[1]
+        
+    result = adb_helper.run_adb(["shell", "dumpsys", "diskstats"], serial=serial)
+    sizes = parse_diskstats(result.stdout if result else "")
+    
+    if not sizes:
+        sizes = get_storage_with_du(get_installed_apps(serial), serial=serial)
+        
+    _storage_cache[serial] = (time.time(), sizes)
+    return sizes
 
-def get_app_info(package):
+def get_app_info(package, serial=None):
     """
     Get detailed information about an application
     
     Args:
         package (str): Package name
+        serial (str, optional): Device serial
         
     Returns:
         dict: Application information
@@ -76,24 +291,32 @@ def get_app_info(package):
         "path": "Unknown"
     }
     
-    # Get app name
-    result = run_adb_command(["adb", "shell", "dumpsys", "package", package, "|", "grep", "versionName"])
-    if result:
-        match = re.search(r"versionName=([^\s]+)", result)
-        if match:
-            info["version"] = match.group(1)
+    # Version, label and APK path in one adb call on the selected device
+    quoted = adb_helper.quote(package)
+    blocks = adb_helper.parse_marked_output(adb_helper.run_shell_script(
+        f"echo @@package\ndumpsys package {quoted} | grep -E 'versionName|applicationInfo'\n"
+        f"echo @@path\npm path {quoted}\n",
+        serial=serial
+    ))
+    
+    # Get version
+    match = re.search(r"versionName=([^\s]+)", blocks.get("package", ""))
+    if match:
+        info["version"] = match.group(1)
     
     # Get APK path
-    result = run_adb_command(["adb", "shell", "pm", "path", package])
-    if result and result.startswith("package:"):
-        info["path"] = result[8:].strip()
+    paths = blocks.get("path", "").strip().splitlines()
+    if paths and paths[0].startswith("package:"):
+        info["path"] = paths[0][8:].strip()
     
     # Get display name
-    result = run_adb_command(["adb", "shell", "dumpsys", "package", package, "|", "grep", "applicationInfo"])
-    if result:
-        match = re.search(r"labelRes=\d+ label=([^\s]+)", result)
-        if match:
-            info["name"] = match.group(1)
+    match = re.search(r"labelRes=\d+ label=([^\s]+)", blocks.get("package", ""))
+    if match:
+        info["name"] = match.group(1)
+    
+    sizes = get_app_storage(serial).get(package)
+    if sizes:
+        info["size"] = format_size(sizes["app"] + sizes["data"] + sizes["cache"])
     
     return info
 
@@ -183,6 +406,229 @@ def backup_app(package, backup_dir):
         console.print("[bold red]✗[/bold red] Backup failed!")
         return False
 
+def get_data_access_command(package, serial=None):
+    """
+    Find how the app's private data can be reached on the device
+    
+    Debuggable apps are accessed with run-as, other apps need root.
+    
+    Args:
+        package (str): Package name
+        serial (str, optional): Device serial
+        
+    Returns:
+        tuple: (mode, wrapper) where wrapper turns a shell command into one
+               running with access to the app data, or (None, None)
+    """
+    quoted = adb_helper.quote(package)
+    
+    result = adb_helper.run_adb(["shell", f"run-as {quoted} id"], serial=serial)
+    if result and result.returncode == 0 and "uid=" in result.stdout:
+        return "run-as", lambda cmd: f"run-as {quoted} {cmd}"
+        
+    result = adb_helper.run_adb(["shell", "su -c id"], serial=serial)
+    if result and result.returncode == 0 and "uid=0" in result.stdout:
+        return "root", lambda cmd: f"su -c {adb_helper.quote(cmd)}"
+        
+    return None, None
+
+def wrap_with_status(command, package):
+    """
+    Redirect a streamed command's stderr and exit status to files on the device
+    
+    exec-out/exec-in merge stderr into the data stream and only report adb's
+    own exit code, so tar's result has to be collected separately.
+    
+    Args:
+        command (str): Remote command (already wrapped for data access)
+        package (str): Package name, used to name the status files
+        
+    Returns:
+        tuple: (remote command, status file prefix)
+    """
+    status = f"{TRANSFER_STATUS_PREFIX}_{package}"
+    return f"{command} 2>{status}.err; echo $? >{status}.rc", status
+
+def read_transfer_status(status, serial=None):
+    """
+    Read (and remove) the status files written by wrap_with_status
+    
+    Args:
+        status (str): Status file prefix
+        serial (str, optional): Device serial
+        
+    Returns:
+        tuple: (exit code or None if unknown, stderr text)
+    """
+    output = adb_helper.run_shell_script(
+        f"echo @@rc\ncat {status}.rc\necho @@err\ncat {status}.err\nrm -f {status}.rc {status}.err\n",
+        serial=serial
+    )
+    blocks = adb_helper.parse_marked_output(output)
+    rc = blocks.get("rc", "").strip()
+    return (int(rc) if rc.isdigit() else None), blocks.get("err", "").strip()
+
+def backup_app_data(package, backup_dir, serial=None):
+    """
+    Stream the app's private data into a local compressed tar archive
+    
+    The tar stream is read straight from "adb exec-out", so nothing is
+    staged on the device.
+    
+    Args:
+        package (str): Package name
+        backup_dir (str): Backup directory
+        serial (str, optional): Device serial
+        
+    Returns:
+        dict: Backup statistics, or None if failed
+    """
+    mode, wrap = get_data_access_command(package, serial)
+    if not mode:
+        console.print(f"[bold red]Cannot access data of {package}: app is not debuggable and device is not rooted![/bold red]")
+        return None
+        
+    if not os.path.exists(backup_dir):
+        os.makedirs(backup_dir)
+        
+    data_path = f"/data/data/{package}"
+    excludes = " ".join(f"--exclude={name}" for name in DATA_BACKUP_EXCLUDES)
+    remote, status = wrap_with_status(wrap(f"tar -cf - -C {data_path} {excludes} ."), package)
+    archive = os.path.join(backup_dir, f"{package}.data.tar.gz")
+    
+    console.print(f"[yellow]Backing up data ({mode}): {package}[/yellow]")
+    
+    raw_bytes = 0
+    start = time.time()
+    process = subprocess.Popen(
+        adb_helper.adb_base(serial) + ["exec-out", remote],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    )
+    with gzip.open(archive, "wb", compresslevel=6) as f:
+        while True:
+            chunk = process.stdout.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            f.write(chunk)
+            raw_bytes += len(chunk)
+    process.wait()
+    elapsed = max(time.time() - start, 1e-6)
+    
+    rc, error = read_transfer_status(status, serial)
+    if process.returncode != 0 or rc != 0 or raw_bytes == 0:
+        os.remove(archive)
+        console.print(f"[bold red]✗[/bold red] Data backup failed! {error}")
+        return None
+        
+    stats = {
+        "package": package,
+        "mode": mode,
+        "archive": archive,
+        "raw_bytes": raw_bytes,
+        "archive_bytes": os.path.getsize(archive),
+        "seconds": elapsed,
+        "throughput": raw_bytes / elapsed
+    }
+    log.info(f"Backed up data of {package} to {archive} ({raw_bytes} bytes in {elapsed:.1f}s)")
+    return stats
+
+def restore_app_data(archive, package, serial=None):
+    """
+    Stream a data archive created by backup_app_data back onto the device
+    
+    Args:
+        archive (str): Path to the .data.tar.gz archive
+        package (str): Package name
+        serial (str, optional): Device serial
+        
+    Returns:
+        dict: Restore statistics, or None if failed
+    """
+    if not os.path.exists(archive):
+        console.print(f"[bold red]File not found: {archive}[/bold red]")
+        return None
+        
+    mode, wrap = get_data_access_command(package, serial)
+    if not mode:
+        console.print(f"[bold red]Cannot access data of {package}: app is not debuggable and device is not rooted![/bold red]")
+        return None
+        
+    data_path = f"/data/data/{package}"
+    remote_cmd = f"tar -xf - -C {data_path}"
+    if mode == "root":
+        # Files written by root must be handed back to the app's user. The owner is
+        # read before extracting: tar restores the owner of "." from the archive,
+        # which may be the UID the app had on the source device.
+        remote_cmd = (
+            f"owner=$(stat -c %u:%g {data_path}) && {remote_cmd}"
+            f" && chown -R $owner {data_path} && restorecon -RF {data_path}"
+        )
+    remote_cmd, status = wrap_with_status(wrap(remote_cmd), package)
+        
+    adb_helper.run_adb(["shell", "am", "force-stop", package], serial=serial)
+    console.print(f"[yellow]Restoring data ({mode}): {package}[/yellow]")
+    
+    raw_bytes = 0
+    start = time.time()
+    process = subprocess.Popen(
+        adb_helper.adb_base(serial) + ["exec-in", remote_cmd],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE
+    )
+    try:
+        with gzip.open(archive, "rb") as f:
+            while True:
+                chunk = f.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                process.stdin.write(chunk)
+                raw_bytes += len(chunk)
+        process.stdin.close()
+    except BrokenPipeError:
+        pass
+    _, error = process.communicate()
+    elapsed = max(time.time() - start, 1e-6)
+    
+    rc, remote_error = read_transfer_status(status, serial)
+    if process.returncode != 0 or rc != 0:
+        error = remote_error or error.decode(errors="replace").strip()
+        console.print(f"[bold red]✗[/bold red] Data restore failed! {error}")
+        return None
+        
+    log.info(f"Restored data of {package} from {archive}")
+    return {
+        "package": package,
+        "mode": mode,
+        "archive": archive,
+        "raw_bytes": raw_bytes,
+        "archive_bytes": os.path.getsize(archive),
+        "seconds": elapsed,
+        "throughput": raw_bytes / elapsed
+    }
+
+def show_transfer_stats(stats_list, title):
+    """
+    Display size and throughput of data backups or restores
+    
+    Args:
+        stats_list (list): Statistics dicts from backup_app_data/restore_app_data
+        title (str): Table title
+    """
+    ui_helper.display_table(
+        title,
+        ["Package", "Mode", "Data", "Archive", "Time", "Throughput"],
+        [[
+            s["package"],
+            s["mode"],
+            f"{s['raw_bytes'] / 1048576:.1f} MB",
+            f"{s['archive_bytes'] / 1048576:.1f} MB",
+            f"{s['seconds']:.1f}s",
+            f"{s['throughput'] / 1048576:.1f} MB/s"
+        ] for s in stats_list]
+    )
+
 def restore_app(apk_path):
     """
     Restore application from backed up APK file
@@ -195,6 +641,352 @@ def restore_app(apk_path):
     """
     return install_app(apk_path)
 
+def bulk_package_action(packages, action, serial=None, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Run a package action on many packages using one remote script per chunk
+    
+    Args:
+        packages (list): Package names
+        action (str): Key of BULK_ACTIONS
+        serial (str, optional): Device serial
+        chunk_size (int): Packages per remote script
+        
+    Returns:
+        list: Per-package results as dicts with package, success and output
+    """
+    spec = BULK_ACTIONS[action]
+    results = []
+    
+    for chunk in adb_helper.chunked(list(packages), chunk_size):
+        script = "\n".join(
+            f"echo @@{package}; {spec['command']} {adb_helper.quote(package)} 2>&1"
+            for package in chunk
+        )
+        output = adb_helper.run_shell_script(script, serial=serial)
+        blocks = adb_helper.parse_marked_output(output)
+        
+        for package in chunk:
+            text = blocks.get(package)
+            if text is None:
+                results.append({"package": package, "success": False, "output": "No response from device"})
+                continue
+            text = text.strip()
+            results.append({
+                "package": package,
+                "success": spec["success"].lower() in text.lower(),
+                "output": text
+            })
+            
+    done = sum(1 for r in results if r["success"])
+    log.info(f"Bulk {action} on {serial or 'default device'}: {done}/{len(results)} packages")
+    return results
+
+def save_undo_list(action, results, serial=None):
+    """
+    Save the packages changed by a bulk action so the action can be reverted
+    
+    Args:
+        action (str): Key of BULK_ACTIONS that was run
+        results (list): Results from bulk_package_action
+        serial (str, optional): Device serial
+        
+    Returns:
+        str: Path to the undo file, or None if nothing can be undone
+    """
+    undo_action = BULK_ACTIONS[action]["undo"]
+    packages = [r["package"] for r in results if r["success"]]
+    
+    if not packages:
+        return None
+        
+    undo_file = os.path.join(
+        adb_helper.data_dir("undo"),
+        f"{time.strftime('%Y%m%d_%H%M%S')}_{serial or 'default'}_{action}.json"
+    )
+    
+    with open(undo_file, "w", encoding="utf-8") as f:
+        json.dump({
+            "serial": serial,
+            "action": action,
+            "undo_action": undo_action,
+            "packages": packages,
+            "time": time.strftime("%Y-%m-%d %H:%M:%S")
+        }, f, indent=4)
+        
+    return undo_file
+
+def undo_bulk_action(undo_file):
+    """
+    Revert a bulk action from its undo file
+    
+    Args:
+        undo_file (str): Path to the undo file
+        
+    Returns:
+        list: Per-package results, or None if the action cannot be undone
+    """
+    with open(undo_file, "r", encoding="utf-8") as f:
+        undo = json.load(f)
+        
+    if not undo.get("undo_action"):
+        console.print(f"[bold red]'{undo['action']}' cannot be undone automatically.[/bold red]")
+        return None
+        
+    results = bulk_package_action(undo["packages"], undo["undo_action"], serial=undo.get("serial"))
+    log.info(f"Reverted bulk {undo['action']} from {undo_file}")
+    return results
+
+def show_bulk_results(results, title):
+    """
+    Display per-package results of a bulk action
+    
+    Args:
+        results (list): Results from bulk_package_action
+        title (str): Table title
+    """
+    ui_helper.display_table(
+        title,
+        ["Package", "Result", "Output"],
+        [[r["package"], "✓" if r["success"] else "✗", r["output"][:80]] for r in results]
+    )
+    done = sum(1 for r in results if r["success"])
+    console.print(f"[bold green]✓[/bold green] {done}/{len(results)} packages succeeded")
+
+def bulk_actions_menu():
+    """Multi-select bulk uninstall / disable / enable menu"""
+    action_label = questionary.select(
+        "Select bulk action:",
+        choices=[spec["label"] for key, spec in BULK_ACTIONS.items() if key != "restore"]
+        + ["Undo a previous bulk action", "↩️ Cancel"]
+    ).ask()
+    
+    if not action_label or "Cancel" in action_label:
+        return
+        
+    if "Undo" in action_label:
+        undo_dir = adb_helper.data_dir("undo")
+        undo_files = sorted(os.listdir(undo_dir), reverse=True)
+        if not undo_files:
+            console.print("[yellow]No undo lists saved yet.[/yellow]")
+            return
+        undo_file = questionary.select("Select undo list:", choices=undo_files + ["↩️ Cancel"]).ask()
+        if undo_file and "Cancel" not in undo_file:
+            results = undo_bulk_action(os.path.join(undo_dir, undo_file))
+            if results:
+                show_bulk_results(results, "Undo Results")
+        return
+        
+    action = next(key for key, spec in BULK_ACTIONS.items() if spec["label"] == action_label)
+    
+    devices = device_check.select_devices("Select devices:")
+    if not devices:
+        console.print("[bold red]No devices selected![/bold red]")
+        return
+        
+    # Debloat and enable/disable usually target system packages as well
+    packages = get_installed_apps(devices[0], include_system=action != "uninstall")
+    if not packages:
+        console.print("[bold red]No applications found![/bold red]")
+        return
+        
+    selected = questionary.checkbox(f"Select packages ({action_label}):", choices=sorted(packages)).ask()
+    if not selected:
+        return
+        
+    if not ui_helper.confirm_action(f"{action_label} {len(selected)} packages on {len(devices)} device(s)?"):
+        return
+        
+    def run(serial):
+        results = bulk_package_action(selected, action, serial=serial)
+        return results, save_undo_list(action, results, serial=serial)
+        
+    for serial, outcome in adb_helper.run_on_devices(run, devices).items():
+        if isinstance(outcome, Exception):
+            console.print(f"[bold red]{serial}: {outcome}[/bold red]")
+            continue
+        results, undo_file = outcome
+        show_bulk_results(results, f"{action_label} - {serial}")
+        if undo_file:
+            console.print(f"[cyan]Undo list saved to: {undo_file}[/cyan]")
+            
+    input("\nPress Enter to continue...")
+
+def storage_usage_menu():
+    """Show app/data/cache sizes sorted by size and clear the worst offenders"""
+    sort_key = questionary.select(
+        "Sort by:",
+        choices=["Total size", "Cache size", "Data size", "App size"]
+    ).ask()
+    
+    if not sort_key:
+        return
+        
+    sizes = get_app_storage(refresh=True)
+    if not sizes:
+        console.print("[bold red]Could not read storage information![/bold red]")
+        return
+        
+    key = {"Total": None, "Cache": "cache", "Data": "data", "App": "app"}[sort_key.split()[0]]
+    
+    def size_of(item):
+        package_sizes = item[1]
+        return sum(package_sizes.values()) if key is None else package_sizes[key]
+        
+    ranked = sorted(sizes.items(), key=size_of, reverse=True)
+    
+    ui_helper.display_table(
+        f"Storage Usage (sorted by {sort_key.lower()})",
+        ["No.", "Package Name", "App", "Data", "Cache", "Total"],
+        [[
+            i + 1,
+            package,
+            format_size(s["app"]),
+            format_size(s["data"]),
+            format_size(s["cache"]),
+            format_size(sum(s.values()))
+        ] for i, (package, s) in enumerate(ranked[:30])]
+    )
+    
+    selected = questionary.checkbox(
+        "Select applications to clear (pm clear, leave empty to skip):",
+        choices=[package for package, _ in ranked[:30]]
+    ).ask()
+    
+    if selected and ui_helper.confirm_action(f"Clear all data of {len(selected)} applications?"):
+        show_bulk_results(bulk_package_action(selected, "clear"), "Clear Results")
+        get_app_storage(refresh=True)
+        
+    input("\nPress Enter to continue...")
+
+def collect_package_indexes(devices, include_system=False):
+    """
+    Collect the package index of several devices concurrently
+    
+    Args:
+        devices (list): Device serials
+        include_system (bool): Also list system packages
+        
+    Returns:
+        dict: {serial: {package: version_code}}, devices that failed are left out
+    """
+    def collect(serial):
+        return {pkg: entry["version_code"] for pkg, entry in get_package_index(serial, include_system).items()}
+        
+    indexes = {}
+    for serial, index in adb_helper.run_on_devices(collect, devices).items():
+        if isinstance(index, Exception) or not index:
+            console.print(f"[bold red]Could not read packages from {serial}[/bold red]")
+            continue
+        indexes[serial] = index
+    return indexes
+
+def compare_package_indexes(reference, indexes):
+    """
+    Compute package set and version differences against a reference index
+    
+    Args:
+        reference (dict): {package: version_code} of the reference
+        indexes (dict): {serial: {package: version_code}}
+        
+    Returns:
+        dict: {serial: {"missing": [...], "extra": [...], "version": [[package, reference_version, device_version], ...]}}
+    """
+    reference_set = set(reference)
+    report = {}
+    for serial, index in indexes.items():
+        packages = set(index)
+        report[serial] = {
+            "missing": sorted(reference_set - packages),
+            "extra": sorted(packages - reference_set),
+            "version": [
+                [pkg, reference[pkg], index[pkg]]
+                for pkg in sorted(reference_set & packages)
+                if reference[pkg] != index[pkg]
+            ]
+        }
+    return report
+
+def show_drift_report(report, reference_name):
+    """
+    Display a drift report as rich tables
+    
+    Args:
+        report (dict): Result of compare_package_indexes
+        reference_name (str): Name of the reference device or baseline
+    """
+    ui_helper.display_table(
+        f"App Drift vs {reference_name}",
+        ["Device", "Missing", "Extra", "Version Differs"],
+        [[serial, len(d["missing"]), len(d["extra"]), len(d["version"])] for serial, d in report.items()]
+    )
+    
+    for serial, drift in report.items():
+        rows = [[pkg, "missing", "", ""] for pkg in drift["missing"]]
+        rows += [[pkg, "extra", "", ""] for pkg in drift["extra"]]
+        rows += [[pkg, "version", ref, dev] for pkg, ref, dev in drift["version"]]
+        if rows:
+            ui_helper.display_table(f"Differences on {serial}", ["Package", "Type", "Reference", "Device"], rows)
+
+def app_drift_menu():
+    """Compare installed apps across connected devices against a reference or saved baseline"""
+    devices = device_check.get_connected_devices()
+    if not devices:
+        console.print("[bold red]No devices connected![/bold red]")
+        return
+        
+    include_system = questionary.confirm("Include system packages?", default=False).ask()
+    indexes = collect_package_indexes(devices, include_system)
+    if not indexes:
+        return
+        
+    baseline_dir = adb_helper.data_dir("baselines")
+    baselines = sorted(f for f in os.listdir(baseline_dir) if f.startswith("apps_") and f.endswith(".json"))
+    
+    reference_choice = questionary.select(
+        "Compare against:",
+        choices=[f"Device: {serial}" for serial in indexes] + [f"Baseline: {f}" for f in baselines] + ["↩️ Cancel"]
+    ).ask()
+    
+    if not reference_choice or "Cancel" in reference_choice:
+        return
+        
+    if reference_choice.startswith("Device: "):
+        reference_name = reference_choice[len("Device: "):]
+        reference = indexes[reference_name]
+        others = {serial: index for serial, index in indexes.items() if serial != reference_name}
+    else:
+        reference_name = reference_choice[len("Baseline: "):]
+        with open(os.path.join(baseline_dir, reference_name), "r", encoding="utf-8") as f:
+            reference = json.load(f)["packages"]
+        others = indexes
+        
+    report = compare_package_indexes(reference, others)
+    
+    output = questionary.select("Output format:", choices=["Table", "JSON file"]).ask()
+    if output == "JSON file":
+        report_file = questionary.path(
+            "Enter report file path:",
+            default=f"app_drift_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        ).ask()
+        if report_file:
+            with open(report_file, "w", encoding="utf-8") as f:
+                json.dump({"reference": reference_name, "devices": report}, f, indent=4)
+            console.print(f"[bold green]✓[/bold green] Report saved to: {report_file}")
+    else:
+        show_drift_report(report, reference_name)
+        
+    if questionary.confirm("Save a device's package list as baseline?", default=False).ask():
+        serial = questionary.select("Select device:", choices=list(indexes)).ask()
+        name = questionary.text("Baseline name:").ask()
+        if serial and name:
+            baseline_file = os.path.join(baseline_dir, f"apps_{name}.json")
+            with open(baseline_file, "w", encoding="utf-8") as f:
+                json.dump({"serial": serial, "time": time.strftime("%Y-%m-%d %H:%M:%S"), "packages": indexes[serial]}, f, indent=4)
+            console.print(f"[bold green]✓[/bold green] Baseline saved to: {baseline_file}")
+            
+    log.info(f"Compared installed apps of {len(others)} devices against {reference_name}")
+    input("\nPress Enter to continue...")
+
 def app_management_menu():
     """Application management menu"""
     while True:
@@ -206,6 +998,9 @@ def app_management_menu():
                 "3️⃣ Backup Application",
                 "4️⃣ Restore Application",
                 "5️⃣ View Installed Apps",
+                "6️⃣ Bulk Package Actions",
+                "7️⃣ Storage Usage",
+                "8️⃣ Compare Apps Across Devices",
                 "↩️ Back"
             ]
         ).ask()
@@ -238,20 +1033,51 @@ def app_management_menu():
                 console.print("[bold red]No applications found![/bold red]")
                 continue
                 
-            package = questionary.select(
-                "Select application to backup:",
-                choices=packages + ["↩️ Cancel"]
+            selected = questionary.checkbox(
+                "Select applications to backup:",
+                choices=packages
             ).ask()
             
-            if package and "Cancel" not in package:
-                backup_dir = questionary.path("Enter backup directory:").ask()
-                if backup_dir:
+            if not selected:
+                continue
+                
+            mode = questionary.select(
+                "Backup mode:",
+                choices=["APK only", "App data only", "APK + app data"]
+            ).ask()
+            backup_dir = questionary.path("Enter backup directory:").ask()
+            if not mode or not backup_dir:
+                continue
+                
+            stats_list = []
+            for package in selected:
+                if "APK" in mode:
                     backup_app(package, backup_dir)
+                if "data" in mode:
+                    stats = backup_app_data(package, backup_dir)
+                    if stats:
+                        stats_list.append(stats)
+                        
+            if stats_list:
+                show_transfer_stats(stats_list, "Data Backup")
                     
         elif "Restore Application" in choice:
-            apk_path = questionary.path("Enter path to backed up APK file:").ask()
-            if apk_path:
-                restore_app(apk_path)
+            backup_path = questionary.path("Enter path to backed up APK or .data.tar.gz file:").ask()
+            if not backup_path:
+                continue
+                
+            if backup_path.endswith(".data.tar.gz"):
+                package = questionary.text(
+                    "Package name:",
+                    default=os.path.basename(backup_path)[:-len(".data.tar.gz")]
+                ).ask()
+                if package:
+                    stats = restore_app_data(backup_path, package)
+                    if stats:
+                        console.print("[bold green]✓[/bold green] Data restored successfully!")
+                        show_transfer_stats([stats], "Data Restore")
+            else:
+                restore_app(backup_path)
                 
         elif "View Installed Apps" in choice:
             packages = get_installed_apps()
@@ -259,13 +1085,38 @@ def app_management_menu():
                 console.print("[bold red]No applications found![/bold red]")
                 continue
                 
+            sizes = get_app_storage()
+            packages.sort(key=lambda pkg: sum(sizes.get(pkg, {}).values()), reverse=True)
+            
+            rows = []
+            for i, pkg in enumerate(packages):
+                info = get_app_info(pkg)
+                pkg_sizes = sizes.get(pkg)
+                rows.append([
+                    i + 1,
+                    pkg,
+                    info["version"],
+                    format_size(pkg_sizes["app"]) if pkg_sizes else "Unknown",
+                    format_size(pkg_sizes["data"]) if pkg_sizes else "Unknown",
+                    format_size(pkg_sizes["cache"]) if pkg_sizes else "Unknown"
+                ])
+                
             table = ui_helper.display_table(
                 "Installed Applications",
-                ["No.", "Package Name", "Version", "Path"],
-                [[i+1, pkg, get_app_info(pkg)["version"], get_app_info(pkg)["path"]] for i, pkg in enumerate(packages)]
+                ["No.", "Package Name", "Version", "App", "Data", "Cache"],
+                rows
             )
             
             input("\nPress Enter to continue...")
+            
+        elif "Bulk Package Actions" in choice:
+            bulk_actions_menu()
+            
+        elif "Storage Usage" in choice:
+            storage_usage_menu()
+            
+        elif "Compare Apps Across Devices" in choice:
+            app_drift_menu()
 
 if __name__ == "__main__":
     app_management_menu() 
\ No newline at end of file
@@ -6,18 +6,80 @@ Module for executing custom commands and backing up settings
 """
 
 import os
+import re
+import gzip
 import json
+import time
+import fnmatch
+import hashlib
 import subprocess
 import questionary
 from rich.console import Console
 from rich.panel import Panel
+from rich.table import Table
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
 from utils import logger
 from utils import ui_helper
+from utils import adb_helper
+from commands import device_check
+from commands import profiles
+from commands import system_settings
 
 console = Console()
 log = logger.setup_logger()
 
+# Settings namespaces captured in every snapshot
+SETTINGS_NAMESPACES = ["system", "secure", "global"]
+
+# Snapshot "display" section keys and the matching system_settings.parse_wm_display fields
+DISPLAY_KEYS = {
+    "physical_size": "size",
+    "override_size": "size_override",
+    "physical_density": "density",
+    "override_density": "density_override"
+}
+
+# Keys holding timestamps, in any section (fnmatch patterns on "section/key")
+TIMESTAMP_KEYS = [
+    "*/*_timestamp*",
+    "*/*time_ms*"
+]
+
+# Properties that change between captures without any configuration change (fnmatch patterns on "props/key")
+VOLATILE_PROPS = [
+    "props/ro.boottime.*",
+    "props/ro.runtime.firstboot",
+    "props/init.svc.*",
+    "props/init.svc_debug_pid.*",
+    "props/sys.boot.reason*",
+    "props/persist.sys.boot.reason*",
+    "props/sys.system_server.start_*",
+    "props/sys.sysctl.*",
+    "props/vendor.*boot_count*",
+    "props/gsm.nitz.time",
+    "props/gsm.network.type",
+    "props/gsm.sim.state",
+    "props/net.change",
+    "props/net.dns*",
+    "props/net.*.dns*",
+    "props/net.*.gw",
+    "props/dev.bootcomplete"
+] + TIMESTAMP_KEYS
+
+# Captures every snapshot section in a single remote script
+SNAPSHOT_SCRIPT = """echo @@system
+settings list system
+echo @@secure
+settings list secure
+echo @@global
+settings list global
+echo @@props
+getprop
+echo @@display
+wm size
+wm density
+"""
+
 def run_adb_command(command):
     """
     Run ADB command and return result
@@ -29,7 +91,7 @@ def run_adb_command(command):
         str: Command result
     """
     try:
-        result = subprocess.run(
+        result = adb_helper.run_process(
             command,
             capture_output=True,
             text=True,
@@ -69,7 +131,9 @@ def execute_custom_command(command):
 
 def save_command_preset(name, commands):
     """
-    Save command preset to configuration file
+    Save commands as a desired-state profile
+    
+    Settings, wm and pm commands are converted to declarative entries; other commands are skipped.
     
     Args:
         name (str): Preset name
@@ -78,26 +142,16 @@ def save_command_preset(name, commands):
     Returns:
         bool: True if successful, False if failed
     """
-    preset_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config/presets.json")
-    
-    # Read current configuration
-    presets = {}
-    if os.path.exists(preset_file):
-        try:
-            with open(preset_file, "r", encoding="utf-8") as f:
-                presets = json.load(f)
-        except Exception as e:
-            console.print(f"[bold red]Error reading configuration file: {e}[/bold red]")
-            return False
-    
-    # Add new preset
-    presets[name] = commands
-    
-    # Save configuration file
+    profile, unsupported = profiles.convert_commands(commands)
+    for command in unsupported:
+        console.print(f"[yellow]Skipped (not a settings/wm/pm command): {command}[/yellow]")
+        
+    if not profile:
+        console.print("[bold red]✗[/bold red] No supported commands to save!")
+        return False
+        
     try:
-        with open(preset_file, "w", encoding="utf-8") as f:
-            json.dump(presets, f, indent=4, ensure_ascii=False)
-            
+        profiles.save_profile(name, profile)
         console.print(f"[bold green]✓[/bold green] Preset '{name}' saved successfully!")
         log.info(f"Saved command preset: {name}")
         return True
@@ -105,42 +159,548 @@ def save_command_preset(name, commands):
         console.print(f"[bold red]Error saving configuration file: {e}[/bold red]")
         return False
 
-def backup_settings(backup_file):
+def parse_getprop(output):
     """
-    Backup system settings
+    Parse "getprop" output ("[key]: [value]" per line)
     
     Args:
-        backup_file (str): Backup file path
+        output (str): Command output
         
     Returns:
-        bool: True if successful, False if failed
+        dict: {property: value}
     """
-    console.print("[yellow]Backing up system settings...[/yellow]")
+    props = {}
+    for match in re.finditer(r"^\[(.+?)\]: \[(.*)\]$", output or "", re.MULTILINE):
+        props[match.group(1)] = match.group(2)
+    return props
+
+def section_digest(values):
+    """
+    Compute the content address of a snapshot section
+    
+    Args:
+        values (dict): Section values
+        
+    Returns:
+        str: SHA-256 of the canonical JSON encoding
+    """
+    encoded = json.dumps(values, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def capture_snapshot(serial=None):
+    """
+    Capture settings, system properties and display size/density in one adb call
+    
+    Args:
+        serial (str, optional): Device serial
+        
+    Returns:
+        dict: {"time", "serial", "sections": {name: {key: value}}, "hashes": {name: digest}},
+              or None if the device could not be read
+    """
+    output = adb_helper.run_shell_script(SNAPSHOT_SCRIPT, serial=serial)
+    if output is None:
+        return None
+        
+    blocks = adb_helper.parse_marked_output(output)
+    sections = {namespace: system_settings.parse_settings_list(blocks.get(namespace, "")) for namespace in SETTINGS_NAMESPACES}
+    # Volatile props (boot times, counters, service states) would change the section hash on every capture
+    sections["props"] = {
+        key: value for key, value in parse_getprop(blocks.get("props", "")).items()
+        if not is_ignored(f"props/{key}", VOLATILE_PROPS)
+    }
+    display = system_settings.parse_wm_display(blocks.get("display", ""))
+    sections["display"] = {
+        name: display[key]
+        for name, key in DISPLAY_KEYS.items() if display[key] is not None
+    }
+    
+    return {
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "serial": serial,
+        "sections": sections,
+        "hashes": {name: section_digest(values) for name, values in sections.items()}
+    }
+
+# System properties compared by the fleet drift scan
+DRIFT_PROPS = [
+    "ro.build.fingerprint",
+    "ro.build.version.release",
+    "ro.build.version.security_patch",
+    "persist.sys.locale",
+    "persist.sys.timezone",
+    "persist.sys.usb.config"
+]
+
+# Keys that differ between healthy devices and are ignored by default (fnmatch patterns on "section/key")
+DEFAULT_DRIFT_IGNORE = [
+    "secure/android_id",
+    "secure/bluetooth_address",
+    "secure/bluetooth_name",
+    "global/device_name",
+    "global/boot_count",
+    "global/adb_wifi_enabled",
+    "display/physical_*"
+] + TIMESTAMP_KEYS
+
+def get_snapshot_dir(*parts):
+    """
+    Get (and create) the snapshot directory
+    
+    Args:
+        *parts (str): Subdirectories inside the snapshot directory
+        
+    Returns:
+        str: Directory path
+    """
+    return adb_helper.data_dir("snapshots", *parts)
+
+def save_snapshot(snapshot):
+    """
+    Save a snapshot as a small manifest plus content-addressed section objects
+    
+    Sections that did not change since an earlier snapshot (on any device) are stored only once.
+    
+    Args:
+        snapshot (dict): Result of capture_snapshot
+        
+    Returns:
+        str: Manifest path
+    """
+    objects_dir = get_snapshot_dir("objects")
+    for name, digest in snapshot["hashes"].items():
+        object_file = os.path.join(objects_dir, f"{digest}.json.gz")
+        if not os.path.exists(object_file):
+            with gzip.open(object_file, "wt", encoding="utf-8") as f:
+                json.dump(snapshot["sections"][name], f, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+                
+    manifest_file = os.path.join(
+        get_snapshot_dir(),
+        f"{snapshot['serial'] or 'default'}_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    with open(manifest_file, "w", encoding="utf-8") as f:
+        json.dump({"time": snapshot["time"], "serial": snapshot["serial"], "hashes": snapshot["hashes"]}, f)
+    return manifest_file
+
+def load_snapshot(manifest_file, sections=None):
+    """
+    Load a saved snapshot
+    
+    Args:
+        manifest_file (str): Manifest path
+        sections (iterable, optional): Only load these sections (others are left out)
+        
+    Returns:
+        dict: Snapshot in the same shape as capture_snapshot
+    """
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        snapshot = json.load(f)
+        
+    snapshot["sections"] = {}
+    for name, digest in snapshot["hashes"].items():
+        if sections is not None and name not in sections:
+            continue
+        with gzip.open(os.path.join(get_snapshot_dir("objects"), f"{digest}.json.gz"), "rt", encoding="utf-8") as f:
+            snapshot["sections"][name] = json.load(f)
+    return snapshot
+
+def list_snapshots():
+    """
+    List saved snapshot manifests, newest first
+    
+    Returns:
+        list: Manifest file names
+    """
+    return sorted((f for f in os.listdir(get_snapshot_dir()) if f.endswith(".json")), reverse=True)
+
+def diff_snapshots(old, new):
+    """
+    Compute a structural diff between two snapshots
+    
+    Sections with the same content address are skipped without comparing their keys.
+    
+    Args:
+        old (dict): Older snapshot
+        new (dict): Newer snapshot
+        
+    Returns:
+        list: [(section, key, old value, new value)], None marks a missing key
+    """
+    changes = []
+    for name in sorted(set(old["hashes"]) | set(new["hashes"])):
+        if old["hashes"].get(name) == new["hashes"].get(name):
+            continue
+        before = old["sections"].get(name, {})
+        after = new["sections"].get(name, {})
+        for key in sorted(set(before) | set(after)):
+            if before.get(key) != after.get(key):
+                changes.append((name, key, before.get(key), after.get(key)))
+    return changes
+
+def load_snapshot_pair(old_file, new_file):
+    """
+    Load two saved snapshots, reading only the sections that differ
+    
+    Args:
+        old_file (str): Older manifest path
+        new_file (str): Newer manifest path
+        
+    Returns:
+        tuple: (old snapshot, new snapshot)
+    """
+    hashes = []
+    for path in (old_file, new_file):
+        with open(path, "r", encoding="utf-8") as f:
+            hashes.append(json.load(f)["hashes"])
+    changed = {name for name in set(hashes[0]) | set(hashes[1]) if hashes[0].get(name) != hashes[1].get(name)}
+    return load_snapshot(old_file, changed), load_snapshot(new_file, changed)
+
+def show_diff(changes, old_label, new_label, limit=200):
+    """
+    Display a snapshot diff
+    
+    Args:
+        changes (list): Result of diff_snapshots
+        old_label (str): Label of the older snapshot
+        new_label (str): Label of the newer snapshot
+        limit (int): Maximum rows to display
+    """
+    if not changes:
+        console.print("[bold green]✓[/bold green] Snapshots are identical")
+        return
+        
+    table = Table(title=f"{old_label} → {new_label}")
+    table.add_column("Section", style="blue")
+    table.add_column("Key", style="cyan")
+    table.add_column(old_label, style="red")
+    table.add_column(new_label, style="green")
+    for section, key, before, after in changes[:limit]:
+        table.add_row(section, key, "-" if before is None else before[:60], "-" if after is None else after[:60])
+    console.print(table)
+    
+    counts = {}
+    for section, _, _, _ in changes:
+        counts[section] = counts.get(section, 0) + 1
+    summary = ", ".join(f"{section}: {count}" for section, count in counts.items())
+    console.print(f"[yellow]{len(changes)} difference(s) ({summary})[/yellow]")
+    if len(changes) > limit:
+        console.print(f"[yellow]Only the first {limit} are shown.[/yellow]")
+
+def snapshot_menu():
+    """Settings snapshot and diff menu"""
+    choice = questionary.select(
+        "Settings Snapshots:",
+        choices=[
+            "1️⃣ Take Snapshot",
+            "2️⃣ Compare Two Snapshots",
+            "3️⃣ Compare Two Devices (live)",
+            "↩️ Back"
+        ]
+    ).ask()
+    
+    if not choice or "Back" in choice:
+        return
+        
+    if "Take Snapshot" in choice:
+        devices = device_check.select_devices("Select devices to snapshot:")
+        results = adb_helper.run_on_devices(capture_snapshot, devices)
+        for serial, snapshot in results.items():
+            if not snapshot or isinstance(snapshot, Exception):
+                console.print(f"[bold red]✗[/bold red] Could not read settings from {serial}")
+                continue
+            path = save_snapshot(snapshot)
+            total = sum(len(values) for values in snapshot["sections"].values())
+            console.print(f"[bold green]✓[/bold green] {serial}: {total} values saved to {path}")
+            log.info(f"Saved settings snapshot of {serial} ({total} values)")
+            
+    elif "Compare Two Snapshots" in choice:
+        snapshots = list_snapshots()
+        if len(snapshots) < 2:
+            console.print("[yellow]At least two snapshots are needed.[/yellow]")
+            input("\nPress Enter to continue...")
+            return
+            
+        first = questionary.select("Older snapshot:", choices=snapshots).ask()
+        second = questionary.select("Newer snapshot:", choices=[s for s in snapshots if s != first]).ask()
+        if first and second:
+            old, new = load_snapshot_pair(os.path.join(get_snapshot_dir(), first), os.path.join(get_snapshot_dir(), second))
+            show_diff(diff_snapshots(old, new), first, second)
+            
+    elif "Compare Two Devices" in choice:
+        devices = device_check.select_devices("Select exactly two devices:")
+        if len(devices) != 2:
+            console.print("[yellow]Please select exactly two devices.[/yellow]")
+        else:
+            results = adb_helper.run_on_devices(capture_snapshot, devices)
+            snapshots = [results[serial] for serial in devices]
+            if all(snapshot and not isinstance(snapshot, Exception) for snapshot in snapshots):
+                show_diff(diff_snapshots(*snapshots), devices[0], devices[1])
+            else:
+                console.print("[bold red]✗[/bold red] Could not read settings from both devices")
+                
+    input("\nPress Enter to continue...")
+
+def flatten_snapshot(snapshot, common_only=False):
+    """
+    Flatten the comparable parts of a snapshot into "section/key" values
+    
+    Args:
+        snapshot (dict): Result of capture_snapshot
+        common_only (bool): Only keep the keys listed in system_settings.COMMON_SETTINGS
+        
+    Returns:
+        dict: {"section/key": value}
+    """
+    values = {}
+    for namespace in SETTINGS_NAMESPACES:
+        if common_only:
+            keys = [setting["name"] for setting in system_settings.COMMON_SETTINGS[namespace]]
+            section = snapshot["sections"][namespace]
+            values.update({f"{namespace}/{key}": section.get(key) for key in keys})
+        else:
+            values.update({f"{namespace}/{key}": value for key, value in snapshot["sections"][namespace].items()})
+            
+    props = snapshot["sections"]["props"]
+    values.update({f"props/{prop}": props.get(prop) for prop in DRIFT_PROPS})
+    values.update({f"display/{key}": value for key, value in snapshot["sections"]["display"].items()})
+    return values
+
+def is_ignored(key, ignore):
+    """
+    Check whether a "section/key" matches an ignore rule
+    
+    Args:
+        key (str): Flattened key
+        ignore (list): fnmatch patterns
+        
+    Returns:
+        bool: True if the key is ignored
+    """
+    return any(fnmatch.fnmatchcase(key, pattern) for pattern in ignore)
+
+def compare_to_baseline(baseline, values):
+    """
+    Compare a device's flattened values against a baseline
+    
+    Args:
+        baseline (dict): Baseline with "values" and "ignore"
+        values (dict): Result of flatten_snapshot
+        
+    Returns:
+        dict: {"section/key": (expected, actual)} for every drifted key
+    """
+    ignore = baseline.get("ignore", [])
+    drift = {}
+    for key in set(baseline["values"]) | set(values):
+        if is_ignored(key, ignore):
+            continue
+        expected = baseline["values"].get(key)
+        actual = values.get(key)
+        # Settings missing from a common-settings baseline are not part of it; display
+        # overrides are always compared, since a missing one means "no override"
+        if (key not in baseline["values"] and baseline.get("common_only")
+                and key.split("/", 1)[0] in SETTINGS_NAMESPACES):
+            continue
+        if expected != actual:
+            drift[key] = (expected, actual)
+    return drift
+
+def remediation_changes(drift, delete_extra=False):
+    """
+    Convert drifted keys into settings writes
     
-    # Get list of namespaces
-    namespaces = ["system", "secure", "global"]
+    Settings namespaces and the display override are writable; properties are read-only.
+    A settings key that exists only on the device (missing from the baseline) would be
+    deleted, which can wipe OEM- or device-specific keys, so it is skipped unless
+    delete_extra is set. A display override missing from the baseline is reset.
     
-    # Create object to store settings
-    settings = {}
+    Args:
+        drift (dict): Result of compare_to_baseline
+        delete_extra (bool): Delete settings keys that are not in the baseline
+        
+    Returns:
+        tuple: ({(namespace, key): value}, {(namespace, key): current value},
+                [keys that cannot be fixed], [device-only keys that were skipped])
+    """
+    display_keys = {"display/override_density": "density", "display/override_size": "size"}
+    changes = {}
+    previous = {}
+    unfixable = []
+    skipped = []
+    for key, (expected, actual) in drift.items():
+        section, name = key.split("/", 1)
+        if section in SETTINGS_NAMESPACES:
+            if expected is None and not delete_extra:
+                skipped.append(key)
+                continue
+            target = (section, name)
+        elif key in display_keys:
+            target = (system_settings.WM_NAMESPACE, display_keys[key])
+        else:
+            unfixable.append(key)
+            continue
+        changes[target] = expected
+        previous[target] = actual
+    return changes, previous, unfixable, skipped
+
+def show_drift_matrix(baseline_name, baseline, drifts, limit=40):
+    """
+    Display drifted keys (rows) against devices (columns)
     
-    # Get settings from each namespace
-    for namespace in namespaces:
-        result = run_adb_command(["adb", "shell", "settings", "list", namespace])
+    Args:
+        baseline_name (str): Baseline name
+        baseline (dict): Baseline
+        drifts (dict): {serial: result of compare_to_baseline}
+        limit (int): Maximum rows to display
+    """
+    keys = sorted({key for drift in drifts.values() for key in drift})
+    if not keys:
+        console.print(f"[bold green]✓[/bold green] All {len(drifts)} device(s) match baseline '{baseline_name}'")
+        return
         
-        if not result:
+    table = Table(title=f"Drift against '{baseline_name}'")
+    table.add_column("Key", style="cyan")
+    table.add_column("Baseline", style="green")
+    for serial in drifts:
+        table.add_column(serial, style="red")
+    for key in keys[:limit]:
+        expected = baseline["values"].get(key)
+        cells = []
+        for drift in drifts.values():
+            if key in drift:
+                actual = drift[key][1]
+                cells.append("-" if actual is None else actual[:24])
+            else:
+                cells.append("[green]✓[/green]")
+        table.add_row(key, "-" if expected is None else expected[:24], *cells)
+    console.print(table)
+    
+    if len(keys) > limit:
+        console.print(f"[yellow]Only the first {limit} of {len(keys)} drifted keys are shown.[/yellow]")
+    for serial, drift in drifts.items():
+        console.print(f"{serial}: [yellow]{len(drift)}[/yellow] drifted key(s)")
+
+def fleet_drift_menu():
+    """Scan every connected device for drift against a saved golden baseline"""
+    devices = device_check.get_connected_devices()
+    if not devices:
+        console.print("[bold red]No devices connected![/bold red]")
+        return
+        
+    baseline_dir = adb_helper.data_dir("baselines")
+    baselines = sorted(f for f in os.listdir(baseline_dir) if f.startswith("settings_") and f.endswith(".json"))
+    
+    choice = questionary.select(
+        "Fleet Drift:",
+        choices=[f"Scan against: {f}" for f in baselines] + ["💾 Save Baseline From Device", "↩️ Back"]
+    ).ask()
+    
+    if not choice or "Back" in choice:
+        return
+        
+    if "Save Baseline" in choice:
+        serial = questionary.select("Select golden device:", choices=devices).ask()
+        name = questionary.text("Baseline name:").ask()
+        common_only = questionary.confirm("Only track common settings (plus key props)?", default=True).ask()
+        if not serial or not name:
+            return
+            
+        snapshot = capture_snapshot(serial)
+        if not snapshot:
+            console.print(f"[bold red]✗[/bold red] Could not read settings from {serial}")
+            return
+            
+        baseline_file = os.path.join(baseline_dir, f"settings_{name}.json")
+        with open(baseline_file, "w", encoding="utf-8") as f:
+            json.dump({
+                "serial": serial,
+                "time": snapshot["time"],
+                "common_only": common_only,
+                "ignore": DEFAULT_DRIFT_IGNORE,
+                "values": flatten_snapshot(snapshot, common_only)
+            }, f, indent=4, ensure_ascii=False)
+        console.print(f"[bold green]✓[/bold green] Baseline saved to: {baseline_file}")
+        console.print("[cyan]Edit its \"ignore\" list to add per-key ignore rules.[/cyan]")
+        input("\nPress Enter to continue...")
+        return
+        
+    baseline_name = choice[len("Scan against: "):]
+    with open(os.path.join(baseline_dir, baseline_name), "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+        
+    snapshots = adb_helper.run_on_devices(capture_snapshot, devices)
+    drifts = {}
+    for serial, snapshot in snapshots.items():
+        if not snapshot or isinstance(snapshot, Exception):
+            console.print(f"[bold red]✗[/bold red] Could not read settings from {serial}")
             continue
+        drifts[serial] = compare_to_baseline(baseline, flatten_snapshot(snapshot, baseline.get("common_only")))
+        
+    show_drift_matrix(baseline_name, baseline, drifts)
+    log.info(f"Scanned {len(drifts)} devices for drift against {baseline_name}")
+    
+    drifted = [serial for serial, drift in drifts.items() if drift]
+    if drifted and questionary.confirm(f"Remediate {len(drifted)} drifted device(s)?", default=False).ask():
+        extra = {
+            key for serial in drifted for key, (expected, _) in drifts[serial].items()
+            if expected is None and key.split("/", 1)[0] in SETTINGS_NAMESPACES
+        }
+        delete_extra = bool(extra) and questionary.confirm(
+            f"Also delete {len(extra)} setting(s) that exist only on devices, not in the baseline?",
+            default=False
+        ).ask()
+        
+        def remediate(serial):
+            # The scan already read the current values, so the fix is a single batched write
+            changes, previous, unfixable, skipped = remediation_changes(drifts[serial], delete_extra)
+            session = None
+            if changes:
+                session = system_settings.apply_settings_transaction(
+                    changes, serial, source=f"drift:{baseline_name}", previous=previous
+                )
+            return len(changes), unfixable, skipped, session
             
-        settings[namespace] = {}
+        for serial, result in adb_helper.run_on_devices(remediate, drifted).items():
+            if isinstance(result, Exception):
+                console.print(f"[bold red]✗[/bold red] {serial}: {result}")
+                continue
+            fixed, unfixable, skipped, session = result
+            if fixed and not session:
+                console.print(f"[bold red]✗[/bold red] {serial}: could not write settings")
+                continue
+            console.print(f"[bold green]✓[/bold green] {serial}: fixed {fixed} key(s)")
+            if unfixable:
+                console.print(f"[yellow]  Read-only, not fixed: {', '.join(unfixable)}[/yellow]")
+            if skipped:
+                console.print(f"[yellow]  Not in baseline, kept: {', '.join(skipped)}[/yellow]")
+            log.info(f"Remediated {fixed} drifted settings on {serial} against {baseline_name}")
+            
+    input("\nPress Enter to continue...")
+
+def backup_settings(backup_file):
+    """
+    Backup system settings
+    
+    Args:
+        backup_file (str): Backup file path
+        
+    Returns:
+        bool: True if successful, False if failed
+    """
+    console.print("[yellow]Backing up system settings...[/yellow]")
+    
+    # Read all namespaces in one adb call
+    snapshot = capture_snapshot()
+    if not snapshot:
+        console.print("[bold red]✗[/bold red] Could not read system settings!")
+        return False
         
-        for line in result.strip().split('\n'):
-            if '=' in line:
-                key, value = line.split('=', 1)
-                settings[namespace][key.strip()] = value.strip()
+    settings = {namespace: snapshot["sections"][namespace] for namespace in SETTINGS_NAMESPACES if snapshot["sections"][namespace]}
     
     # Save to file
     try:
         with open(backup_file, "w", encoding="utf-8") as f:
-            json.dump(settings, f, indent=4, ensure_ascii=False)
+            json.dump(settings, f, separators=(",", ":"), ensure_ascii=False)
             
         console.print(f"[bold green]✓[/bold green] Settings backed up to: {backup_file}")
         log.info(f"Backed up system settings to {backup_file}")
@@ -196,6 +756,8 @@ def custom_command_menu():
                 "2️⃣ Create New Preset",
                 "3️⃣ Backup System Settings",
                 "4️⃣ Restore System Settings",
+                "5️⃣ Settings Snapshots & Diff",
+                "6️⃣ Fleet Settings Drift",
                 "↩️ Back"
             ]
         ).ask()
@@ -231,6 +793,12 @@ def custom_command_menu():
             if backup_file:
                 if ui_helper.confirm_action("Are you sure you want to restore system settings? This may cause data loss."):
                     restore_settings(backup_file)
+                    
+        elif "Settings Snapshots" in choice:
+            snapshot_menu()
+            
+        elif "Fleet Settings Drift" in choice:
+            fleet_drift_menu()
 
 if __name__ == "__main__":
     custom_command_menu() 
\ No newline at end of file
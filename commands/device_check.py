@@ -7,9 +7,10 @@ Module kiểm tra kết nối thiết bị Android
 
 import os
 import re
-import subprocess
+import questionary
 from rich.console import Console
 from rich.table import Table
+from utils import adb_helper
 
 console = Console()
 
@@ -21,7 +22,7 @@ def get_connected_devices():
         list: Danh sách các thiết bị (serial numbers)
     """
     try:
-        result = subprocess.run(
+        result = adb_helper.run_process(
             ["adb", "devices"], 
             capture_output=True, 
             text=True, 
@@ -44,6 +45,30 @@ def get_connected_devices():
         console.print(f"[bold red]Lỗi khi kiểm tra thiết bị: {e}[/bold red]")
         return []
 
+def select_devices(message="Chọn thiết bị:"):
+    """
+    Cho người dùng chọn một hoặc nhiều thiết bị đang kết nối
+
+    Nếu chỉ có một thiết bị thì chọn luôn thiết bị đó mà không hỏi.
+
+    Args:
+        message (str): Câu hỏi hiển thị cho người dùng
+
+    Returns:
+        list: Danh sách serial đã chọn (rỗng nếu không có hoặc bị hủy)
+    """
+    devices = get_connected_devices()
+
+    if len(devices) <= 1:
+        return devices
+
+    selected = questionary.checkbox(
+        message,
+        choices=[questionary.Choice(serial, checked=True) for serial in devices]
+    ).ask()
+
+    return selected or []
+
 def get_device_info(device_id):
     """
     Lấy thông tin chi tiết về thiết bị
@@ -63,7 +88,7 @@ def get_device_info(device_id):
     
     try:
         # Lấy model
-        result = subprocess.run(
+        result = adb_helper.run_process(
             ["adb", "-s", device_id, "shell", "getprop", "ro.product.model"],
             capture_output=True, 
             text=True
@@ -71,7 +96,7 @@ def get_device_info(device_id):
         info["model"] = result.stdout.strip()
         
         # Lấy phiên bản Android
-        result = subprocess.run(
+        result = adb_helper.run_process(
             ["adb", "-s", device_id, "shell", "getprop", "ro.build.version.release"],
             capture_output=True, 
             text=True
@@ -79,7 +104,7 @@ def get_device_info(device_id):
         info["android_version"] = result.stdout.strip()
         
         # Lấy thương hiệu
-        result = subprocess.run(
+        result = adb_helper.run_process(
             ["adb", "-s", device_id, "shell", "getprop", "ro.product.brand"],
             capture_output=True, 
             text=True
@@ -87,7 +112,7 @@ def get_device_info(device_id):
         info["brand"] = result.stdout.strip()
         
         # Lấy thông tin pin
-        result = subprocess.run(
+        result = adb_helper.run_process(
             ["adb", "-s", device_id, "shell", "dumpsys", "battery"],
             capture_output=True, 
             text=True
@@ -13,6 +13,7 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
 from utils import logger
+from utils import adb_helper
 from utils import ui_helper
 
 console = Console()
@@ -29,7 +30,7 @@ def run_adb_command(command):
         str: Command result
     """
     try:
-        result = subprocess.run(
+        result = adb_helper.run_process(
             command,
             capture_output=True,
             text=True,
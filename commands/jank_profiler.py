@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module đo độ giật khung hình (jank) của ứng dụng từ "dumpsys gfxinfo <pkg> framestats"
+"""
+
+import os
+import time
+import struct
+import threading
+from array import array
+import questionary
+from rich.console import Console
+from rich.table import Table
+from utils import logger
+from utils import adb_helper
+from commands import device_check
+
+console = Console()
+log = logger.setup_logger()
+
+# Khoảng thời gian đọc framestats (giây); gfxinfo chỉ giữ khoảng 120 khung hình gần nhất
+POLL_INTERVAL = 1
+
+# Các mốc (ms) của biểu đồ phân bố thời gian khung hình
+HISTOGRAM_EDGES_MS = [8, 12, 16, 20, 25, 33, 50, 100, 250]
+
+# Định dạng file trace: magic, phiên bản, chu kỳ khung hình (µs), số khung hình
+TRACE_MAGIC = b"JANK"
+TRACE_HEADER = struct.Struct("<4sHII")
+TRACE_VERSION = 1
+
+def parse_framestats(output):
+    """
+    Lấy thời điểm IntendedVsync và thời gian vẽ của từng khung hình
+
+    Bỏ qua các khung hình có Flags khác 0 (khung hình không hợp lệ).
+
+    Args:
+        output (str): Output của "dumpsys gfxinfo <pkg> framestats"
+
+    Returns:
+        dict: {IntendedVsync (ns): thời gian khung hình (ns)}
+    """
+    frames = {}
+    columns = None
+    in_profile = False
+
+    for line in (output or "").splitlines():
+        line = line.strip()
+        if line == "---PROFILEDATA---":
+            in_profile = not in_profile
+            columns = None
+            continue
+        if not in_profile or not line:
+            continue
+
+        fields = line.rstrip(",").split(",")
+        if columns is None:
+            columns = {name: idx for idx, name in enumerate(fields)}
+            continue
+
+        try:
+            if int(fields[columns["Flags"]]) != 0:
+                continue
+            start = int(fields[columns["IntendedVsync"]])
+            end = int(fields[columns["FrameCompleted"]])
+        except (KeyError, ValueError, IndexError):
+            continue
+        if end > start:
+            frames[start] = end - start
+
+    return frames
+
+def estimate_frame_interval(vsyncs):
+    """
+    Ước lượng chu kỳ khung hình (ns) từ khoảng cách giữa các IntendedVsync
+
+    Args:
+        vsyncs (list): Các thời điểm IntendedVsync đã sắp xếp
+
+    Returns:
+        int: Chu kỳ khung hình (ns), mặc định 60 Hz nếu không đủ dữ liệu
+    """
+    deltas = sorted(b - a for a, b in zip(vsyncs, vsyncs[1:]) if b > a)
+    if not deltas:
+        return 16666667
+    # Các khung hình liền nhau cách đúng một chu kỳ, lấy phân vị 10% để bỏ qua lúc màn hình đứng yên
+    interval = deltas[len(deltas) // 10]
+    return min(max(interval, 6000000), 34000000)
+
+def percentile(sorted_values, p):
+    """
+    Lấy phân vị p (0-100) theo phương pháp nearest-rank
+
+    Args:
+        sorted_values (list): Dãy giá trị đã sắp xếp
+        p (float): Phân vị
+
+    Returns:
+        float: Giá trị phân vị
+    """
+    if not sorted_values:
+        return 0
+    rank = max(0, -(-int(p * len(sorted_values)) // 100) - 1)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+def analyze_frames(durations_us, frame_interval_us):
+    """
+    Tính thống kê độ giật từ thời gian khung hình
+
+    Args:
+        durations_us (array): Thời gian khung hình (µs)
+        frame_interval_us (int): Chu kỳ khung hình (µs)
+
+    Returns:
+        dict: Số khung hình, p50/p90/p99 (ms), tỉ lệ khung hình giật và biểu đồ phân bố
+    """
+    values = sorted(durations_us)
+    histogram = [0] * (len(HISTOGRAM_EDGES_MS) + 1)
+    janky = 0
+    for value in values:
+        if value > frame_interval_us:
+            janky += 1
+        ms = value / 1000
+        bucket = 0
+        while bucket < len(HISTOGRAM_EDGES_MS) and ms >= HISTOGRAM_EDGES_MS[bucket]:
+            bucket += 1
+        histogram[bucket] += 1
+
+    return {
+        "frames": len(values),
+        "frame_interval_ms": frame_interval_us / 1000,
+        "p50": percentile(values, 50) / 1000,
+        "p90": percentile(values, 90) / 1000,
+        "p99": percentile(values, 99) / 1000,
+        "janky_pct": 100.0 * janky / len(values) if values else 0.0,
+        "histogram": histogram
+    }
+
+def save_trace(path, durations_us, frame_interval_us):
+    """
+    Lưu trace nhị phân gọn (uint32 little-endian µs mỗi khung hình)
+
+    Args:
+        path (str): Đường dẫn file
+        durations_us (array): Thời gian khung hình (µs)
+        frame_interval_us (int): Chu kỳ khung hình (µs)
+    """
+    with open(path, "wb") as f:
+        f.write(TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, frame_interval_us, len(durations_us)))
+        # Ghi bằng struct để định dạng file không phụ thuộc thứ tự byte và kích thước kiểu của máy
+        f.write(struct.pack(f"<{len(durations_us)}I", *durations_us))
+
+def load_trace(path):
+    """
+    Đọc trace đã lưu bằng save_trace
+
+    Args:
+        path (str): Đường dẫn file
+
+    Returns:
+        tuple: (array thời gian khung hình µs, chu kỳ khung hình µs)
+    """
+    with open(path, "rb") as f:
+        header = f.read(TRACE_HEADER.size)
+        if len(header) != TRACE_HEADER.size:
+            raise ValueError(f"File trace bị cắt cụt: {path}")
+        magic, version, frame_interval_us, count = TRACE_HEADER.unpack(header)
+        if magic != TRACE_MAGIC or version != TRACE_VERSION:
+            raise ValueError(f"File trace không hợp lệ: {path}")
+        body = f.read(4 * count)
+        if len(body) != 4 * count:
+            raise ValueError(f"File trace bị cắt cụt: {path}")
+    return array("I", struct.unpack(f"<{count}I", body)), frame_interval_us
+
+def record_frames(package, serial=None):
+    """
+    Đặt lại gfxinfo, đọc framestats định kỳ tới khi người dùng nhấn Enter
+
+    Args:
+        package (str): Tên package
+        serial (str, optional): Serial của thiết bị
+
+    Returns:
+        dict: {IntendedVsync (ns): thời gian khung hình (ns)}
+    """
+    quoted = adb_helper.quote(package)
+    script = (
+        f"dumpsys gfxinfo {quoted} reset >/dev/null\n"
+        f"while true; do\n"
+        f"  dumpsys gfxinfo {quoted} framestats\n"
+        f"  echo @@end\n"
+        f"  sleep {POLL_INTERVAL}\n"
+        f"done\n"
+    )
+    process = adb_helper.open_shell_stream(script, serial)
+    frames = {}
+
+    def read_loop():
+        chunk = []
+        for line in process.stdout:
+            if line.startswith("@@end"):
+                frames.update(parse_framestats("".join(chunk)))
+                chunk = []
+            else:
+                chunk.append(line)
+
+    reader = threading.Thread(target=read_loop, daemon=True)
+    reader.start()
+    input("Hãy thao tác với ứng dụng, nhấn Enter để kết thúc ghi...")
+    # Chờ thêm một lượt đọc để lấy các khung hình cuối
+    time.sleep(POLL_INTERVAL + 0.5)
+    process.kill()
+    reader.join(timeout=2)
+    return frames
+
+def show_analysis(title, stats):
+    """
+    Hiển thị thống kê độ giật
+
+    Args:
+        title (str): Tiêu đề
+        stats (dict): Kết quả từ analyze_frames
+    """
+    console.print(
+        f"[bold cyan]{title}[/bold cyan]: {stats['frames']} khung hình, "
+        f"chu kỳ {stats['frame_interval_ms']:.2f} ms, "
+        f"p50 {stats['p50']:.1f} ms, p90 {stats['p90']:.1f} ms, p99 {stats['p99']:.1f} ms, "
+        f"giật [bold red]{stats['janky_pct']:.1f}%[/bold red]"
+    )
+
+    table = Table(title="Phân bố thời gian khung hình")
+    table.add_column("Khoảng (ms)", style="cyan")
+    table.add_column("Số khung hình", style="yellow")
+    table.add_column("", style="green")
+
+    edges = [0] + HISTOGRAM_EDGES_MS
+    peak = max(stats["histogram"]) or 1
+    for idx, count in enumerate(stats["histogram"]):
+        label = f"{edges[idx]}-{edges[idx + 1]}" if idx + 1 < len(edges) else f">= {edges[idx]}"
+        table.add_row(label, str(count), "█" * int(30 * count / peak))
+    console.print(table)
+
+def jank_profiler_menu(packages):
+    """
+    Menu đo độ giật khung hình
+
+    Args:
+        packages (list): Danh sách package có thể chọn
+    """
+    trace_dir = adb_helper.data_dir("jank")
+    choice = questionary.select(
+        "Chọn chức năng:",
+        choices=[
+            "1️⃣ Ghi và phân tích độ giật",
+            "2️⃣ So sánh hai trace",
+            "↩️ Quay lại"
+        ]
+    ).ask()
+
+    if not choice or "Quay lại" in choice:
+        return
+
+    if "Ghi và phân tích" in choice:
+        if not packages:
+            console.print("[bold red]Không tìm thấy ứng dụng nào![/bold red]")
+            return
+
+        package = questionary.select("Chọn ứng dụng:", choices=packages).ask()
+        devices = device_check.select_devices("Chọn thiết bị:")
+        if not package or not devices:
+            return
+        serial = devices[0]
+
+        frames = record_frames(package, serial)
+        if not frames:
+            console.print("[bold red]Không ghi được khung hình nào! Hãy chắc chắn ứng dụng đang hiển thị.[/bold red]")
+            return
+
+        vsyncs = sorted(frames)
+        frame_interval_us = estimate_frame_interval(vsyncs) // 1000
+        durations = array("I", (min(frames[v] // 1000, 0xFFFFFFFF) for v in vsyncs))
+
+        stats = analyze_frames(durations, frame_interval_us)
+        show_analysis(package, stats)
+
+        trace_file = os.path.join(trace_dir, f"{package}_{time.strftime('%Y%m%d_%H%M%S')}.jank")
+        save_trace(trace_file, durations, frame_interval_us)
+        console.print(f"[green]Đã lưu trace: {trace_file}[/green]")
+        log.info(f"Đã đo độ giật {package}: {stats['frames']} khung hình, giật {stats['janky_pct']:.1f}%")
+
+    elif "So sánh" in choice:
+        traces = sorted(f for f in os.listdir(trace_dir) if f.endswith(".jank"))
+        if len(traces) < 2:
+            console.print("[yellow]Cần ít nhất hai trace để so sánh.[/yellow]")
+            return
+
+        first = questionary.select("Trace thứ nhất:", choices=traces).ask()
+        second = questionary.select("Trace thứ hai:", choices=[t for t in traces if t != first]).ask()
+        if not first or not second:
+            return
+
+        results = []
+        for name in (first, second):
+            try:
+                durations, frame_interval_us = load_trace(os.path.join(trace_dir, name))
+            except (OSError, ValueError) as e:
+                console.print(f"[bold red]✗[/bold red] {e}")
+                return
+            results.append(analyze_frames(durations, frame_interval_us))
+
+        table = Table(title="So sánh độ giật")
+        table.add_column("Chỉ số", style="cyan")
+        table.add_column(first, style="yellow")
+        table.add_column(second, style="yellow")
+        for key, label in (("frames", "Số khung hình"), ("p50", "p50 (ms)"), ("p90", "p90 (ms)"),
+                           ("p99", "p99 (ms)"), ("janky_pct", "Giật (%)")):
+            table.add_row(label, f"{results[0][key]:.1f}", f"{results[1][key]:.1f}")
+        console.print(table)
+
+    input("\nNhấn Enter để tiếp tục...")
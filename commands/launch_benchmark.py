@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module đo thời gian khởi động ứng dụng (cold/warm start) bằng "am start -W"
+"""
+
+import os
+import re
+import json
+import time
+import statistics
+import questionary
+from rich.console import Console
+from rich.table import Table
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
+from utils import logger
+from utils import adb_helper
+
+console = Console()
+log = logger.setup_logger()
+
+# Thời gian chờ (giây) để ứng dụng vẽ xong trước khi về màn hình chính
+SETTLE_SECONDS = 2
+
+def get_results_file():
+    """
+    Lấy đường dẫn file lưu kết quả đo
+
+    Returns:
+        str: Đường dẫn file JSONL
+    """
+    return os.path.join(adb_helper.data_dir("benchmarks"), "launch_benchmarks.jsonl")
+
+def resolve_launch_component(package, serial=None):
+    """
+    Tìm activity khởi động (launcher) của ứng dụng
+
+    Args:
+        package (str): Tên package
+        serial (str, optional): Serial của thiết bị
+
+    Returns:
+        str: Component dạng "package/activity", hoặc None nếu không tìm thấy
+    """
+    result = adb_helper.run_adb(
+        ["shell", "cmd", "package", "resolve-activity", "--brief",
+         "-c", "android.intent.category.LAUNCHER", package],
+        serial=serial
+    )
+    if not result:
+        return None
+
+    for line in reversed(result.stdout.strip().splitlines()):
+        if "/" in line:
+            return line.strip()
+    return None
+
+def parse_start_output(output):
+    """
+    Lấy TotalTime và WaitTime từ output của "am start -W"
+
+    Args:
+        output (str): Output của lệnh
+
+    Returns:
+        dict: {"total": ms, "wait": ms}, giá trị None nếu không có
+    """
+    times = {"total": None, "wait": None}
+    for key, name in (("total", "TotalTime"), ("wait", "WaitTime")):
+        match = re.search(rf"{name}:\s*(\d+)", output or "")
+        if match:
+            times[key] = int(match.group(1))
+    return times
+
+def build_benchmark_script(package, component, iterations):
+    """
+    Tạo script chạy toàn bộ các vòng đo cold/warm trong một lệnh adb
+
+    Args:
+        package (str): Tên package
+        component (str): Activity khởi động
+        iterations (int): Số vòng đo
+
+    Returns:
+        str: Nội dung script
+    """
+    package = adb_helper.quote(package)
+    component = adb_helper.quote(component)
+    lines = []
+    for i in range(iterations):
+        lines += [
+            f"am force-stop {package}",
+            "sleep 1",
+            f"echo @@cold_{i}",
+            f"am start -W -n {component} 2>&1",
+            f"sleep {SETTLE_SECONDS}",
+            "input keyevent 3",
+            "sleep 1",
+            f"echo @@warm_{i}",
+            f"am start -W -n {component} 2>&1",
+            f"sleep {SETTLE_SECONDS}",
+            "input keyevent 3"
+        ]
+    return "\n".join(lines)
+
+def summarize(values):
+    """
+    Tính median, p90 và phương sai của các lần đo
+
+    Args:
+        values (list): Các giá trị (ms)
+
+    Returns:
+        dict: {"count", "median", "p90", "variance"}
+    """
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return {"count": 0, "median": None, "p90": None, "variance": None}
+
+    # p90 theo phương pháp nearest-rank
+    p90_index = max(0, -(-9 * len(values) // 10) - 1)
+    return {
+        "count": len(values),
+        "median": statistics.median(values),
+        "p90": values[p90_index],
+        "variance": statistics.variance(values) if len(values) > 1 else 0.0
+    }
+
+def benchmark_app(package, iterations=5, serial=None):
+    """
+    Đo thời gian khởi động cold/warm của một ứng dụng
+
+    Args:
+        package (str): Tên package
+        iterations (int): Số vòng đo
+        serial (str, optional): Serial của thiết bị
+
+    Returns:
+        dict: {"cold": {"total": [...], "wait": [...]}, "warm": {...}}, hoặc None nếu thất bại
+    """
+    component = resolve_launch_component(package, serial)
+    if not component:
+        console.print(f"[bold red]Không tìm thấy activity khởi động của {package}![/bold red]")
+        return None
+
+    script = build_benchmark_script(package, component, iterations)
+    timeout = iterations * (2 * SETTLE_SECONDS + 20)
+    output = adb_helper.run_shell_script(script, serial=serial, timeout=timeout)
+    blocks = adb_helper.parse_marked_output(output)
+
+    samples = {"cold": {"total": [], "wait": []}, "warm": {"total": [], "wait": []}}
+    for name, text in blocks.items():
+        kind = name.split("_")[0]
+        if kind not in samples:
+            continue
+        times = parse_start_output(text)
+        for key in ("total", "wait"):
+            if times[key] is not None:
+                samples[kind][key].append(times[key])
+
+    if not samples["cold"]["total"] and not samples["warm"]["total"]:
+        console.print(f"[bold red]Không đo được thời gian khởi động của {package}![/bold red]")
+        return None
+    return samples
+
+def save_benchmark(label, serial, package, iterations, samples):
+    """
+    Lưu kết quả đo vào file JSONL để so sánh về sau
+
+    Args:
+        label (str): Nhãn của lần đo (ví dụ "truoc-toi-uu")
+        serial (str): Serial của thiết bị
+        package (str): Tên package
+        iterations (int): Số vòng đo
+        samples (dict): Kết quả từ benchmark_app
+    """
+    record = {
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "label": label,
+        "serial": serial,
+        "package": package,
+        "iterations": iterations,
+        "samples": samples
+    }
+    with open(get_results_file(), "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+def load_benchmarks():
+    """
+    Đọc tất cả kết quả đo đã lưu
+
+    Returns:
+        list: Danh sách bản ghi
+    """
+    results_file = get_results_file()
+    if not os.path.exists(results_file):
+        return []
+
+    records = []
+    with open(results_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
+
+def format_ms(value):
+    """Định dạng giá trị mili giây để hiển thị"""
+    return "-" if value is None else f"{value:.0f}"
+
+def show_benchmark(package, samples):
+    """
+    Hiển thị thống kê đo của một ứng dụng
+
+    Args:
+        package (str): Tên package
+        samples (dict): Kết quả từ benchmark_app
+    """
+    table = Table(title=f"Thời gian khởi động: {package}")
+    table.add_column("Kiểu", style="cyan")
+    table.add_column("Chỉ số", style="green")
+    table.add_column("Số lần", style="magenta")
+    table.add_column("Median (ms)", style="yellow")
+    table.add_column("p90 (ms)", style="yellow")
+    table.add_column("Phương sai", style="blue")
+
+    for kind in ("cold", "warm"):
+        for key, name in (("total", "TotalTime"), ("wait", "WaitTime")):
+            stats = summarize(samples[kind][key])
+            table.add_row(
+                kind, name, str(stats["count"]),
+                format_ms(stats["median"]), format_ms(stats["p90"]),
+                format_ms(stats["variance"])
+            )
+
+    console.print(table)
+
+def compare_benchmarks(label_a, label_b, records=None):
+    """
+    So sánh median TotalTime giữa hai nhãn đo
+
+    Args:
+        label_a (str): Nhãn lần đo trước
+        label_b (str): Nhãn lần đo sau
+        records (list, optional): Bản ghi đã đọc sẵn
+
+    Returns:
+        list: [(serial, package, kiểu, median trước, median sau, chênh lệch)]
+    """
+    records = records if records is not None else load_benchmarks()
+
+    def latest(label):
+        runs = {}
+        for record in records:
+            if record["label"] == label:
+                runs[(record["serial"], record["package"])] = record
+        return runs
+
+    before, after = latest(label_a), latest(label_b)
+    rows = []
+    for key in sorted(set(before) & set(after), key=lambda k: (str(k[0]), k[1])):
+        for kind in ("cold", "warm"):
+            a = summarize(before[key]["samples"][kind]["total"])["median"]
+            b = summarize(after[key]["samples"][kind]["total"])["median"]
+            delta = b - a if a is not None and b is not None else None
+            rows.append((key[0], key[1], kind, a, b, delta))
+    return rows
+
+def benchmark_menu(packages):
+    """
+    Menu đo thời gian khởi động ứng dụng
+
+    Args:
+        packages (list): Danh sách package có thể chọn
+    """
+    choice = questionary.select(
+        "Chọn chức năng:",
+        choices=[
+            "1️⃣ Đo thời gian khởi động",
+            "2️⃣ So sánh hai lần đo",
+            "↩️ Quay lại"
+        ]
+    ).ask()
+
+    if not choice or "Quay lại" in choice:
+        return
+
+    if "Đo thời gian" in choice:
+        if not packages:
+            console.print("[bold red]Không tìm thấy ứng dụng nào![/bold red]")
+            return
+
+        selected = questionary.checkbox("Chọn ứng dụng cần đo:", choices=packages).ask()
+        if not selected:
+            return
+
+        iterations = questionary.text("Số vòng đo mỗi ứng dụng:", default="5").ask()
+        label = questionary.text("Nhãn cho lần đo (ví dụ: truoc-toi-uu):", default=time.strftime("%Y%m%d_%H%M")).ask()
+        if not iterations or not iterations.isdigit() or not label:
+            return
+        iterations = int(iterations)
+
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+        ) as progress:
+            task = progress.add_task("[green]Đang đo...", total=len(selected))
+            results = {}
+            for package in selected:
+                progress.update(task, description=f"[green]Đang đo: {package}")
+                samples = benchmark_app(package, iterations)
+                if samples:
+                    save_benchmark(label, None, package, iterations, samples)
+                    results[package] = samples
+                progress.advance(task)
+
+        for package, samples in results.items():
+            show_benchmark(package, samples)
+        log.info(f"Đã đo thời gian khởi động {len(results)} ứng dụng (nhãn {label})")
+
+    elif "So sánh" in choice:
+        records = load_benchmarks()
+        labels = sorted({r["label"] for r in records})
+        if len(labels) < 2:
+            console.print("[yellow]Cần ít nhất hai lần đo để so sánh.[/yellow]")
+            return
+
+        label_a = questionary.select("Lần đo trước:", choices=labels).ask()
+        label_b = questionary.select("Lần đo sau:", choices=[l for l in labels if l != label_a]).ask()
+        if not label_a or not label_b:
+            return
+
+        table = Table(title=f"So sánh median TotalTime: {label_a} → {label_b}")
+        table.add_column("Ứng dụng", style="cyan")
+        table.add_column("Kiểu", style="green")
+        table.add_column(label_a, style="yellow")
+        table.add_column(label_b, style="yellow")
+        table.add_column("Chênh lệch (ms)", style="magenta")
+
+        for serial, package, kind, a, b, delta in compare_benchmarks(label_a, label_b, records):
+            color = "green" if delta is not None and delta < 0 else "red"
+            table.add_row(
+                package, kind, format_ms(a), format_ms(b),
+                f"[{color}]{'+' if delta and delta > 0 else ''}{format_ms(delta)}[/{color}]"
+            )
+
+        console.print(table)
+
+    input("\nNhấn Enter để tiếp tục...")
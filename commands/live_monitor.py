@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module theo dõi hiệu năng thiết bị trực tiếp (CPU, RAM, FPS, nhiệt độ)
+"""
+
+import re
+import time
+import threading
+from collections import deque
+import questionary
+from rich.console import Console
+from rich.live import Live
+from rich.table import Table
+from utils import logger
+from utils import adb_helper
+from commands import device_check
+
+console = Console()
+log = logger.setup_logger()
+
+# Số mẫu giữ lại cho mỗi chỉ số (60 mẫu ~ 1 phút ở 1 Hz)
+HISTORY_SIZE = 60
+
+# Ký tự dùng để vẽ sparkline
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+def build_sampler_script(interval=1, package=None, extra_sections=None):
+    """
+    Tạo script lấy mẫu lặp vô hạn, chạy trong một shell duy nhất trên thiết bị
+
+    Mỗi mẫu gồm các khối "@@tên" và kết thúc bằng dòng "@@end".
+
+    Args:
+        interval (float): Khoảng thời gian giữa hai mẫu (giây)
+        package (str, optional): Package cần đo số khung hình
+        extra_sections (dict, optional): {tên khối: lệnh shell} bổ sung
+
+    Returns:
+        str: Nội dung script
+    """
+    sections = {
+        "cpu": "head -n 1 /proc/stat",
+        "mem": "grep -E '^(MemTotal|MemAvailable|SwapTotal|SwapFree):' /proc/meminfo",
+        "battery": "dumpsys battery | grep -E '^ +(level|temperature|voltage|status):'",
+        "thermal": "cat /sys/class/thermal/thermal_zone*/temp 2>/dev/null"
+    }
+    if package:
+        sections["frames"] = f"dumpsys gfxinfo {adb_helper.quote(package)} | grep -E 'Total frames rendered|Janky frames'"
+    sections.update(extra_sections or {})
+
+    body = "\n".join(f"  echo @@{name}\n  {command}" for name, command in sections.items())
+    return f"while true; do\n{body}\n  echo @@end\n  sleep {interval}\ndone\n"
+
+def parse_sample(sections):
+    """
+    Chuyển các khối của một mẫu thành giá trị số
+
+    Args:
+        sections (dict): {tên khối: nội dung}
+
+    Returns:
+        dict: Giá trị thô của mẫu (None nếu không đọc được)
+    """
+    sample = {
+        "cpu_total": None, "cpu_idle": None,
+        "mem_total": None, "mem_available": None,
+        "swap_total": None, "swap_free": None,
+        "battery_level": None, "battery_temp": None, "battery_voltage": None,
+        "thermal_max": None, "frames": None, "janky_frames": None
+    }
+
+    cpu = sections.get("cpu", "").split()
+    if len(cpu) > 5 and cpu[0] == "cpu":
+        values = [int(v) for v in cpu[1:] if v.isdigit()]
+        sample["cpu_total"] = sum(values)
+        sample["cpu_idle"] = values[3] + values[4]  # idle + iowait
+
+    mem_keys = {"MemTotal": "mem_total", "MemAvailable": "mem_available",
+                "SwapTotal": "swap_total", "SwapFree": "swap_free"}
+    for match in re.finditer(r"(\w+):\s+(\d+)", sections.get("mem", "")):
+        if match.group(1) in mem_keys:
+            sample[mem_keys[match.group(1)]] = int(match.group(2))
+
+    battery_keys = {"level": "battery_level", "temperature": "battery_temp", "voltage": "battery_voltage"}
+    for match in re.finditer(r"(\w+):\s+(-?\d+)", sections.get("battery", "")):
+        if match.group(1) in battery_keys:
+            sample[battery_keys[match.group(1)]] = int(match.group(2))
+
+    temps = [int(v) for v in sections.get("thermal", "").split() if v.lstrip("-").isdigit()]
+    # Một số vùng nhiệt báo theo mili độ C, số khác theo độ C
+    temps = [t / 1000 if abs(t) >= 1000 else float(t) for t in temps]
+    temps = [t for t in temps if 0 < t < 150]
+    if temps:
+        sample["thermal_max"] = max(temps)
+
+    frames = sections.get("frames", "")
+    match = re.search(r"Total frames rendered:\s*(\d+)", frames)
+    if match:
+        sample["frames"] = int(match.group(1))
+    match = re.search(r"Janky frames:\s*(\d+)", frames)
+    if match:
+        sample["janky_frames"] = int(match.group(1))
+
+    return sample
+
+def iter_samples(process):
+    """
+    Đọc từng mẫu từ output của script lấy mẫu
+
+    Args:
+        process (subprocess.Popen): Tiến trình từ adb_helper.open_shell_stream
+
+    Yields:
+        tuple: (thời điểm nhận mẫu, dict các khối)
+    """
+    sections = {}
+    name = None
+    for line in process.stdout:
+        line = line.rstrip("\n")
+        if line == "@@end":
+            yield time.time(), sections
+            sections = {}
+            name = None
+        elif line.startswith("@@"):
+            name = line[2:]
+            sections[name] = ""
+        elif name is not None:
+            sections[name] += line + "\n"
+
+def sparkline(values, minimum=None, maximum=None):
+    """
+    Vẽ sparkline từ dãy giá trị
+
+    Args:
+        values (iterable): Các giá trị
+        minimum (float, optional): Giá trị nhỏ nhất của thang đo
+        maximum (float, optional): Giá trị lớn nhất của thang đo
+
+    Returns:
+        str: Chuỗi sparkline
+    """
+    values = list(values)
+    if not values:
+        return ""
+    low = min(values) if minimum is None else minimum
+    high = max(values) if maximum is None else maximum
+    span = (high - low) or 1
+    return "".join(
+        SPARK_CHARS[min(len(SPARK_CHARS) - 1, max(0, int((v - low) / span * (len(SPARK_CHARS) - 1))))]
+        for v in values
+    )
+
+class DeviceMonitor:
+    """Lấy mẫu liên tục từ một thiết bị và lưu vào các ring buffer"""
+
+    def __init__(self, serial, interval=1, package=None):
+        self.serial = serial
+        self.interval = interval
+        self.package = package
+        self.history = {name: deque(maxlen=HISTORY_SIZE) for name in ("cpu", "mem", "fps", "battery_temp", "thermal")}
+        self.latest = {}
+        self._previous = None
+        self._process = None
+        self._thread = None
+
+    def start(self):
+        """Khởi động shell lấy mẫu và luồng đọc"""
+        script = build_sampler_script(self.interval, self.package)
+        self._process = adb_helper.open_shell_stream(script, self.serial)
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Dừng shell lấy mẫu"""
+        if self._process and self._process.poll() is None:
+            self._process.kill()
+
+    def _read_loop(self):
+        for timestamp, sections in iter_samples(self._process):
+            self._add_sample(timestamp, parse_sample(sections))
+
+    def _add_sample(self, timestamp, sample):
+        previous, self._previous = self._previous, (timestamp, sample)
+        self.latest = sample
+
+        if sample["mem_total"] and sample["mem_available"] is not None:
+            self.history["mem"].append(100.0 * (1 - sample["mem_available"] / sample["mem_total"]))
+        if sample["battery_temp"] is not None:
+            self.history["battery_temp"].append(sample["battery_temp"] / 10)
+        if sample["thermal_max"] is not None:
+            self.history["thermal"].append(sample["thermal_max"])
+
+        if previous is None:
+            return
+
+        # CPU và FPS tính từ chênh lệch giữa hai mẫu liên tiếp
+        prev_time, prev = previous
+        if sample["cpu_total"] is not None and prev["cpu_total"] is not None:
+            total = sample["cpu_total"] - prev["cpu_total"]
+            idle = sample["cpu_idle"] - prev["cpu_idle"]
+            if total > 0:
+                self.history["cpu"].append(100.0 * (total - idle) / total)
+        if sample["frames"] is not None and prev["frames"] is not None:
+            elapsed = timestamp - prev_time
+            if elapsed > 0:
+                self.history["fps"].append(max(0, sample["frames"] - prev["frames"]) / elapsed)
+
+def format_metric(history, unit, minimum=None, maximum=None):
+    """
+    Định dạng một chỉ số gồm giá trị hiện tại và sparkline
+
+    Args:
+        history (deque): Ring buffer của chỉ số
+        unit (str): Đơn vị hiển thị
+        minimum (float, optional): Giá trị nhỏ nhất của thang đo
+        maximum (float, optional): Giá trị lớn nhất của thang đo
+
+    Returns:
+        str: Chuỗi hiển thị
+    """
+    if not history:
+        return "-"
+    return f"{history[-1]:5.1f}{unit} {sparkline(list(history)[-20:], minimum, maximum)}"
+
+def render_monitors(monitors):
+    """
+    Tạo bảng hiển thị trạng thái hiện tại của các thiết bị
+
+    Args:
+        monitors (list): Danh sách DeviceMonitor
+
+    Returns:
+        Table: Bảng rich
+    """
+    table = Table(title="Theo dõi hiệu năng trực tiếp (Ctrl+C để dừng)")
+    table.add_column("Thiết bị", style="cyan")
+    table.add_column("CPU", style="green")
+    table.add_column("RAM", style="magenta")
+    table.add_column("FPS", style="yellow")
+    table.add_column("Pin", style="blue")
+    table.add_column("Nhiệt độ", style="red")
+
+    for monitor in monitors:
+        level = monitor.latest.get("battery_level")
+        table.add_row(
+            monitor.serial,
+            format_metric(monitor.history["cpu"], "%", 0, 100),
+            format_metric(monitor.history["mem"], "%", 0, 100),
+            format_metric(monitor.history["fps"], "", 0, 120) if monitor.package else "-",
+            f"{level}% {format_metric(monitor.history['battery_temp'], '°C')}" if level is not None else "-",
+            format_metric(monitor.history["thermal"], "°C")
+        )
+    return table
+
+def live_monitor_menu():
+    """Menu theo dõi hiệu năng trực tiếp trên một hoặc nhiều thiết bị"""
+    devices = device_check.select_devices("Chọn thiết bị cần theo dõi:")
+    if not devices:
+        console.print("[bold red]Không có thiết bị nào được chọn![/bold red]")
+        return
+
+    package = questionary.text("Package cần đo FPS (để trống nếu không cần):").ask()
+    monitors = [DeviceMonitor(serial, package=package or None) for serial in devices]
+
+    for monitor in monitors:
+        monitor.start()
+    log.info(f"Bắt đầu theo dõi hiệu năng trực tiếp trên {len(monitors)} thiết bị")
+
+    try:
+        with Live(render_monitors(monitors), console=console, refresh_per_second=2) as live:
+            while True:
+                time.sleep(0.5)
+                live.update(render_monitors(monitors))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for monitor in monitors:
+            monitor.stop()
+
+    console.print("[yellow]Đã dừng theo dõi.[/yellow]")
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module bảo trì tự động theo lịch cho nhiều thiết bị (chạy nền, không cần giao diện)
+
+Lịch và công việc được cấu hình trong config/maintenance.json:
+    python -m commands.maintenance_daemon run             # chạy theo lịch
+    python -m commands.maintenance_daemon run --once      # chạy mọi công việc một lần rồi thoát
+    python -m commands.maintenance_daemon history         # xem lịch sử
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from rich.console import Console
+from rich.table import Table
+from utils import logger
+from utils import adb_helper
+from commands import device_check
+from commands import system_settings
+from commands import performance_boost
+from commands import telemetry_recorder
+
+console = Console()
+log = logger.setup_logger()
+
+# Giới hạn giá trị của từng trường trong biểu thức cron: phút, giờ, ngày, tháng, thứ
+CRON_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+# Số phút tối đa được chạy bù khi vòng lặp bị trễ (máy ngủ, adb treo)
+MAX_CATCHUP_MINUTES = 60
+
+def get_config_file():
+    """
+    Lấy đường dẫn file cấu hình bảo trì
+
+    Returns:
+        str: Đường dẫn file JSON
+    """
+    return adb_helper.config_path("maintenance.json")
+
+def get_history_file():
+    """
+    Lấy đường dẫn file lịch sử bảo trì
+
+    Returns:
+        str: Đường dẫn file JSONL
+    """
+    return os.path.join(adb_helper.data_dir(), "maintenance_history.jsonl")
+
+def load_config(path=None):
+    """
+    Đọc cấu hình bảo trì và kiểm tra lịch của từng công việc
+
+    Args:
+        path (str, optional): Đường dẫn file cấu hình khác
+
+    Returns:
+        dict: Cấu hình, mỗi công việc có thêm khóa "cron" đã phân tích
+
+    Raises:
+        ValueError: Nếu loại công việc hoặc lịch không hợp lệ
+    """
+    with open(path or get_config_file(), "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    for job in config.get("jobs", []):
+        if job.get("type") not in JOB_TYPES:
+            raise ValueError(f"Loại công việc không hợp lệ: {job.get('type')}")
+        job["cron"] = parse_cron(job["schedule"])
+        job.setdefault("options", {})
+    return config
+
+def parse_cron_field(field, low, high):
+    """
+    Phân tích một trường cron ("*", "*/15", "1-5", "0,30", "8-18/2")
+
+    Args:
+        field (str): Trường cần phân tích
+        low (int): Giá trị nhỏ nhất
+        high (int): Giá trị lớn nhất
+
+    Returns:
+        set: Các giá trị khớp
+    """
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step = part.split("/")
+            step = int(step)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(v) for v in part.split("-"))
+        else:
+            start = end = int(part)
+        if start < low or end > high or step < 1:
+            raise ValueError(f"Giá trị cron ngoài phạm vi: {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+def parse_cron(expression):
+    """
+    Phân tích biểu thức cron 5 trường (phút giờ ngày tháng thứ, 0 là Chủ nhật)
+
+    Args:
+        expression (str): Biểu thức cron
+
+    Returns:
+        list: Tập giá trị khớp của từng trường
+
+    Raises:
+        ValueError: Nếu biểu thức không hợp lệ
+    """
+    fields = expression.split()
+    if len(fields) != 5:
+        raise ValueError(f"Biểu thức cron phải có 5 trường: {expression}")
+    return [parse_cron_field(field, low, high) for field, (low, high) in zip(fields, CRON_RANGES)]
+
+def cron_matches(cron, moment):
+    """
+    Kiểm tra một thời điểm có khớp lịch cron không
+
+    Như cron chuẩn: nếu cả trường ngày trong tháng và thứ trong tuần đều bị giới hạn
+    (không phải toàn bộ phạm vi), thời điểm khớp khi thỏa một trong hai trường.
+
+    Args:
+        cron (list): Kết quả từ parse_cron
+        moment (time.struct_time): Thời điểm cần kiểm tra
+
+    Returns:
+        bool: True nếu khớp
+    """
+    minutes, hours, days, months, weekdays = cron
+    # struct_time: tm_wday 0 là thứ Hai, cron: 0 là Chủ nhật
+    weekday = (moment.tm_wday + 1) % 7
+    if not (moment.tm_min in minutes and moment.tm_hour in hours and moment.tm_mon in months):
+        return False
+
+    day_restricted = len(days) < CRON_RANGES[2][1] - CRON_RANGES[2][0] + 1
+    weekday_restricted = len(weekdays) < CRON_RANGES[4][1] - CRON_RANGES[4][0] + 1
+    if day_restricted and weekday_restricted:
+        return moment.tm_mday in days or weekday in weekdays
+    return moment.tm_mday in days and weekday in weekdays
+
+def job_clear_cache(serial, options):
+    """Dọn cache của mọi ứng dụng bằng một lệnh pm trim-caches, trả về dung lượng giải phóng"""
+    script = (
+        "df -k /data | tail -n 1\n"
+        f"pm trim-caches {adb_helper.quote(options.get('target', '999G'))}\n"
+        "df -k /data | tail -n 1\n"
+    )
+    output = adb_helper.run_shell_script(script, serial=serial)
+    if output is None:
+        raise RuntimeError("Không thể chạy pm trim-caches")
+    free = [int(line.split()[3]) for line in output.splitlines() if len(line.split()) >= 4 and line.split()[3].isdigit()]
+    return {"freed_kb": free[-1] - free[0] if len(free) >= 2 else None}
+
+def job_kill_background(serial, options):
+    """Dừng các ứng dụng nền chiếm nhiều tài nguyên nhất"""
+    stopped = performance_boost.kill_background_apps(
+        serial, top_n=options.get("top_n"), interactive=False, rank_by=options.get("rank_by", "rss")
+    )
+    return {"stopped": stopped}
+
+def job_settings_drift(serial, options):
+    """Ghi lại các cài đặt đã bị thay đổi khỏi giá trị mong muốn"""
+    desired = {}
+    if options.get("profile"):
+        desired.update(performance_boost.get_tweak_profiles()[options["profile"]])
+    for name, value in options.get("settings", {}).items():
+        namespace, key = name.split("/", 1)
+        desired[(namespace, key)] = value
+
+    current = system_settings.get_settings_batch(list(desired), serial)
+    drifted = {k: v for k, v in desired.items() if current.get(k) != v}
+    if drifted and not system_settings.apply_settings_transaction(
+            drifted, serial, source=f"maintenance:{options.get('profile') or 'settings'}"):
+        raise RuntimeError("Không thể ghi cài đặt")
+    return {"fixed": [f"{namespace}/{key}" for namespace, key in drifted]}
+
+def job_telemetry(serial, options):
+    """Ghi telemetry pin/nhiệt độ trong một khoảng thời gian"""
+    stop_event = threading.Event()
+    timer = threading.Timer(options.get("duration", 60), stop_event.set)
+    timer.start()
+    writers = {}
+    try:
+        telemetry_recorder.record_device(serial, options.get("interval", 5), stop_event, writers)
+    finally:
+        timer.cancel()
+    return {"recorded": True}
+
+# Loại công việc -> hàm thực hiện (serial, options) -> dict kết quả
+JOB_TYPES = {
+    "clear_cache": job_clear_cache,
+    "kill_background": job_kill_background,
+    "settings_drift": job_settings_drift,
+    "telemetry": job_telemetry
+}
+
+def record_history(entry):
+    """
+    Ghi một lần chạy công việc vào lịch sử
+
+    Args:
+        entry (dict): Thông tin lần chạy
+    """
+    with open(get_history_file(), "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+def load_history(limit=None):
+    """
+    Đọc lịch sử bảo trì
+
+    Args:
+        limit (int, optional): Chỉ lấy số mục mới nhất
+
+    Returns:
+        list: Các mục theo thứ tự ghi
+    """
+    history_file = get_history_file()
+    if not os.path.exists(history_file):
+        return []
+    with open(history_file, "r", encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    return entries[-limit:] if limit else entries
+
+class MaintenanceScheduler:
+    """
+    Chạy công việc bảo trì theo lịch trên mọi thiết bị, giới hạn số việc song song
+
+    Mỗi thiết bị có một hàng đợi riêng, được xử lý bởi tối đa jobs_per_device luồng.
+    Việc của một thiết bị đang bận nằm chờ trong hàng đợi chứ không giữ luồng của
+    pool, nên max_parallel_devices thực sự là số thiết bị được xử lý cùng lúc.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.executor = ThreadPoolExecutor(max_workers=config.get("max_parallel_devices", adb_helper.MAX_PARALLEL_DEVICES))
+        self.pending = {}
+        self.active = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+    def _drain(self, serial):
+        """Chạy lần lượt các việc trong hàng đợi của một thiết bị cho tới khi hết"""
+        while True:
+            with self.lock:
+                queue = self.pending[serial]
+                if not queue or self.stop_event.is_set():
+                    self.active[serial] -= 1
+                    return
+                job, future = queue.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self.run_job(job, serial))
+            except Exception as e:
+                future.set_exception(e)
+
+    def run_job(self, job, serial):
+        """
+        Chạy một công việc trên một thiết bị sau một khoảng trễ ngẫu nhiên
+
+        Args:
+            job (dict): Công việc trong cấu hình
+            serial (str): Serial của thiết bị
+
+        Returns:
+            dict: Mục lịch sử của lần chạy
+        """
+        # Trễ ngẫu nhiên để các thiết bị không cùng gọi adb một lúc qua hub USB
+        if self.stop_event.wait(random.uniform(0, self.config.get("jitter_seconds", 0))):
+            return None
+
+        with logger.action_scope(f"maintenance:{job['name']}"):
+            started = time.time()
+            entry = {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "job": job["name"], "type": job["type"], "serial": serial}
+            try:
+                entry["result"] = JOB_TYPES[job["type"]](serial, job["options"])
+                entry["status"] = "ok"
+            except Exception as e:
+                entry["status"] = "error"
+                entry["error"] = str(e)
+                log.error(f"Bảo trì '{job['name']}' trên {serial} lỗi: {e}")
+            entry["duration"] = round(time.time() - started, 2)
+
+        record_history(entry)
+        log.info(f"Bảo trì '{job['name']}' trên {serial}: {entry['status']} ({entry['duration']}s)")
+        return entry
+
+    def dispatch(self, jobs):
+        """
+        Gửi các công việc cho mọi thiết bị đang kết nối
+
+        Args:
+            jobs (list): Các công việc cần chạy
+
+        Returns:
+            list: Các Future đã gửi
+        """
+        devices = device_check.get_connected_devices()
+        futures = []
+        with self.lock:
+            for serial in devices:
+                queue = self.pending.setdefault(serial, deque())
+                for job in jobs:
+                    future = Future()
+                    queue.append((job, future))
+                    futures.append(future)
+                # Chỉ thêm luồng xử lý khi thiết bị chưa đủ jobs_per_device luồng
+                while self.active.get(serial, 0) < min(self.config.get("jobs_per_device", 1), len(queue)):
+                    self.active[serial] = self.active.get(serial, 0) + 1
+                    self.executor.submit(self._drain, serial)
+        return futures
+
+    def run_once(self):
+        """
+        Chạy mọi công việc một lần trên mọi thiết bị và chờ hoàn tất
+
+        Returns:
+            list: Các mục lịch sử
+        """
+        futures = self.dispatch(self.config.get("jobs", []))
+        return [future.result() for future in futures]
+
+    def run_forever(self):
+        """Vòng lặp chính: kiểm tra lịch mỗi phút, chạy bù các phút bị lỡ"""
+        last_minute = int(time.time() // 60)
+        log.info(f"Bắt đầu bảo trì tự động với {len(self.config.get('jobs', []))} công việc")
+        try:
+            while not self.stop_event.is_set():
+                self.stop_event.wait(60 - time.time() % 60)
+                now_minute = int(time.time() // 60)
+                due = []
+                for minute in range(max(last_minute + 1, now_minute - MAX_CATCHUP_MINUTES + 1), now_minute + 1):
+                    moment = time.localtime(minute * 60)
+                    due.extend(job for job in self.config.get("jobs", []) if cron_matches(job["cron"], moment) and job not in due)
+                last_minute = now_minute
+                if due:
+                    self.dispatch(due)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Dừng nhận việc mới và chờ các việc đang chạy kết thúc"""
+        self.stop_event.set()
+        with self.lock:
+            for queue in self.pending.values():
+                for _, future in queue:
+                    future.cancel()
+                queue.clear()
+        self.executor.shutdown(wait=True)
+        log.info("Đã dừng bảo trì tự động")
+
+def show_history(limit=30):
+    """
+    Hiển thị lịch sử bảo trì gần nhất
+
+    Args:
+        limit (int): Số mục hiển thị
+    """
+    entries = load_history(limit)
+    if not entries:
+        console.print("[yellow]Chưa có lịch sử bảo trì.[/yellow]")
+        return
+
+    table = Table(title="Lịch sử bảo trì")
+    table.add_column("Thời gian", style="cyan")
+    table.add_column("Công việc", style="green")
+    table.add_column("Thiết bị", style="blue")
+    table.add_column("Trạng thái")
+    table.add_column("Thời lượng", style="yellow")
+    table.add_column("Kết quả", style="magenta")
+    for entry in entries:
+        status = "[green]ok[/green]" if entry["status"] == "ok" else "[red]lỗi[/red]"
+        detail = entry.get("error") or json.dumps(entry.get("result"), ensure_ascii=False)
+        table.add_row(entry["time"], entry["job"], entry["serial"], status, f"{entry['duration']}s", detail)
+    console.print(table)
+
+def main(argv=None):
+    """Điểm vào khi chạy không cần giao diện"""
+    parser = argparse.ArgumentParser(description="Bảo trì tự động theo lịch cho các thiết bị Android")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Chạy các công việc theo lịch")
+    run.add_argument("--config", help="Đường dẫn file cấu hình (mặc định config/maintenance.json)")
+    run.add_argument("--once", action="store_true", help="Chạy mọi công việc một lần rồi thoát")
+
+    history = subparsers.add_parser("history", help="Xem lịch sử bảo trì")
+    history.add_argument("--limit", type=int, default=30)
+
+    args = parser.parse_args(argv)
+    if args.command == "history":
+        show_history(args.limit)
+        return 0
+
+    try:
+        scheduler = MaintenanceScheduler(load_config(args.config))
+    except (OSError, ValueError) as e:
+        console.print(f"[bold red]Cấu hình bảo trì không hợp lệ: {e}[/bold red]")
+        return 1
+
+    if args.once:
+        entries = [entry for entry in scheduler.run_once() if entry]
+        scheduler.stop()
+        return 0 if all(entry["status"] == "ok" for entry in entries) else 1
+
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
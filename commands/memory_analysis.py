@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module phân tích bộ nhớ theo tiến trình từ một lần chụp "dumpsys meminfo"
+"""
+
+import os
+import re
+import json
+import time
+import questionary
+from rich.console import Console
+from rich.table import Table
+from utils import logger
+from utils import adb_helper
+from commands import device_check
+
+console = Console()
+log = logger.setup_logger()
+
+# Nhóm tiến trình theo nhãn oom adj trong output dạng compact
+CACHED_CATEGORIES = {"cch", "cch-act", "cch-cr", "cch-empty", "empty", "cached"}
+FOREGROUND_CATEGORIES = {"fore", "top", "vis", "percept", "perceptible", "foreground", "visible"}
+
+def parse_compact_meminfo(output):
+    """
+    Phân tích output của "dumpsys meminfo -c"
+
+    Args:
+        output (str): Output của lệnh
+
+    Returns:
+        tuple: (danh sách tiến trình, dict thông tin RAM tổng)
+    """
+    processes = []
+    ram = {}
+    for line in (output or "").splitlines():
+        fields = line.strip().split(",")
+        if fields[0] == "proc" and len(fields) >= 5 and fields[3].isdigit():
+            numbers = [int(f) if f.isdigit() else None for f in fields[4:]]
+            processes.append({
+                "name": fields[2],
+                "pid": int(fields[3]),
+                "category": fields[1],
+                "pss": numbers[0] or 0,
+                "swap": numbers[1] if len(numbers) > 1 and numbers[1] is not None else 0,
+                # Các bản Android mới thêm cột RSS trước cờ a/e
+                "rss": numbers[2] if len(numbers) > 2 and numbers[2] is not None else None,
+                "activities": fields[-1] == "a"
+            })
+        elif fields[0] == "ram" and len(fields) >= 4:
+            ram = {"total": int(fields[1]), "free": int(fields[2]), "used": int(fields[3])}
+        elif fields[0] == "lostram" and len(fields) >= 2 and fields[1].isdigit():
+            ram["lost"] = int(fields[1])
+    return processes, ram
+
+def parse_full_meminfo(output):
+    """
+    Phân tích phần "Total PSS by process" và "Total RAM" của "dumpsys meminfo" đầy đủ
+
+    Args:
+        output (str): Output của lệnh
+
+    Returns:
+        tuple: (danh sách tiến trình, dict thông tin RAM tổng)
+    """
+    processes = []
+    ram = {}
+    section = None
+    line_re = re.compile(r"^\s*([\d,]+)K: (\S+) \(pid (\d+)(?: / (activities))?\)")
+
+    for line in (output or "").splitlines():
+        if line.startswith("Total PSS by process") or line.startswith("Total RSS by process"):
+            section = "pss" if "PSS" in line else "rss"
+            continue
+        if line.startswith("Total PSS by OOM") or line.startswith("Total RSS by OOM"):
+            section = None
+            continue
+
+        match = line_re.match(line)
+        if section and match:
+            value = int(match.group(1).replace(",", ""))
+            processes.append({
+                "name": match.group(2),
+                "pid": int(match.group(3)),
+                "category": "unknown",
+                "pss": value if section == "pss" else 0,
+                "swap": 0,
+                "rss": value if section == "rss" else None,
+                "activities": bool(match.group(4))
+            })
+            continue
+
+        match = re.match(r"\s*(Total RAM|Free RAM|Used RAM|Lost RAM):\s*([\d,]+)K", line)
+        if match:
+            key = match.group(1).split()[0].lower()
+            ram[key] = int(match.group(2).replace(",", ""))
+    return processes, ram
+
+def capture_meminfo(serial=None):
+    """
+    Chụp bộ nhớ của mọi tiến trình bằng một lần gọi dumpsys meminfo
+
+    Args:
+        serial (str, optional): Serial của thiết bị
+
+    Returns:
+        dict: Snapshot gồm thời gian, thiết bị, RAM tổng và danh sách tiến trình
+    """
+    result = adb_helper.run_adb(["shell", "dumpsys", "meminfo", "-c"], serial=serial)
+    processes, ram = parse_compact_meminfo(result.stdout if result else "")
+
+    if not processes:
+        result = adb_helper.run_adb(["shell", "dumpsys", "meminfo"], serial=serial)
+        processes, ram = parse_full_meminfo(result.stdout if result else "")
+
+    return {
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "serial": serial,
+        "ram": ram,
+        "processes": processes
+    }
+
+def summarize_snapshot(snapshot):
+    """
+    Tính tổng PSS/swap theo nhóm tiến trình cache và tiền cảnh
+
+    Args:
+        snapshot (dict): Kết quả từ capture_meminfo
+
+    Returns:
+        dict: {nhóm: {"count", "pss", "swap"}}
+    """
+    groups = {name: {"count": 0, "pss": 0, "swap": 0} for name in ("cached", "foreground", "other", "all")}
+    for process in snapshot["processes"]:
+        if process["category"] in CACHED_CATEGORIES:
+            group = "cached"
+        elif process["category"] in FOREGROUND_CATEGORIES:
+            group = "foreground"
+        else:
+            group = "other"
+        for name in (group, "all"):
+            groups[name]["count"] += 1
+            groups[name]["pss"] += process["pss"]
+            groups[name]["swap"] += process["swap"]
+    return groups
+
+def memory_by_package(snapshot, packages=None):
+    """
+    Gộp PSS theo package (tiến trình "com.app:service" tính vào "com.app")
+
+    Args:
+        snapshot (dict): Kết quả từ capture_meminfo
+        packages (set, optional): Chỉ giữ các package này
+
+    Returns:
+        dict: {package: {"pss", "swap", "rss"}}
+    """
+    usage = {}
+    for process in snapshot["processes"]:
+        package = process["name"].split(":")[0]
+        if packages is not None and package not in packages:
+            continue
+        entry = usage.setdefault(package, {"pss": 0, "swap": 0, "rss": 0})
+        entry["pss"] += process["pss"]
+        entry["swap"] += process["swap"]
+        entry["rss"] += process["rss"] or 0
+    return usage
+
+def diff_snapshots(old, new):
+    """
+    So sánh PSS theo tên tiến trình giữa hai snapshot
+
+    Args:
+        old (dict): Snapshot cũ
+        new (dict): Snapshot mới
+
+    Returns:
+        list: [(tên, PSS cũ, PSS mới, chênh lệch)] sắp xếp theo mức tăng giảm dần
+    """
+    before = memory_by_package(old)
+    after = memory_by_package(new)
+    rows = []
+    for name in set(before) | set(after):
+        a = before.get(name, {}).get("pss", 0)
+        b = after.get(name, {}).get("pss", 0)
+        rows.append((name, a, b, b - a))
+    return sorted(rows, key=lambda row: row[3], reverse=True)
+
+def save_snapshot(snapshot):
+    """
+    Lưu snapshot để so sánh về sau
+
+    Args:
+        snapshot (dict): Kết quả từ capture_meminfo
+
+    Returns:
+        str: Đường dẫn file đã lưu
+    """
+    path = os.path.join(
+        adb_helper.data_dir("meminfo"),
+        f"{snapshot['serial'] or 'default'}_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    return path
+
+def show_snapshot(snapshot, limit=20):
+    """
+    Hiển thị các tiến trình chiếm nhiều bộ nhớ nhất và tổng theo nhóm
+
+    Args:
+        snapshot (dict): Kết quả từ capture_meminfo
+        limit (int): Số tiến trình hiển thị
+    """
+    table = Table(title=f"Bộ nhớ theo tiến trình ({snapshot['time']})")
+    table.add_column("STT", style="cyan")
+    table.add_column("Tiến trình", style="green")
+    table.add_column("Nhóm", style="blue")
+    table.add_column("PSS", style="yellow")
+    table.add_column("Swap", style="magenta")
+    table.add_column("RSS", style="yellow")
+
+    ranked = sorted(snapshot["processes"], key=lambda p: p["pss"] or p["rss"] or 0, reverse=True)
+    for idx, process in enumerate(ranked[:limit], 1):
+        table.add_row(
+            str(idx), process["name"], process["category"],
+            f"{process['pss'] / 1024:.1f} MB",
+            f"{process['swap'] / 1024:.1f} MB",
+            f"{process['rss'] / 1024:.1f} MB" if process["rss"] is not None else "-"
+        )
+    console.print(table)
+
+    totals = summarize_snapshot(snapshot)
+    labels = {"cached": "Tiến trình cache", "foreground": "Tiến trình tiền cảnh", "other": "Khác", "all": "Tổng"}
+    summary = Table(title="Tổng theo nhóm")
+    summary.add_column("Nhóm", style="cyan")
+    summary.add_column("Số tiến trình", style="green")
+    summary.add_column("PSS", style="yellow")
+    summary.add_column("Swap", style="magenta")
+    for name, label in labels.items():
+        group = totals[name]
+        summary.add_row(label, str(group["count"]), f"{group['pss'] / 1024:.1f} MB", f"{group['swap'] / 1024:.1f} MB")
+    console.print(summary)
+
+    ram = snapshot["ram"]
+    if ram.get("total"):
+        console.print(
+            f"RAM: tổng [yellow]{ram['total'] / 1024:.0f} MB[/yellow], "
+            f"trống [green]{ram.get('free', 0) / 1024:.0f} MB[/green], "
+            f"đã dùng [red]{ram.get('used', 0) / 1024:.0f} MB[/red]"
+        )
+
+def memory_analysis_menu():
+    """Menu phân tích bộ nhớ"""
+    snapshot_dir = adb_helper.data_dir("meminfo")
+    choice = questionary.select(
+        "Chọn chức năng:",
+        choices=[
+            "1️⃣ Chụp và phân tích bộ nhớ",
+            "2️⃣ So sánh hai lần chụp (tìm rò rỉ)",
+            "↩️ Quay lại"
+        ]
+    ).ask()
+
+    if not choice or "Quay lại" in choice:
+        return
+
+    if "Chụp và phân tích" in choice:
+        devices = device_check.select_devices("Chọn thiết bị:")
+        for serial in devices:
+            snapshot = capture_meminfo(serial)
+            if not snapshot["processes"]:
+                console.print(f"[bold red]Không đọc được dumpsys meminfo từ {serial}![/bold red]")
+                continue
+            show_snapshot(snapshot)
+            path = save_snapshot(snapshot)
+            console.print(f"[green]Đã lưu snapshot: {path}[/green]")
+            log.info(f"Đã chụp bộ nhớ của {len(snapshot['processes'])} tiến trình trên {serial}")
+
+    elif "So sánh" in choice:
+        snapshots = sorted(f for f in os.listdir(snapshot_dir) if f.endswith(".json"))
+        if len(snapshots) < 2:
+            console.print("[yellow]Cần ít nhất hai lần chụp để so sánh.[/yellow]")
+            return
+
+        first = questionary.select("Lần chụp cũ:", choices=snapshots).ask()
+        second = questionary.select("Lần chụp mới:", choices=[s for s in snapshots if s != first]).ask()
+        if not first or not second:
+            return
+
+        loaded = []
+        for name in (first, second):
+            with open(os.path.join(snapshot_dir, name), "r", encoding="utf-8") as f:
+                loaded.append(json.load(f))
+
+        table = Table(title="Thay đổi PSS theo ứng dụng")
+        table.add_column("Ứng dụng", style="cyan")
+        table.add_column("Cũ", style="yellow")
+        table.add_column("Mới", style="yellow")
+        table.add_column("Chênh lệch", style="magenta")
+        for name, a, b, delta in diff_snapshots(*loaded)[:20]:
+            color = "red" if delta > 0 else "green"
+            table.add_row(name, f"{a / 1024:.1f} MB", f"{b / 1024:.1f} MB", f"[{color}]{delta / 1024:+.1f} MB[/{color}]")
+        console.print(table)
+
+    input("\nNhấn Enter để tiếp tục...")
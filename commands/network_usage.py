@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module đo lưu lượng mạng theo ứng dụng (xt_qtaguid hoặc "dumpsys netstats")
+"""
+
+import re
+import questionary
+from rich.console import Console
+from rich.table import Table
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
+from utils import logger
+from utils import adb_helper
+from commands import device_check
+from commands import live_monitor
+from commands import app_management
+
+console = Console()
+log = logger.setup_logger()
+
+# Tên hiển thị cho các UID hệ thống không thuộc package nào
+SYSTEM_UIDS = {
+    0: "root",
+    1000: "system",
+    1001: "radio",
+    1013: "media",
+    1021: "gps",
+    1051: "dns (netd)",
+    1073: "networkstack",
+    2000: "shell"
+}
+
+# Mặc định: đo 30 giây, mỗi 2 giây một mẫu
+DEFAULT_DURATION = 30
+DEFAULT_INTERVAL = 2
+
+def build_network_script(interval=DEFAULT_INTERVAL):
+    """
+    Tạo script đọc bộ đếm byte theo UID và ứng dụng tiền cảnh trong một lượt mỗi chu kỳ
+
+    Dùng /proc/net/xt_qtaguid/stats nếu có (Android 9 trở về trước), ngược lại dùng
+    "dumpsys netstats --uid" sau khi buộc netstats cập nhật.
+
+    Args:
+        interval (float): Khoảng thời gian giữa hai mẫu (giây)
+
+    Returns:
+        str: Nội dung script
+    """
+    return f"""while true; do
+  if [ -r /proc/net/xt_qtaguid/stats ]; then
+    echo @@qtaguid
+    cat /proc/net/xt_qtaguid/stats
+  else
+    dumpsys netstats --poll >/dev/null 2>&1
+    echo @@netstats
+    dumpsys netstats --uid
+  fi
+  echo @@top
+  dumpsys activity activities | grep -m 1 -E 'mResumedActivity|topResumedActivity'
+  echo @@end
+  sleep {interval}
+done
+"""
+
+def parse_qtaguid(output):
+    """
+    Cộng bộ đếm byte theo UID từ /proc/net/xt_qtaguid/stats (chỉ tag 0x0 để không tính trùng)
+
+    Args:
+        output (str): Nội dung file stats
+
+    Returns:
+        dict: {uid: [rx_bytes, tx_bytes]}
+    """
+    counters = {}
+    for line in (output or "").splitlines()[1:]:
+        fields = line.split()
+        if len(fields) < 8 or fields[2] != "0x0" or not fields[3].isdigit():
+            continue
+        entry = counters.setdefault(int(fields[3]), [0, 0])
+        entry[0] += int(fields[5])
+        entry[1] += int(fields[7])
+    return counters
+
+def parse_netstats_uid(output):
+    """
+    Cộng bộ đếm byte theo UID từ phần "UID stats" của "dumpsys netstats --uid"
+
+    Args:
+        output (str): Output của lệnh
+
+    Returns:
+        dict: {uid: [rx_bytes, tx_bytes]} tính từ lúc khởi động
+    """
+    counters = {}
+    in_uid = False
+    uid = None
+    for line in (output or "").splitlines():
+        stripped = line.strip()
+        if stripped.startswith("UID stats"):
+            in_uid = True
+            continue
+        if stripped.startswith("UID tag stats") or (in_uid and line and not line[0].isspace()):
+            in_uid = False
+        if not in_uid:
+            continue
+
+        match = re.search(r"uid=(-?\d+)\b.*tag=0x([0-9a-f]+)", stripped)
+        if match:
+            # uid=-1 là tổng của mọi UID
+            uid = int(match.group(1)) if int(match.group(2), 16) == 0 and int(match.group(1)) >= 0 else None
+            continue
+
+        match = re.match(r"st=\d+ rb=(\d+) rp=\d+ tb=(\d+)", stripped)
+        if match and uid is not None:
+            entry = counters.setdefault(uid, [0, 0])
+            entry[0] += int(match.group(1))
+            entry[1] += int(match.group(2))
+    return counters
+
+def parse_network_sample(sections):
+    """
+    Chuyển các khối của một mẫu thành bộ đếm theo UID và package tiền cảnh
+
+    Args:
+        sections (dict): Các khối của mẫu
+
+    Returns:
+        tuple: ({uid: [rx, tx]}, package tiền cảnh hoặc None)
+    """
+    if "qtaguid" in sections:
+        counters = parse_qtaguid(sections["qtaguid"])
+    else:
+        counters = parse_netstats_uid(sections.get("netstats", ""))
+
+    match = re.search(r"\s([\w.]+)/", sections.get("top", ""))
+    return counters, match.group(1) if match else None
+
+def get_uid_names(serial=None):
+    """
+    Ánh xạ UID sang tên package (UID dùng chung ghép nhiều package)
+
+    Args:
+        serial (str, optional): Serial của thiết bị
+
+    Returns:
+        tuple: ({uid: tên hiển thị}, {uid: [package]})
+    """
+    packages = {}
+    for package, entry in app_management.get_package_index(serial, include_system=True).items():
+        if entry["uid"] is not None:
+            packages.setdefault(entry["uid"], []).append(package)
+
+    names = dict(SYSTEM_UIDS)
+    for uid, members in packages.items():
+        names[uid] = members[0] if len(members) == 1 else f"{members[0]} (+{len(members) - 1})"
+    return names, packages
+
+def sample_usage(serial=None, duration=DEFAULT_DURATION, interval=DEFAULT_INTERVAL, packages=None, progress=None, task=None):
+    """
+    Đo lưu lượng theo UID trong một khoảng thời gian
+
+    Lưu lượng trong các chu kỳ ứng dụng không ở tiền cảnh được tính là lưu lượng nền.
+
+    Args:
+        serial (str, optional): Serial của thiết bị
+        duration (float): Thời gian đo (giây)
+        interval (float): Khoảng thời gian giữa hai mẫu (giây)
+        packages (dict, optional): {uid: [package]} từ get_uid_names
+        progress (Progress, optional): Thanh tiến trình để cập nhật
+        task (int, optional): Task của thanh tiến trình
+
+    Returns:
+        tuple: ({uid: {"rx", "tx", "bg_rx", "bg_tx"}}, thời gian đo thực tế)
+    """
+    packages = packages or {}
+    usage = {}
+    previous = None
+    start = last = None
+
+    process = adb_helper.open_shell_stream(build_network_script(interval), serial)
+    try:
+        for timestamp, sections in live_monitor.iter_samples(process):
+            counters, foreground = parse_network_sample(sections)
+            if previous is None:
+                start = timestamp
+            else:
+                for uid, (rx, tx) in counters.items():
+                    old_rx, old_tx = previous.get(uid, (rx, tx))
+                    # Bộ đếm có thể bị đặt lại (đổi mạng, cắt bớt lịch sử): bỏ qua giá trị âm
+                    delta_rx, delta_tx = max(0, rx - old_rx), max(0, tx - old_tx)
+                    if not delta_rx and not delta_tx:
+                        continue
+                    entry = usage.setdefault(uid, {"rx": 0, "tx": 0, "bg_rx": 0, "bg_tx": 0})
+                    entry["rx"] += delta_rx
+                    entry["tx"] += delta_tx
+                    if foreground not in packages.get(uid, ()):
+                        entry["bg_rx"] += delta_rx
+                        entry["bg_tx"] += delta_tx
+            previous = counters
+            last = timestamp
+
+            if progress is not None:
+                progress.update(task, completed=min(duration, last - start))
+            if last - start >= duration:
+                break
+    finally:
+        if process.poll() is None:
+            process.kill()
+
+    return usage, (last - start) if start is not None else 0
+
+def rank_usage(usage, names, elapsed, background_only=False):
+    """
+    Xếp hạng UID theo tổng lưu lượng
+
+    Args:
+        usage (dict): Kết quả từ sample_usage
+        names (dict): {uid: tên hiển thị}
+        elapsed (float): Thời gian đo (giây)
+        background_only (bool): Xếp hạng theo lưu lượng nền
+
+    Returns:
+        list: [(uid, tên, rx, tx, nền, tốc độ byte/giây)]
+    """
+    rows = []
+    for uid, entry in usage.items():
+        total = entry["rx"] + entry["tx"]
+        background = entry["bg_rx"] + entry["bg_tx"]
+        key = background if background_only else total
+        rate = key / elapsed if elapsed else 0
+        rows.append((uid, names.get(uid, f"uid {uid}"), entry["rx"], entry["tx"], background, rate))
+    return sorted(rows, key=lambda row: row[5], reverse=True)
+
+def background_usage_by_package(serial=None, duration=DEFAULT_DURATION, interval=DEFAULT_INTERVAL):
+    """
+    Đo lưu lượng nền theo package, dùng để chọn ứng dụng cần dừng
+
+    Args:
+        serial (str, optional): Serial của thiết bị
+        duration (float): Thời gian đo (giây)
+        interval (float): Khoảng thời gian giữa hai mẫu (giây)
+
+    Returns:
+        dict: {package: byte lưu lượng nền}
+    """
+    _, packages = get_uid_names(serial)
+    usage, _ = sample_usage(serial, duration, interval, packages)
+    result = {}
+    for uid, entry in usage.items():
+        for package in packages.get(uid, ()):
+            result[package] = entry["bg_rx"] + entry["bg_tx"]
+    return result
+
+def show_usage(rows, elapsed, limit=20):
+    """
+    Hiển thị bảng xếp hạng lưu lượng
+
+    Args:
+        rows (list): Kết quả từ rank_usage
+        elapsed (float): Thời gian đo (giây)
+        limit (int): Số dòng hiển thị
+    """
+    table = Table(title=f"Lưu lượng mạng theo ứng dụng ({elapsed:.0f} giây)")
+    table.add_column("STT", style="cyan")
+    table.add_column("Ứng dụng", style="green")
+    table.add_column("UID", style="blue")
+    table.add_column("Nhận", style="yellow")
+    table.add_column("Gửi", style="yellow")
+    table.add_column("Khi chạy nền", style="red")
+    table.add_column("Tốc độ", style="magenta")
+
+    for idx, (uid, name, rx, tx, background, rate) in enumerate(rows[:limit], 1):
+        table.add_row(
+            str(idx), name, str(uid),
+            app_management.format_size(rx),
+            app_management.format_size(tx),
+            app_management.format_size(background),
+            f"{app_management.format_size(rate)}/s"
+        )
+    console.print(table)
+
+def network_usage_menu():
+    """Menu đo lưu lượng mạng theo ứng dụng"""
+    duration = questionary.text("Thời gian đo (giây):", default=str(DEFAULT_DURATION)).ask()
+    if not duration or not duration.isdigit():
+        return
+    background_only = questionary.confirm("Chỉ xếp hạng lưu lượng khi chạy nền?", default=True).ask()
+
+    devices = device_check.select_devices("Chọn thiết bị cần đo:")
+    for serial in devices:
+        names, packages = get_uid_names(serial)
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+        ) as progress:
+            task = progress.add_task(f"[green]Đang đo lưu lượng trên {serial}...", total=int(duration))
+            usage, elapsed = sample_usage(serial, int(duration), DEFAULT_INTERVAL, packages, progress, task)
+
+        if not elapsed:
+            console.print(f"[bold red]Không đọc được thống kê mạng từ {serial}![/bold red]")
+            continue
+
+        rows = rank_usage(usage, names, elapsed, background_only)
+        show_usage(rows, elapsed)
+        if rows:
+            log.info(f"Đã đo lưu lượng mạng trên {serial} trong {elapsed:.0f}s, cao nhất: {rows[0][1]}")
+
+    input("\nNhấn Enter để tiếp tục...")
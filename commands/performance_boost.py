@@ -7,17 +7,95 @@ Module tăng hiệu suất và dọn rác cho Android
 
 import os
 import re
+import json
 import time
 import subprocess
+from collections import namedtuple
 import questionary
 from rich.console import Console
 from rich.panel import Panel
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
+from rich.table import Table
 from utils import logger
+from utils import adb_helper
+from utils import settings_journal
+from commands import launch_benchmark
+from commands import live_monitor
+from commands import system_settings
+from commands import tweak_ab_test
+from commands import jank_profiler
+from commands import memory_analysis
+from commands import telemetry_recorder
+from commands import network_usage
 
 console = Console()
 log = logger.setup_logger()
 
+# Các tối ưu hiệu suất, mỗi tối ưu là các cài đặt {(namespace, key): giá trị}
+PERFORMANCE_TWEAKS = [
+    {"name": "Tắt hiệu ứng hình ảnh", "settings": {
+        ("global", "window_animation_scale"): "0.0",
+        ("global", "transition_animation_scale"): "0.0",
+        ("global", "animator_duration_scale"): "0.0"
+    }},
+    {"name": "Giảm thời gian chờ khi tắt ứng dụng", "settings": {
+        ("global", "activity_manager_constants"): "max_cached_processes=32"
+    }},
+    {"name": "Tắt kiểm tra crash ứng dụng", "settings": {
+        ("global", "anr_show_background"): "false"
+    }},
+    {"name": "Tối ưu RAM", "settings": {
+        ("global", "sys.use_fifo_ui"): "1"
+    }}
+]
+
+# Cài đặt của chế độ tăng tốc nhanh
+QUICK_BOOST_SETTINGS = {
+    ("global", "window_animation_scale"): "0.5",
+    ("global", "transition_animation_scale"): "0.5",
+    ("global", "animator_duration_scale"): "0.5"
+}
+
+# Swap file và script bật lại swap khi khởi động (Magisk service.d)
+SWAP_FILE = "/data/swapfile"
+SWAP_BOOT_SCRIPT = "/data/adb/service.d/adb_toolbox_swap.sh"
+
+# Kích thước mỗi lần ghi swap file (MB) và dung lượng luôn chừa lại trên /data
+SWAP_CHUNK_MB = 64
+SWAP_RESERVE_MB = 512
+
+# Thời gian chờ trước khi đo lại hiệu quả của swap (giây)
+SWAP_SETTLE_SECONDS = 10
+
+# Script đọc toàn bộ trạng thái swap trong một lệnh
+SWAP_STATE_SCRIPT = """echo @@uid
+id -u
+echo @@swaps
+cat /proc/swaps
+echo @@zram
+for d in /sys/block/zram*; do
+  [ -e "$d/disksize" ] && echo "${d##*/} $(cat $d/disksize) $(cat $d/mm_stat 2>/dev/null)"
+done
+echo @@df
+df -k /data | tail -n 1
+echo @@mem
+grep -E '^(MemTotal|MemAvailable|SwapTotal|SwapFree):' /proc/meminfo
+echo @@psi
+cat /proc/pressure/memory 2>/dev/null
+"""
+
+# Một tiến trình trên thiết bị (rss tính bằng KB, package là None nếu không phải ứng dụng)
+ProcessRecord = namedtuple("ProcessRecord", ["pid", "ppid", "rss", "name", "user", "package"])
+
+# Các ứng dụng không bao giờ bị dừng khi dọn tiến trình nền
+PROTECTED_PACKAGES = [
+    "com.android.systemui",
+    "com.android.phone",
+    "com.android.launcher3",
+    "com.google.android.apps.nexuslauncher",
+    "com.google.android.inputmethod.latin"
+]
+
 def run_adb_command(command):
     """
     Chạy lệnh ADB và trả về kết quả
@@ -29,7 +107,7 @@ def run_adb_command(command):
         str: Kết quả của lệnh
     """
     try:
-        result = subprocess.run(
+        result = adb_helper.run_process(
             command,
             capture_output=True,
             text=True,
@@ -40,14 +118,17 @@ def run_adb_command(command):
         console.print(f"[bold red]Lỗi khi chạy lệnh: {e}[/bold red]")
         return None
 
-def get_package_list():
+def get_package_list(serial=None):
     """
     Lấy danh sách các ứng dụng đã cài đặt
     
+    Args:
+        serial (str, optional): Serial của thiết bị
+        
     Returns:
         list: Danh sách tên package của các ứng dụng
     """
-    result = run_adb_command(["adb", "shell", "pm", "list", "packages", "-3"])
+    result = run_adb_command(adb_helper.adb_base(serial) + ["shell", "pm", "list", "packages", "-3"])
     
     if not result:
         return []
@@ -114,55 +195,395 @@ def clear_all_cache():
         console.print(f"[bold green]✓[/bold green] Đã xóa cache của {count}/{len(packages)} ứng dụng")
         log.info(f"Đã xóa cache của {count}/{len(packages)} ứng dụng")
 
-def kill_background_apps():
-    """Dừng các ứng dụng đang chạy nền"""
-    result = run_adb_command(["adb", "shell", "ps"])
+def parse_process_table(output, packages):
+    """
+    Chuyển output của "ps -A -o PID,PPID,RSS,NAME,USER" thành danh sách ProcessRecord
+    
+    Args:
+        output (str): Output của lệnh ps
+        packages (set): Các package dùng để nhận diện tiến trình ứng dụng
+        
+    Returns:
+        list: Danh sách ProcessRecord
+    """
+    records = []
+    for line in (output or "").splitlines():
+        parts = line.split()
+        if len(parts) != 5 or not parts[0].isdigit():
+            continue  # Bỏ qua dòng tiêu đề và dòng lỗi
+            
+        pid, ppid, rss, name, user = parts
+        # Tiến trình phụ có dạng "com.app:service"
+        package = name.split(":")[0]
+        records.append(ProcessRecord(
+            pid=int(pid),
+            ppid=int(ppid),
+            rss=int(rss) if rss.isdigit() else 0,
+            name=name,
+            user=user,
+            package=package if package in packages else None
+        ))
+    return records
+
+def get_process_snapshot(serial=None):
+    """
+    Chụp bảng tiến trình cùng bàn phím, launcher mặc định và ứng dụng tiền cảnh trong một lệnh adb
     
-    if not result:
+    Args:
+        serial (str, optional): Serial của thiết bị
+        
+    Returns:
+        tuple: (danh sách ProcessRecord, tập package được bảo vệ)
+    """
+    script = "\n".join([
+        "echo @@ps",
+        "ps -A -o PID,PPID,RSS,NAME,USER 2>/dev/null",
+        "echo @@ime",
+        "settings get secure default_input_method",
+        "echo @@home",
+        "cmd package resolve-activity --brief -a android.intent.action.MAIN -c android.intent.category.HOME 2>/dev/null | tail -n 1",
+        "echo @@top",
+        "dumpsys activity activities | grep -E 'mResumedActivity|topResumedActivity'"
+    ])
+    blocks = adb_helper.parse_marked_output(adb_helper.run_shell_script(script, serial=serial))
+    
+    packages = set(get_package_list(serial))
+    records = parse_process_table(blocks.get("ps", ""), packages)
+    
+    protected = set(PROTECTED_PACKAGES)
+    for name in ("ime", "home"):
+        component = blocks.get(name, "").strip()
+        if "/" in component:
+            protected.add(component.split("/")[0])
+            
+    # Ứng dụng người dùng đang dùng (kể cả chế độ nhiều cửa sổ)
+    protected.update(re.findall(r"\s([\w.]+)/", blocks.get("top", "")))
+            
+    return records, protected
+
+def rank_app_memory(records, protected=(), values=None):
+    """
+    Gộp chỉ số theo ứng dụng và sắp xếp giảm dần
+    
+    Mặc định xếp hạng theo tổng RSS của các tiến trình; truyền values để xếp hạng
+    theo chỉ số khác (PSS, lưu lượng mạng nền...).
+    
+    Args:
+        records (list): Danh sách ProcessRecord
+        protected (set): Các package không được đưa vào danh sách
+        values (dict, optional): {package: giá trị KB} dùng thay cho RSS
+        
+    Returns:
+        list: [(package, giá trị KB, số tiến trình)]
+    """
+    usage = {}
+    for record in records:
+        if record.package and record.package not in protected:
+            rss, count = usage.get(record.package, (0, 0))
+            usage[record.package] = (rss + record.rss, count + 1)
+            
+    if values is not None:
+        usage = {pkg: (values.get(pkg, 0), count) for pkg, (_, count) in usage.items()}
+        
+    return sorted(((pkg, value, count) for pkg, (value, count) in usage.items()), key=lambda item: item[1], reverse=True)
+
+def force_stop_packages(packages, serial=None):
+    """
+    Dừng nhiều ứng dụng trong một lệnh adb
+    
+    Args:
+        packages (list): Danh sách package
+        serial (str, optional): Serial của thiết bị
+        
+    Returns:
+        bool: True nếu lệnh chạy thành công
+    """
+    if not packages:
+        return True
+    script = "\n".join(f"am force-stop {adb_helper.quote(package)}" for package in packages)
+    return adb_helper.run_shell_script(script, serial=serial) is not None
+
+def kill_background_apps(serial=None, top_n=None, interactive=True, rank_by=None):
+    """
+    Dừng các ứng dụng chạy nền chiếm nhiều RAM nhất
+    
+    Args:
+        serial (str, optional): Serial của thiết bị
+        top_n (int, optional): Số ứng dụng cần dừng (mặc định: hỏi người dùng, hoặc tất cả nếu không tương tác)
+        interactive (bool): Hiển thị bảng và hỏi số ứng dụng cần dừng
+        rank_by (str, optional): "rss" (từ ps), "pss" (từ dumpsys meminfo) hoặc "network" (lưu lượng mạng khi chạy nền),
+            hỏi người dùng nếu không truyền
+        
+    Returns:
+        list: Các package đã dừng
+    """
+    if rank_by is None:
+        rank_by = "rss"
+        if interactive:
+            answer = questionary.select(
+                "Xếp hạng ứng dụng theo:",
+                choices=[
+                    "RSS (nhanh, từ ps)",
+                    "PSS (chính xác, từ dumpsys meminfo)",
+                    f"Mạng (lưu lượng khi chạy nền, đo {network_usage.DEFAULT_DURATION} giây)"
+                ]
+            ).ask()
+            if answer and "PSS" in answer:
+                rank_by = "pss"
+            elif answer and "Mạng" in answer:
+                rank_by = "network"
+            
+    records, protected = get_process_snapshot(serial)
+    
+    if not records:
         console.print("[bold red]Không thể lấy danh sách tiến trình![/bold red]")
-        return
+        return []
         
-    # Lọc các tiến trình Android app (thường có tên package là com.*)
-    app_processes = []
-    for line in result.strip().split('\n'):
-        if "com." in line:
-            parts = line.split()
-            if len(parts) >= 9:  # Đảm bảo đủ cột
-                pid = parts[1]
-                package = parts[-1]
-                if package.startswith("com."):
-                    app_processes.append((pid, package))
-    
-    console.print(f"[yellow]Tìm thấy {len(app_processes)} ứng dụng đang chạy nền[/yellow]")
-    
-    count = 0
-    for pid, package in app_processes:
-        if force_stop_app(package):
-            count += 1
-            console.print(f"[green]Đã dừng: {package}[/green]")
+    values = None
+    if rank_by == "pss":
+        memory = memory_analysis.memory_by_package(memory_analysis.capture_meminfo(serial))
+        values = {package: entry["pss"] for package, entry in memory.items()}
+    elif rank_by == "network":
+        console.print(f"[cyan]Đang đo lưu lượng mạng trong {network_usage.DEFAULT_DURATION} giây...[/cyan]")
+        traffic = network_usage.background_usage_by_package(serial)
+        # Lưu lượng nền tính theo KB
+        values = {package: size / 1024 for package, size in traffic.items()}
+        
+    metric = {"network": "Mạng nền"}.get(rank_by, rank_by.upper())
+    ranked = rank_app_memory(records, protected, values)
+    console.print(f"[yellow]Tìm thấy {len(ranked)} ứng dụng đang chạy nền[/yellow]")
+    
+    if not ranked:
+        return []
+        
+    if top_n is None and not interactive:
+        top_n = len(ranked)
+        
+    if top_n is None:
+        table = Table(title=f"Ứng dụng chạy nền theo {metric if rank_by == 'network' else f'RAM ({metric})'}")
+        table.add_column("STT", style="cyan")
+        table.add_column("Ứng dụng", style="green")
+        table.add_column(metric, style="yellow")
+        table.add_column("Tiến trình", style="magenta")
+        for idx, (package, value, count) in enumerate(ranked, 1):
+            table.add_row(str(idx), package, f"{value / 1024:.1f} MB", str(count))
+        console.print(table)
+        
+        answer = questionary.text(f"Số ứng dụng cần dừng (theo thứ tự {metric}):", default=str(len(ranked))).ask()
+        if not answer or not answer.isdigit():
+            return []
+        top_n = int(answer)
+        
+    targets = [package for package, _, _ in ranked[:top_n]]
+    
+    if not force_stop_packages(targets, serial):
+        console.print("[bold red]✗[/bold red] Không thể dừng ứng dụng")
+        return []
+        
+    freed = sum(value for _, value, _ in ranked[:top_n])
+    for package in targets:
+        console.print(f"[green]Đã dừng: {package}[/green]")
+        
+    console.print(f"[bold green]✓[/bold green] Đã dừng {len(targets)}/{len(ranked)} ứng dụng (~{freed / 1024:.0f} MB {metric})")
+    log.info(f"Đã dừng {len(targets)}/{len(ranked)} ứng dụng nền (~{freed / 1024:.0f} MB {metric})")
+    return targets
+
+def parse_swap_state(output):
+    """
+    Phân tích output của script kiểm tra swap/zram
+    
+    Args:
+        output (str): Output của SWAP_STATE_SCRIPT
+        
+    Returns:
+        dict: Trạng thái swap, zram, dung lượng trống /data, RAM và PSI
+    """
+    blocks = adb_helper.parse_marked_output(output)
+    state = {"root": blocks.get("uid", "").strip() == "0", "swaps": [], "zram": [],
+             "data_free_kb": None, "mem": {}, "psi": {}}
+    
+    for line in blocks.get("swaps", "").splitlines()[1:]:
+        parts = line.split()
+        if len(parts) >= 4 and parts[2].isdigit():
+            state["swaps"].append({"name": parts[0], "type": parts[1], "size_kb": int(parts[2]), "used_kb": int(parts[3])})
+            
+    for line in blocks.get("zram", "").splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[1].isdigit():
+            # mm_stat: orig_data_size compr_data_size mem_used_total ...
+            stats = [int(p) for p in parts[2:5] if p.isdigit()]
+            state["zram"].append({
+                "name": parts[0],
+                "disksize": int(parts[1]),
+                "orig_data": stats[0] if len(stats) > 0 else None,
+                "compressed": stats[1] if len(stats) > 1 else None
+            })
+            
+    df = blocks.get("df", "").split()
+    if len(df) >= 4 and df[3].isdigit():
+        state["data_free_kb"] = int(df[3])
+        
+    for match in re.finditer(r"(\w+):\s+(\d+)", blocks.get("mem", "")):
+        state["mem"][match.group(1)] = int(match.group(2))
+        
+    for line in blocks.get("psi", "").splitlines():
+        parts = line.split()
+        if parts and parts[0] in ("some", "full"):
+            state["psi"][parts[0]] = {k: float(v) for k, v in (p.split("=") for p in parts[1:]) if k.startswith("avg")}
+            
+    return state
+
+def get_swap_state(serial=None):
+    """
+    Đọc swap, zram, dung lượng trống /data, RAM và áp lực bộ nhớ (PSI) trong một lệnh adb
+    
+    Args:
+        serial (str, optional): Serial của thiết bị
+        
+    Returns:
+        dict: Kết quả từ parse_swap_state
+    """
+    return parse_swap_state(adb_helper.run_shell_script(SWAP_STATE_SCRIPT, serial=serial, as_root=True))
+
+def build_swap_script(size_mb, persist=True):
+    """
+    Tạo script tạo swap file, in tiến độ sau mỗi phần được ghi
+    
+    Args:
+        size_mb (int): Kích thước swap (MB), 0 để tắt và xóa swap file
+        persist (bool): Tự bật lại swap khi khởi động (qua /data/adb/service.d nếu có)
+        
+    Returns:
+        str: Nội dung script
+    """
+    script = f"""swapoff {SWAP_FILE} 2>/dev/null
+rm -f {SWAP_FILE} {SWAP_BOOT_SCRIPT}
+"""
+    if size_mb <= 0:
+        return script + "echo DONE\n"
+        
+    script += f"""i=0
+while [ $i -lt {size_mb} ]; do
+  n=$(({size_mb} - i)); [ $n -gt {SWAP_CHUNK_MB} ] && n={SWAP_CHUNK_MB}
+  dd if=/dev/zero of={SWAP_FILE} bs=1048576 count=$n seek=$i conv=notrunc 2>/dev/null || {{ echo FAIL dd; exit 1; }}
+  i=$((i + n))
+  echo PROGRESS $i
+done
+chmod 600 {SWAP_FILE}
+mkswap {SWAP_FILE} >/dev/null || {{ echo FAIL mkswap; exit 1; }}
+swapon {SWAP_FILE} || {{ echo FAIL swapon; exit 1; }}
+"""
+    if persist:
+        script += f"""if [ -d {os.path.dirname(SWAP_BOOT_SCRIPT)} ]; then
+  printf '#!/system/bin/sh\\nswapon {SWAP_FILE}\\n' > {SWAP_BOOT_SCRIPT}
+  chmod 755 {SWAP_BOOT_SCRIPT}
+  echo PERSISTED
+fi
+"""
+    return script + "echo DONE\n"
+
+def save_swap_choice(serial, size_mb):
+    """
+    Lưu kích thước swap đã chọn cho thiết bị
+    
+    Args:
+        serial (str): Serial của thiết bị
+        size_mb (int): Kích thước swap (MB), 0 nếu đã tắt
+    """
+    config_file = os.path.join(adb_helper.data_dir(), "swap.json")
+    config = {}
+    if os.path.exists(config_file):
+        with open(config_file, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    config[serial or "default"] = {"size_mb": size_mb, "time": time.strftime("%Y-%m-%d %H:%M:%S")}
+    with open(config_file, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=4)
+
+def show_swap_state(state, title):
+    """
+    Hiển thị trạng thái swap/zram và áp lực bộ nhớ
+    
+    Args:
+        state (dict): Kết quả từ get_swap_state
+        title (str): Tiêu đề bảng
+    """
+    table = Table(title=title)
+    table.add_column("Thiết bị swap", style="cyan")
+    table.add_column("Loại", style="green")
+    table.add_column("Kích thước", style="yellow")
+    table.add_column("Đang dùng", style="magenta")
+    
+    for swap in state["swaps"]:
+        table.add_row(swap["name"], swap["type"], f"{swap['size_kb'] // 1024}MB", f"{swap['used_kb'] // 1024}MB")
+    for zram in state["zram"]:
+        ratio = ""
+        if zram["orig_data"] and zram["compressed"]:
+            ratio = f" (nén {zram['orig_data'] / zram['compressed']:.1f}x)"
+        table.add_row(f"/dev/block/{zram['name']}", "zram", f"{zram['disksize'] // 1048576}MB",
+                      f"{(zram['orig_data'] or 0) // 1048576}MB{ratio}")
+    console.print(table)
+    
+    if state["data_free_kb"] is not None:
+        console.print(f"Dung lượng trống /data: [yellow]{state['data_free_kb'] // 1024}MB[/yellow]")
+    psi = state["psi"].get("some")
+    if psi:
+        console.print(f"Áp lực bộ nhớ (PSI some): avg10 [yellow]{psi.get('avg10', 0):.2f}%[/yellow], avg60 [yellow]{psi.get('avg60', 0):.2f}%[/yellow]")
+
+def show_swap_effect(before, after):
+    """
+    Hiển thị thay đổi đo được của swap và áp lực bộ nhớ
+    
+    Args:
+        before (dict): Trạng thái trước khi thay đổi
+        after (dict): Trạng thái sau khi thay đổi
+    """
+    def swap_used(state):
+        return (state["mem"].get("SwapTotal", 0) - state["mem"].get("SwapFree", 0)) // 1024
+        
+    rows = [
+        ("Tổng swap (MB)", before["mem"].get("SwapTotal", 0) // 1024, after["mem"].get("SwapTotal", 0) // 1024),
+        ("Swap đang dùng (MB)", swap_used(before), swap_used(after)),
+        ("RAM khả dụng (MB)", before["mem"].get("MemAvailable", 0) // 1024, after["mem"].get("MemAvailable", 0) // 1024)
+    ]
+    for kind in ("some", "full"):
+        if kind in before["psi"] and kind in after["psi"]:
+            rows.append((f"PSI {kind} avg10 (%)", before["psi"][kind].get("avg10", 0), after["psi"][kind].get("avg10", 0)))
             
-    console.print(f"[bold green]✓[/bold green] Đã dừng {count}/{len(app_processes)} ứng dụng")
-    log.info(f"Đã dừng {count}/{len(app_processes)} ứng dụng nền")
+    table = Table(title="Hiệu quả đo được")
+    table.add_column("Chỉ số", style="cyan")
+    table.add_column("Trước", style="yellow")
+    table.add_column("Sau", style="yellow")
+    table.add_column("Chênh lệch", style="magenta")
+    for label, a, b in rows:
+        table.add_row(label, f"{a:g}", f"{b:g}", f"{b - a:+g}")
+    console.print(table)
 
-def increase_virtual_memory():
-    """Tăng bộ nhớ ảo (swap) cho Android"""
-    # Kiểm tra xem thiết bị có hỗ trợ thay đổi swap không
-    result = run_adb_command(["adb", "shell", "su", "-c", "cat /proc/swaps"])
+def increase_virtual_memory(serial=None):
+    """
+    Quản lý bộ nhớ ảo (swap file / zram) cho Android
+    
+    Args:
+        serial (str, optional): Serial của thiết bị
+        
+    Returns:
+        bool: True nếu đã thay đổi swap
+    """
+    before = get_swap_state(serial)
     
-    if "Permission denied" in result or "not found" in result:
+    if not before["root"]:
         console.print("[bold red]Thiết bị không được root hoặc không hỗ trợ swap![/bold red]")
         return False
         
-    current_swap = "0MB"
-    if result and "Filename" in result:
-        lines = result.strip().split('\n')
-        if len(lines) > 1:
-            # Đã có swap
-            parts = lines[1].split()
-            if len(parts) >= 3:
-                current_swap = f"{int(parts[2]) // 1024}MB"
+    show_swap_state(before, "Swap hiện tại")
     
-    console.print(f"Swap hiện tại: [yellow]{current_swap}[/yellow]")
+    # Cho biết các tiến trình đang thực sự dùng bao nhiêu swap và bộ nhớ cache
+    totals = memory_analysis.summarize_snapshot(memory_analysis.capture_meminfo(serial))
+    console.print(
+        f"Swap đang dùng bởi tiến trình: [yellow]{totals['all']['swap'] // 1024}MB[/yellow], "
+        f"PSS tiến trình cache: [yellow]{totals['cached']['pss'] // 1024}MB[/yellow]"
+    )
+    if before["zram"]:
+        console.print("[cyan]Thiết bị đã có zram; swap file chỉ nên dùng khi zram thường xuyên đầy.[/cyan]")
     
     choice = questionary.select(
         "Chọn kích thước swap mới:",
@@ -178,61 +599,142 @@ def increase_virtual_memory():
     if not choice or "Hủy" in choice:
         return False
         
-    if "Tắt swap" in choice:
-        result = run_adb_command(["adb", "shell", "su", "-c", "swapoff /data/swapfile"])
-        if result is not None:
-            console.print("[bold green]✓[/bold green] Đã tắt swap")
-            log.info("Đã tắt swap")
-        return True
+    swap_size = 0 if "Tắt swap" in choice else int(re.search(r"(\d+)", choice).group(1))
+    
+    # Giữ lại tối thiểu SWAP_RESERVE_MB trống trên /data (swap file cũ sẽ bị xóa trước khi tạo)
+    current_file_kb = sum(s["size_kb"] for s in before["swaps"] if s["name"] == SWAP_FILE)
+    free_mb = ((before["data_free_kb"] or 0) + current_file_kb) // 1024
+    if swap_size and swap_size + SWAP_RESERVE_MB > free_mb:
+        console.print(f"[bold red]Không đủ dung lượng trống trên /data ({free_mb}MB) để tạo swap {swap_size}MB![/bold red]")
+        return False
         
-    # Trích xuất kích thước (chỉ lấy số)
-    swap_size = re.search(r"(\d+)", choice).group(1)
+    process = adb_helper.open_shell_stream(build_swap_script(swap_size), serial, as_root=True)
+    status = None
+    persisted = False
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+    ) as progress:
+        task = progress.add_task("[green]Đang tạo swap..." if swap_size else "[green]Đang tắt swap...", total=max(swap_size, 1))
+        for line in process.stdout:
+            line = line.strip()
+            if line.startswith("PROGRESS "):
+                progress.update(task, completed=int(line.split()[1]), description=f"[green]Đang ghi swap: {line.split()[1]}/{swap_size}MB")
+            elif line == "PERSISTED":
+                persisted = True
+            elif line == "DONE" or line.startswith("FAIL"):
+                status = line
+        progress.update(task, completed=max(swap_size, 1))
+    process.wait()
     
-    # Tạo swap file mới
-    commands = [
-        f"dd if=/dev/zero of=/data/swapfile bs=1m count={swap_size}",
-        "chmod 600 /data/swapfile",
-        "mkswap /data/swapfile",
-        "swapon /data/swapfile"
-    ]
+    if status != "DONE":
+        console.print(f"[bold red]✗[/bold red] Không thể thay đổi swap ({status or 'mất kết nối'})")
+        return False
+        
+    save_swap_choice(serial, swap_size)
     
+    if swap_size:
+        console.print(f"[bold green]✓[/bold green] Đã tạo swap mới với kích thước {swap_size}MB")
+        if persisted:
+            console.print("[cyan]Swap sẽ được bật lại tự động khi khởi động.[/cyan]")
+        log.info(f"Đã tạo swap mới với kích thước {swap_size}MB")
+    else:
+        console.print("[bold green]✓[/bold green] Đã tắt swap")
+        log.info("Đã tắt swap")
+        
     with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}")) as progress:
-        task = progress.add_task("[green]Đang tạo swap...", total=len(commands))
+        progress.add_task(f"[green]Chờ {SWAP_SETTLE_SECONDS} giây để đo hiệu quả...", total=None)
+        time.sleep(SWAP_SETTLE_SECONDS)
+    show_swap_effect(before, get_swap_state(serial))
+    return True
+
+def get_tweak_profiles():
+    """
+    Lấy các bộ tối ưu có thể áp dụng (dùng cho đo hiệu quả trước/sau)
+    
+    Returns:
+        dict: {tên bộ tối ưu: {(namespace, key): giá trị}}
+    """
+    profiles = {"Tất cả tối ưu hiệu suất": {}}
+    for tweak in PERFORMANCE_TWEAKS:
+        profiles["Tất cả tối ưu hiệu suất"].update(tweak["settings"])
+        profiles[tweak["name"]] = dict(tweak["settings"])
+    profiles["Tăng tốc nhanh"] = dict(QUICK_BOOST_SETTINGS)
+    return profiles
+
+def restore_tweak_session(serial=None):
+    """
+    Khôi phục chính xác trạng thái trước một phiên tối ưu đã ghi trong nhật ký
+    
+    Args:
+        serial (str, optional): Serial của thiết bị
         
-        for cmd in commands:
-            progress.update(task, description=f"[green]Đang chạy: {cmd}")
-            run_adb_command(["adb", "shell", "su", "-c", cmd])
-            progress.advance(task)
+    Returns:
+        bool: True nếu khôi phục thành công
+    """
+    entries = settings_journal.load_entries(serial)
+    tweak_sessions = settings_journal.list_sessions(entries, source_prefix="tweak")
+    undoable = {s["session"] for s in settings_journal.list_undoable_sessions(entries)}
+    sessions = [s for s in tweak_sessions if s["session"] in undoable]
+    
+    if not sessions:
+        console.print("[yellow]Chưa có phiên tối ưu nào được ghi lại để khôi phục.[/yellow]")
+        return False
+        
+    labels = [f"{s['time']} - {s['source'][len('tweak:'):]} ({s['count']} cài đặt)" for s in sessions]
+    choice = questionary.select(
+        "Khôi phục về trạng thái trước phiên (các phiên sau đó cũng được hoàn tác):",
+        choices=labels + ["↩️ Hủy"]
+    ).ask()
+    
+    if not choice or "Hủy" in choice:
+        return False
+        
+    # Hoàn tác phiên đã chọn cùng mọi phiên tối ưu mới hơn để về đúng trạng thái lúc đó
+    selected = [s["session"] for s in sessions[:labels.index(choice) + 1]]
+    
+    # Các phiên tối ưu trong khoảng đã được hoàn tác trước đó và phiên hoàn tác của chúng
+    # tự triệt tiêu nhau, nên không tính là thay đổi mới hơn
+    in_range = set()
+    for session in tweak_sessions:
+        in_range.add(session["session"])
+        if session["session"] == selected[-1]:
+            break
+    ignore = in_range - set(selected)
+    for session in settings_journal.list_sessions(entries, source_prefix="revert:"):
+        if set(settings_journal.reverted_by(session)) <= in_range:
+            ignore.add(session["session"])
             
-    console.print(f"[bold green]✓[/bold green] Đã tạo swap mới với kích thước {swap_size}MB")
-    log.info(f"Đã tạo swap mới với kích thước {swap_size}MB")
+    overwrite_later = system_settings.ask_overwrite_later(entries, selected, ignore)
+    if overwrite_later is None:
+        return False
+        
+    values = system_settings.revert_sessions(selected, serial, overwrite_later, ignore)
+    
+    if values is None:
+        console.print("[bold red]✗[/bold red] Không thể khôi phục cài đặt")
+        return False
+    if not values:
+        console.print("[yellow]Không có cài đặt nào được khôi phục.[/yellow]")
+        return False
+        
+    for (namespace, key), value in values.items():
+        console.print(f"[green]{namespace}.{key} → {value if value is not None else '(mặc định)'}[/green]")
+
+    console.print(f"[bold green]✓[/bold green] Đã khôi phục {len(values)} cài đặt về giá trị trước phiên tối ưu")
+    log.info(f"Đã khôi phục {len(values)} cài đặt hiệu suất từ nhật ký ({len(selected)} phiên)")
     return True
 
 def tweak_performance():
     """Tối ưu hiệu suất Android"""
-    tweaks = [
-        {"name": "Tắt hiệu ứng hình ảnh", "commands": [
-            "adb shell settings put global window_animation_scale 0.0",
-            "adb shell settings put global transition_animation_scale 0.0",
-            "adb shell settings put global animator_duration_scale 0.0"
-        ]},
-        {"name": "Giảm thời gian chờ khi tắt ứng dụng", "commands": [
-            "adb shell settings put global activity_manager_constants max_cached_processes=32"
-        ]},
-        {"name": "Tắt kiểm tra crash ứng dụng", "commands": [
-            "adb shell settings put global anr_show_background false"
-        ]},
-        {"name": "Tối ưu RAM", "commands": [
-            "adb shell settings put global sys.use_fifo_ui 1"
-        ]}
-    ]
-    
     choice = questionary.select(
         "Chọn cách tối ưu:",
         choices=[
             "1️⃣ Áp dụng tất cả",
             "2️⃣ Chọn từng tùy chọn",
-            "3️⃣ Khôi phục về mặc định",
+            "3️⃣ Khôi phục về mặc định (trạng thái trước khi tối ưu)",
             "↩️ Quay lại"
         ]
     ).ask()
@@ -242,48 +744,40 @@ def tweak_performance():
         
     if "Áp dụng tất cả" in choice:
         with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}")) as progress:
-            task = progress.add_task("[green]Đang áp dụng tối ưu...", total=len(tweaks))
+            task = progress.add_task("[green]Đang áp dụng tối ưu...", total=1)
+            session = system_settings.apply_settings_transaction(
+                get_tweak_profiles()["Tất cả tối ưu hiệu suất"],
+                source="tweak:Tất cả tối ưu hiệu suất"
+            )
+            progress.advance(task)
             
-            for tweak in tweaks:
-                progress.update(task, description=f"[green]Đang áp dụng: {tweak['name']}")
-                
-                for cmd in tweak["commands"]:
-                    os.system(cmd)
-                    time.sleep(0.2)
-                    
-                progress.advance(task)
-                
-        console.print("[bold green]✓[/bold green] Đã áp dụng tất cả các tối ưu")
-        log.info("Đã áp dụng tất cả các tối ưu hiệu suất")
+        if session:
+            console.print("[bold green]✓[/bold green] Đã áp dụng tất cả các tối ưu")
+            log.info(f"Đã áp dụng tất cả các tối ưu hiệu suất (phiên {session})")
+        else:
+            console.print("[bold red]✗[/bold red] Không thể áp dụng tối ưu")
         
     elif "Chọn từng tùy chọn" in choice:
-        for tweak in tweaks:
+        changes = {}
+        names = []
+        for tweak in PERFORMANCE_TWEAKS:
             apply = questionary.confirm(f"Áp dụng: {tweak['name']}?").ask()
             
             if apply:
-                for cmd in tweak["commands"]:
-                    os.system(cmd)
-                    time.sleep(0.2)
+                changes.update(tweak["settings"])
+                names.append(tweak["name"])
                 
-                console.print(f"[green]Đã áp dụng: {tweak['name']}[/green]")
-                log.info(f"Đã áp dụng tối ưu: {tweak['name']}")
+        if changes:
+            session = system_settings.apply_settings_transaction(changes, source=f"tweak:{', '.join(names)}")
+            if session:
+                for name in names:
+                    console.print(f"[green]Đã áp dụng: {name}[/green]")
+                log.info(f"Đã áp dụng tối ưu: {', '.join(names)} (phiên {session})")
+            else:
+                console.print("[bold red]✗[/bold red] Không thể áp dụng tối ưu")
                 
     elif "Khôi phục về mặc định" in choice:
-        reset_commands = [
-            "adb shell settings put global window_animation_scale 1.0",
-            "adb shell settings put global transition_animation_scale 1.0",
-            "adb shell settings put global animator_duration_scale 1.0",
-            "adb shell settings delete global activity_manager_constants",
-            "adb shell settings put global anr_show_background true",
-            "adb shell settings put global sys.use_fifo_ui 0"
-        ]
-        
-        for cmd in reset_commands:
-            os.system(cmd)
-            time.sleep(0.2)
-            
-        console.print("[bold green]✓[/bold green] Đã khôi phục tất cả cài đặt về mặc định")
-        log.info("Đã khôi phục cài đặt hiệu suất về mặc định")
+        restore_tweak_session()
     
     input("\nNhấn Enter để tiếp tục...")
 
@@ -298,6 +792,13 @@ def boost_menu():
                 "3️⃣ Tăng bộ nhớ ảo (yêu cầu root)",
                 "4️⃣ Tối ưu hiệu suất",
                 "5️⃣ Chế độ tăng tốc nhanh (chạy tất cả)",
+                "6️⃣ Đo thời gian khởi động ứng dụng",
+                "7️⃣ Theo dõi hiệu năng trực tiếp",
+                "8️⃣ Đo hiệu quả tối ưu (trước/sau)",
+                "9️⃣ Đo độ giật khung hình",
+                "🔟 Phân tích bộ nhớ theo tiến trình",
+                "1️⃣1️⃣ Ghi telemetry pin và nhiệt độ",
+                "1️⃣2️⃣ Đo lưu lượng mạng theo ứng dụng",
                 "↩️ Quay lại"
             ]
         ).ask()
@@ -320,17 +821,39 @@ def boost_menu():
             clear_all_cache()
             
             console.print("[cyan]Bước 2: Dừng ứng dụng chạy nền[/cyan]")
-            kill_background_apps()
+            kill_background_apps(interactive=False)
             
             console.print("[cyan]Bước 3: Tối ưu hiệu suất[/cyan]")
-            os.system("adb shell settings put global window_animation_scale 0.5")
-            os.system("adb shell settings put global transition_animation_scale 0.5")
-            os.system("adb shell settings put global animator_duration_scale 0.5")
+            session = system_settings.apply_settings_transaction(QUICK_BOOST_SETTINGS, source="tweak:Tăng tốc nhanh")
             
-            console.print("[bold green]✓[/bold green] Quá trình tăng tốc đã hoàn tất!")
-            log.info("Đã thực hiện tăng tốc nhanh toàn diện")
+            if session:
+                console.print("[bold green]✓[/bold green] Quá trình tăng tốc đã hoàn tất!")
+                log.info(f"Đã thực hiện tăng tốc nhanh toàn diện (phiên {session})")
+            else:
+                console.print("[bold red]✗[/bold red] Không thể áp dụng tối ưu hiệu suất")
             
             input("\nNhấn Enter để tiếp tục...")
+            
+        elif "Đo thời gian khởi động" in choice:
+            launch_benchmark.benchmark_menu(get_package_list())
+            
+        elif "Theo dõi hiệu năng" in choice:
+            live_monitor.live_monitor_menu()
+            
+        elif "Đo hiệu quả tối ưu" in choice:
+            tweak_ab_test.ab_test_menu(get_tweak_profiles(), get_package_list())
+            
+        elif "Đo độ giật" in choice:
+            jank_profiler.jank_profiler_menu(get_package_list())
+            
+        elif "Phân tích bộ nhớ" in choice:
+            memory_analysis.memory_analysis_menu()
+            
+        elif "Ghi telemetry" in choice:
+            telemetry_recorder.telemetry_menu()
+            
+        elif "Đo lưu lượng mạng" in choice:
+            network_usage.network_usage_menu()
 
 if __name__ == "__main__":
     boost_menu() 
\ No newline at end of file
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module cấu hình khai báo (desired state): chỉ ghi những gì khác với trạng thái hiện tại
+"""
+
+import os
+import json
+import shlex
+import questionary
+from rich.console import Console
+from rich.table import Table
+from utils import logger
+from utils import adb_helper
+from commands import device_check
+from commands import system_settings
+
+console = Console()
+log = logger.setup_logger()
+
+# File cấu hình cũ dạng danh sách lệnh, được chuyển đổi khi đọc
+LEGACY_PRESET_FILE = "presets.json"
+
+def get_profile_file():
+    """
+    Lấy đường dẫn file cấu hình khai báo
+
+    Returns:
+        str: Đường dẫn file JSON
+    """
+    return adb_helper.config_path("profiles.json")
+
+def profile_to_state(profile):
+    """
+    Chuyển một cấu hình khai báo thành trạng thái mong muốn
+
+    Cấu hình gồm các khóa (đều không bắt buộc):
+        "settings": {"namespace/key": giá trị hoặc null để xóa}
+        "density": DPI hoặc "reset"
+        "font_scale": tỷ lệ phông chữ
+        "packages": {"enable": [...], "disable": [...]}
+
+    Args:
+        profile (dict): Cấu hình
+
+    Returns:
+        dict: {(namespace, key): giá trị} dùng được với system_settings
+    """
+    state = {}
+    for name, value in profile.get("settings", {}).items():
+        namespace, key = name.split("/", 1)
+        state[(namespace, key)] = None if value is None else str(value)
+    if "density" in profile:
+        density = str(profile["density"])
+        state[(system_settings.WM_NAMESPACE, "density")] = None if density == "reset" else density
+    if "font_scale" in profile:
+        state[("system", "font_scale")] = str(profile["font_scale"])
+    for package in profile.get("packages", {}).get("enable", []):
+        state[(system_settings.PACKAGE_NAMESPACE, package)] = "enabled"
+    for package in profile.get("packages", {}).get("disable", []):
+        state[(system_settings.PACKAGE_NAMESPACE, package)] = "disabled"
+    return state
+
+def convert_commands(commands):
+    """
+    Chuyển danh sách lệnh adb dạng cũ thành cấu hình khai báo
+
+    Hỗ trợ "settings put/delete", "wm density/size" và "pm enable/disable(-user)".
+
+    Args:
+        commands (list): Các lệnh adb
+
+    Returns:
+        tuple: (cấu hình, danh sách lệnh không chuyển được)
+    """
+    profile = {}
+    unsupported = []
+    for command in commands:
+        args = shlex.split(command)
+        if args[:1] == ["adb"]:
+            args = args[1:]
+        if args[:1] == ["shell"]:
+            args = args[1:]
+
+        if len(args) == 5 and args[:2] == ["settings", "put"]:
+            profile.setdefault("settings", {})[f"{args[2]}/{args[3]}"] = args[4]
+        elif len(args) == 4 and args[:2] == ["settings", "delete"]:
+            profile.setdefault("settings", {})[f"{args[2]}/{args[3]}"] = None
+        elif len(args) == 3 and args[:2] == ["wm", "density"]:
+            profile["density"] = args[2]
+        elif len(args) == 3 and args[:2] == ["wm", "size"]:
+            profile.setdefault("settings", {})[f"{system_settings.WM_NAMESPACE}/size"] = None if args[2] == "reset" else args[2]
+        elif len(args) >= 3 and args[0] == "pm" and args[1] in ("enable", "disable", "disable-user"):
+            key = "enable" if args[1] == "enable" else "disable"
+            profile.setdefault("packages", {}).setdefault(key, []).append(args[-1])
+        else:
+            unsupported.append(command)
+    return profile, unsupported
+
+def load_profiles():
+    """
+    Đọc các cấu hình khai báo, kèm các preset cũ trong presets.json (đã chuyển đổi)
+
+    Returns:
+        dict: {tên: cấu hình}
+    """
+    profiles = {}
+    legacy_file = adb_helper.config_path(LEGACY_PRESET_FILE)
+    if os.path.exists(legacy_file):
+        with open(legacy_file, "r", encoding="utf-8") as f:
+            for name, commands in json.load(f).items():
+                profile, unsupported = convert_commands(commands)
+                if unsupported:
+                    log.info(f"Preset '{name}': bỏ qua {len(unsupported)} lệnh không chuyển được: {unsupported}")
+                profiles[name] = profile
+
+    profile_file = get_profile_file()
+    if os.path.exists(profile_file):
+        with open(profile_file, "r", encoding="utf-8") as f:
+            profiles.update(json.load(f))
+    return profiles
+
+def save_profile(name, profile):
+    """
+    Lưu (hoặc ghi đè) một cấu hình khai báo
+
+    Args:
+        name (str): Tên cấu hình
+        profile (dict): Cấu hình
+    """
+    profile_file = get_profile_file()
+    profiles = {}
+    if os.path.exists(profile_file):
+        with open(profile_file, "r", encoding="utf-8") as f:
+            profiles = json.load(f)
+    profiles[name] = profile
+    with open(profile_file, "w", encoding="utf-8") as f:
+        json.dump(profiles, f, indent=4, ensure_ascii=False)
+
+def plan_profile(state, serial=None):
+    """
+    Đọc trạng thái hiện tại trong một lệnh adb và tính tập thay đổi tối thiểu
+
+    Args:
+        state (dict): Trạng thái mong muốn từ profile_to_state
+        serial (str, optional): Serial của thiết bị
+
+    Returns:
+        tuple: ({(namespace, key): giá trị mới}, {(namespace, key): giá trị hiện tại})
+    """
+    current = system_settings.get_settings_batch(list(state), serial)
+    changes = {key: value for key, value in state.items() if current.get(key) != value}
+    return changes, current
+
+def apply_profile(name, profile, serial=None, dry_run=False):
+    """
+    Đưa một thiết bị về trạng thái mong muốn: một lần đọc, và một lần ghi nếu có khác biệt
+
+    Args:
+        name (str): Tên cấu hình
+        profile (dict): Cấu hình
+        serial (str, optional): Serial của thiết bị
+        dry_run (bool): Chỉ tính thay đổi, không ghi
+
+    Returns:
+        dict: {"changes": {...}, "previous": {...}, "session": mã phiên hoặc None}
+    """
+    changes, current = plan_profile(profile_to_state(profile), serial)
+    result = {"changes": changes, "previous": {k: current.get(k) for k in changes}, "session": None}
+    if changes and not dry_run:
+        result["session"] = system_settings.apply_settings_transaction(
+            changes, serial, source=f"profile:{name}", previous=current
+        )
+        if not result["session"]:
+            raise RuntimeError("Không thể ghi cài đặt")
+    return result
+
+def describe_key(key):
+    """
+    Tên hiển thị của một khóa trạng thái
+
+    Args:
+        key (tuple): (namespace, key)
+
+    Returns:
+        str: Tên hiển thị
+    """
+    return f"{key[0]}/{key[1]}"
+
+def show_plan(serial, result):
+    """
+    Hiển thị các thay đổi của một thiết bị
+
+    Args:
+        serial (str): Serial của thiết bị
+        result (dict): Kết quả từ apply_profile
+    """
+    if not result["changes"]:
+        console.print(f"[green]{serial}: đã đúng cấu hình, không cần thay đổi[/green]")
+        return
+
+    table = Table(title=f"{serial}: {len(result['changes'])} thay đổi")
+    table.add_column("Cài đặt", style="cyan")
+    table.add_column("Hiện tại", style="red")
+    table.add_column("Mong muốn", style="green")
+    for key, value in result["changes"].items():
+        before = result["previous"].get(key)
+        table.add_row(describe_key(key), "-" if before is None else before, "(mặc định)" if value is None else value)
+    console.print(table)
+
+def profiles_menu():
+    """Menu áp dụng cấu hình khai báo cho một hoặc nhiều thiết bị"""
+    try:
+        profiles = load_profiles()
+    except (OSError, ValueError) as e:
+        console.print(f"[bold red]Lỗi khi đọc cấu hình: {e}[/bold red]")
+        return
+
+    if not profiles:
+        console.print("[yellow]Chưa có cấu hình nào được lưu.[/yellow]")
+        return
+
+    name = questionary.select("Chọn cấu hình:", choices=["↩️ Quay lại"] + list(profiles)).ask()
+    if not name or "Quay lại" in name:
+        return
+
+    devices = device_check.select_devices("Chọn thiết bị cần áp dụng:")
+    if not devices:
+        return
+
+    # Xem trước: mỗi thiết bị chỉ tốn một lần đọc
+    plans = adb_helper.run_on_devices(lambda serial: apply_profile(name, profiles[name], serial, dry_run=True), devices)
+    pending = []
+    for serial, plan in plans.items():
+        if isinstance(plan, Exception):
+            console.print(f"[bold red]✗[/bold red] {serial}: {plan}")
+            continue
+        show_plan(serial, plan)
+        if plan["changes"]:
+            pending.append(serial)
+
+    if pending and questionary.confirm(f"Áp dụng cho {len(pending)} thiết bị?", default=True).ask():
+        results = adb_helper.run_on_devices(lambda serial: apply_profile(name, profiles[name], serial), pending)
+        for serial, result in results.items():
+            if isinstance(result, Exception):
+                console.print(f"[bold red]✗[/bold red] {serial}: {result}")
+            else:
+                console.print(f"[bold green]✓[/bold green] {serial}: đã áp dụng {len(result['changes'])} thay đổi")
+                log.info(f"Đã áp dụng cấu hình '{name}' trên {serial}: {len(result['changes'])} thay đổi (phiên {result['session']})")
+    elif not pending:
+        console.print("[bold green]✓[/bold green] Mọi thiết bị đã đúng cấu hình")
+
+    input("\nNhấn Enter để tiếp tục...")
@@ -6,12 +6,16 @@ Module tùy chỉnh các cài đặt hệ thống Android
 """
 
 import os
+import re
+import time
 import subprocess
 import questionary
 from rich.console import Console
 from rich.table import Table
 from rich.text import Text
 from utils import logger
+from utils import adb_helper
+from utils import settings_journal
 
 console = Console()
 log = logger.setup_logger()
@@ -40,6 +44,18 @@ COMMON_SETTINGS = {
     ]
 }
 
+# Namespace giả cho các giá trị của "wm" (density, size) để ghi nhật ký và hoàn tác như cài đặt
+WM_NAMESPACE = "wm"
+
+# Namespace giả cho trạng thái bật/tắt của package ("enabled" hoặc "disabled")
+PACKAGE_NAMESPACE = "package"
+
+# Số giây giá trị cài đặt đọc được vẫn còn hiệu lực
+SETTINGS_CACHE_TTL = 10
+
+# Giá trị cài đặt theo thiết bị và namespace: {(serial, namespace): (thời điểm, {key: giá trị})}
+_settings_cache = {}
+
 def run_adb_command(command):
     """
     Chạy lệnh ADB và trả về kết quả
@@ -51,7 +67,7 @@ def run_adb_command(command):
         str: Kết quả của lệnh
     """
     try:
-        result = subprocess.run(
+        result = adb_helper.run_process(
             command,
             capture_output=True,
             text=True,
@@ -62,19 +78,509 @@ def run_adb_command(command):
         console.print(f"[bold red]Lỗi khi chạy lệnh: {e}[/bold red]")
         return None
 
-def get_current_setting(namespace, key):
+def parse_settings_list(output):
+    """
+    Phân tích output của "settings list <namespace>"
+    
+    Args:
+        output (str): Output của lệnh
+        
+    Returns:
+        dict: {key: giá trị}
+    """
+    values = {}
+    for line in (output or "").splitlines():
+        key, sep, value = line.partition("=")
+        if sep and key.strip():
+            values[key.strip()] = value
+    return values
+
+def load_namespaces(namespaces, serial=None, refresh=False):
+    """
+    Đọc toàn bộ cài đặt của các namespace trong một lệnh adb
+    
+    Kết quả được giữ trong bộ nhớ SETTINGS_CACHE_TTL giây cho mỗi thiết bị.
+    
+    Args:
+        namespaces (list): Các namespace cần đọc
+        serial (str, optional): Serial của thiết bị
+        refresh (bool): Bỏ qua giá trị đã lưu
+        
+    Returns:
+        dict: {namespace: {key: giá trị}}
+    """
+    now = time.time()
+    result = {}
+    missing = []
+    for namespace in namespaces:
+        cached = _settings_cache.get((serial, namespace))
+        if cached and not refresh and now - cached[0] < SETTINGS_CACHE_TTL:
+            result[namespace] = cached[1]
+        else:
+            missing.append(namespace)
+            
+    if missing:
+        script = "\n".join(f"echo @@{namespace}; settings list {namespace}" for namespace in missing)
+        output = adb_helper.run_shell_script(script, serial=serial)
+        blocks = adb_helper.parse_marked_output(output)
+        for namespace in missing:
+            values = parse_settings_list(blocks.get(namespace, ""))
+            # Không lưu kết quả khi lệnh thất bại để lần sau đọc lại
+            if output is not None:
+                _settings_cache[(serial, namespace)] = (now, values)
+            result[namespace] = values
+    return result
+
+def update_settings_cache(changes, serial=None):
+    """
+    Cập nhật giá trị đã lưu sau khi ghi cài đặt
+    
+    Args:
+        changes (dict): {(namespace, key): giá trị}, giá trị None nghĩa là đã xóa
+        serial (str, optional): Serial của thiết bị
+    """
+    for (namespace, key), value in changes.items():
+        cached = _settings_cache.get((serial, namespace))
+        if not cached:
+            continue
+        if value is None:
+            cached[1].pop(key, None)
+        else:
+            cached[1][key] = value
+
+def get_current_setting(namespace, key, serial=None):
     """
     Lấy giá trị hiện tại của cài đặt
     
     Args:
         namespace (str): Namespace của cài đặt (system, secure, global)
         key (str): Tên cài đặt
+        serial (str, optional): Serial của thiết bị
         
     Returns:
         str: Giá trị hiện tại
     """
-    result = run_adb_command(["adb", "shell", "settings", "get", namespace, key])
-    return result if result else "null"
+    value = load_namespaces([namespace], serial)[namespace].get(key)
+    return value if value not in (None, "") else "null"
+
+def get_settings_batch(keys, serial=None):
+    """
+    Đọc giá trị của nhiều cài đặt trong một lệnh adb
+    
+    Args:
+        keys (list): Danh sách (namespace, key)
+        serial (str, optional): Serial của thiết bị
+        
+    Returns:
+        dict: {(namespace, key): giá trị}, giá trị None nếu cài đặt chưa tồn tại
+    """
+    keys = list(dict.fromkeys(keys))
+    lines = []
+    if any(namespace == PACKAGE_NAMESPACE for namespace, _ in keys):
+        # Chỉ gọi pm một lần cho mọi package
+        lines.append("disabled=$(pm list packages -d)")
+    for namespace, key in keys:
+        if namespace == PACKAGE_NAMESPACE:
+            pattern = adb_helper.quote(f"package:{key}")
+            lines.append(f"echo @@{namespace}/{key}; echo \"$disabled\" | grep -qx {pattern} && echo disabled || echo enabled")
+        elif namespace == WM_NAMESPACE:
+            # Chỉ lấy giá trị override, không có override nghĩa là đang dùng mặc định
+            lines.append(f"echo @@{namespace}/{key}; wm {key} | grep -i override | sed 's/.*: //'")
+        else:
+            lines.append(f"echo @@{namespace}/{key}; settings get {namespace} {adb_helper.quote(key)}")
+    script = "\n".join(lines)
+    blocks = adb_helper.parse_marked_output(adb_helper.run_shell_script(script, serial=serial))
+    
+    values = {}
+    for namespace, key in keys:
+        value = blocks.get(f"{namespace}/{key}", "").strip()
+        values[(namespace, key)] = None if value in ("", "null") else value
+    return values
+
+def build_put_lines(changes):
+    """
+    Tạo các lệnh shell để ghi nhiều cài đặt
+    
+    Namespace WM_NAMESPACE được ghi bằng "wm <key> <giá trị>", giá trị None là "wm <key> reset".
+    Namespace PACKAGE_NAMESPACE được ghi bằng "pm enable" hoặc "pm disable-user".
+    
+    Args:
+        changes (dict): {(namespace, key): giá trị}, giá trị None để xóa cài đặt
+        
+    Returns:
+        list: Các dòng lệnh
+    """
+    lines = []
+    for (namespace, key), value in changes.items():
+        if namespace == WM_NAMESPACE:
+            lines.append(f"wm {key} {adb_helper.quote(value) if value is not None else 'reset'}")
+        elif namespace == PACKAGE_NAMESPACE:
+            action = "disable-user --user 0" if value == "disabled" else "enable"
+            lines.append(f"pm {action} {adb_helper.quote(key)}")
+        elif value is None:
+            lines.append(f"settings delete {namespace} {adb_helper.quote(key)}")
+        else:
+            lines.append(f"settings put {namespace} {adb_helper.quote(key)} {adb_helper.quote(value)}")
+    return lines
+
+def build_checked_put_lines(changes, flag=None):
+    """
+    Tạo các lệnh ghi cài đặt, mỗi lệnh in "@@fail <namespace>/<key>" và lỗi nếu thất bại
+    
+    Args:
+        changes (dict): {(namespace, key): giá trị}, giá trị None để xóa cài đặt
+        flag (str, optional): Tên biến shell được đặt thành 1 khi có lệnh thất bại
+        
+    Returns:
+        list: Các dòng lệnh
+    """
+    mark = f"{flag}=1; " if flag else ""
+    lines = []
+    for (namespace, key), line in zip(changes, build_put_lines(changes)):
+        name = adb_helper.quote(f"{namespace}/{key}")
+        lines.append(f"out=$({line} 2>&1) || {{ {mark}echo @@fail {name}; echo \"$out\"; }}")
+    return lines
+
+def parse_put_failures(output):
+    """
+    Lấy các cài đặt ghi thất bại từ output của các lệnh build_checked_put_lines
+    
+    Args:
+        output (str): Output của script
+        
+    Returns:
+        dict: {(namespace, key): thông báo lỗi}
+    """
+    failed = {}
+    for block, message in adb_helper.parse_marked_output(output).items():
+        if block.startswith("fail "):
+            namespace, key = block[5:].split("/", 1)
+            failed[(namespace, key)] = message.strip() or "lỗi không xác định"
+    return failed
+
+def put_settings_batch(changes, serial=None):
+    """
+    Ghi nhiều cài đặt trong một lệnh adb
+    
+    Mỗi lệnh được kiểm tra mã thoát trên thiết bị; chỉ các cài đặt ghi thành công
+    được cập nhật vào bộ nhớ đệm.
+    
+    Args:
+        changes (dict): {(namespace, key): giá trị}, giá trị None để xóa cài đặt
+        serial (str, optional): Serial của thiết bị
+        
+    Returns:
+        dict: {(namespace, key): thông báo lỗi} của các cài đặt ghi thất bại (rỗng nếu tất cả thành công),
+              hoặc None nếu không chạy được lệnh adb
+    """
+    if not changes:
+        return {}
+        
+    output = adb_helper.run_shell_script("\n".join(build_checked_put_lines(changes)), serial=serial)
+    if output is None:
+        return None
+        
+    failed = parse_put_failures(output)
+    update_settings_cache({k: v for k, v in changes.items() if k not in failed}, serial)
+    return failed
+
+def apply_settings_transaction(changes, serial=None, source="settings", previous=None, failures=None):
+    """
+    Áp dụng nhiều cài đặt như một giao dịch có thể hoàn tác
+    
+    Đọc giá trị cũ của mọi cài đặt trong một lệnh, ghi tất cả giá trị mới trong một lệnh
+    và lưu cả hai vào nhật ký thành một phiên. Nếu một số cài đặt bị thiết bị từ chối,
+    chỉ các cài đặt đã ghi được lưu vào nhật ký (để vẫn hoàn tác được) và giao dịch
+    được coi là thất bại.
+    
+    Args:
+        changes (dict): {(namespace, key): giá trị mới}
+        serial (str, optional): Serial của thiết bị
+        source (str): Chức năng thực hiện thay đổi (lưu vào nhật ký)
+        previous (dict, optional): Giá trị cũ đã đọc trước đó, bỏ qua lần đọc lại
+        failures (dict, optional): Nhận {(namespace, key): thông báo lỗi} của các cài đặt ghi thất bại
+        
+    Returns:
+        str: Mã phiên trong nhật ký, hoặc None nếu ghi thất bại
+    """
+    if previous is None:
+        previous = get_settings_batch(list(changes), serial)
+    
+    failed = put_settings_batch(changes, serial)
+    if failed is None:
+        return None
+        
+    applied = {key: value for key, value in changes.items() if key not in failed}
+    session = settings_journal.new_session_id()
+    if applied:
+        settings_journal.record_changes(session, serial, source, previous, applied)
+        
+    if failed:
+        if failures is not None:
+            failures.update(failed)
+        log.error(f"{source}: thiết bị từ chối {len(failed)} cài đặt: " + "; ".join(
+            f"{namespace}/{key}: {message}" for (namespace, key), message in failed.items()
+        ))
+        return None
+    return session
+
+def revert_sessions(sessions, serial=None, overwrite_later=False, ignore=()):
+    """
+    Khôi phục chính xác giá trị trước các phiên đã chọn trong một lệnh adb
+    
+    Các cài đặt đã bị một phiên sau đó thay đổi lại được bỏ qua (để không ghi đè
+    thay đổi mới hơn), trừ khi overwrite_later là True.
+    
+    Args:
+        sessions (list): Các mã phiên cần hoàn tác
+        serial (str, optional): Serial của thiết bị
+        overwrite_later (bool): Vẫn khôi phục cả các cài đặt đã bị phiên sau thay đổi
+        ignore (iterable): Các phiên không tính là thay đổi mới hơn (xem settings_journal.later_changes)
+        
+    Returns:
+        dict: Các giá trị đã khôi phục, hoặc None nếu thất bại
+    """
+    entries = settings_journal.load_entries(serial)
+    values = settings_journal.restore_values(entries, sessions)
+    if not overwrite_later:
+        for key in settings_journal.later_changes(entries, sessions, ignore):
+            values.pop(key, None)
+    
+    if not values:
+        return {}
+        
+    session = apply_settings_transaction(values, serial, source=f"revert:{','.join(sessions)}")
+    return values if session else None
+
+def show_journal_sessions(sessions):
+    """
+    Hiển thị các phiên thay đổi cài đặt
+    
+    Args:
+        sessions (list): Các phiên từ settings_journal.list_sessions
+    """
+    table = Table(title="Nhật ký thay đổi cài đặt")
+    table.add_column("STT", style="cyan")
+    table.add_column("Thời gian", style="green")
+    table.add_column("Chức năng", style="blue")
+    table.add_column("Số cài đặt", style="yellow")
+    for idx, session in enumerate(sessions, 1):
+        table.add_row(str(idx), session["time"], session["source"], str(session["count"]))
+    console.print(table)
+
+def ask_overwrite_later(entries, sessions, ignore=()):
+    """
+    Cảnh báo các cài đặt đã bị phiên mới hơn thay đổi lại và hỏi cách xử lý
+    
+    Args:
+        entries (list): Các mục từ settings_journal.load_entries
+        sessions (list): Các mã phiên cần hoàn tác
+        ignore (iterable): Các phiên không tính là thay đổi mới hơn
+        
+    Returns:
+        bool: True nếu ghi đè thay đổi mới hơn, False nếu bỏ qua, None nếu người dùng hủy
+    """
+    conflicts = settings_journal.later_changes(entries, sessions, ignore)
+    if not conflicts:
+        return False
+        
+    console.print(f"[yellow]{len(conflicts)} cài đặt đã được thay đổi lại bởi phiên mới hơn:[/yellow]")
+    for (namespace, key), later in conflicts.items():
+        console.print(f"[yellow]  {namespace}.{key} (phiên {', '.join(later)})[/yellow]")
+    answer = questionary.select(
+        "Xử lý các cài đặt này thế nào?",
+        choices=["Bỏ qua (giữ giá trị mới hơn)", "Vẫn khôi phục (ghi đè thay đổi mới hơn)", "↩️ Hủy"]
+    ).ask()
+    if not answer or "Hủy" in answer:
+        return None
+    return "Vẫn khôi phục" in answer
+
+def journal_menu(serial=None):
+    """
+    Menu xem nhật ký và hoàn tác các thay đổi cài đặt
+    
+    Args:
+        serial (str, optional): Serial của thiết bị
+    """
+    entries = settings_journal.load_entries(serial)
+    sessions = settings_journal.list_undoable_sessions(entries)
+    
+    if not sessions:
+        console.print("[yellow]Chưa có thay đổi nào có thể hoàn tác.[/yellow]")
+        input("\nNhấn Enter để tiếp tục...")
+        return
+        
+    show_journal_sessions(sessions[:20])
+    choice = questionary.select(
+        "Chọn thao tác:",
+        choices=[
+            "1️⃣ Hoàn tác N thay đổi gần nhất",
+            "2️⃣ Hoàn tác một phiên",
+            "↩️ Quay lại"
+        ]
+    ).ask()
+    
+    if not choice or "Quay lại" in choice:
+        return
+        
+    if "N thay đổi" in choice:
+        count = questionary.text("Số phiên cần hoàn tác:", default="1").ask()
+        if not count or not count.isdigit() or int(count) < 1:
+            return
+        selected = [s["session"] for s in sessions[:int(count)]]
+    else:
+        labels = [f"{s['time']} - {s['source']} ({s['count']} cài đặt)" for s in sessions]
+        label = questionary.select("Chọn phiên cần hoàn tác:", choices=labels + ["↩️ Hủy"]).ask()
+        if not label or "Hủy" in label:
+            return
+        selected = [sessions[labels.index(label)]["session"]]
+        
+    overwrite_later = ask_overwrite_later(settings_journal.load_entries(serial), selected)
+    if overwrite_later is None:
+        return
+        
+    values = revert_sessions(selected, serial, overwrite_later)
+    if values is None:
+        console.print("[bold red]✗[/bold red] Không thể hoàn tác")
+    else:
+        for (namespace, key), value in values.items():
+            console.print(f"[green]{namespace}.{key} → {value if value is not None else '(mặc định)'}[/green]")
+        console.print(f"[bold green]✓[/bold green] Đã hoàn tác {len(selected)} phiên ({len(values)} cài đặt)")
+        log.info(f"Đã hoàn tác {len(selected)} phiên thay đổi cài đặt ({len(values)} cài đặt)")
+        
+    input("\nNhấn Enter để tiếp tục...")
+
+# Thư mục tạm trên thiết bị để lưu trạng thái của chế độ theo dõi
+WATCH_DIR = "/data/local/tmp/adb_toolbox_watch"
+
+def build_watch_script(namespaces, keys=None, interval=1):
+    """
+    Tạo script theo dõi cài đặt, so sánh ngay trên thiết bị và chỉ in ra các dòng thay đổi
+    
+    Mỗi lần có thay đổi in ra "@@change <epoch>", các dòng "-ns key=cũ" / "+ns key=mới",
+    ứng dụng tiền cảnh sau "@@top" và kết thúc bằng "@@end".
+    
+    Args:
+        namespaces (list): Các namespace cần theo dõi
+        keys (list, optional): Chỉ theo dõi các key này
+        interval (float): Khoảng thời gian giữa hai lần đọc (giây)
+        
+    Returns:
+        str: Nội dung script
+    """
+    pattern = adb_helper.quote(f"^({'|'.join(re.escape(k) for k in keys)})=" if keys else ".")
+    snapshot = "\n".join(
+        f"  settings list {ns} | grep -E {pattern} | sort > {WATCH_DIR}/{ns}.$1" for ns in namespaces
+    )
+    compare = "\n".join(
+        f"""  if ! cmp -s {WATCH_DIR}/{ns}.old {WATCH_DIR}/{ns}.new; then
+    [ -z "$changed" ] && echo "@@change $(date +%s)" && changed=1
+    grep -vxF -f {WATCH_DIR}/{ns}.new {WATCH_DIR}/{ns}.old | sed 's/^/-{ns} /'
+    grep -vxF -f {WATCH_DIR}/{ns}.old {WATCH_DIR}/{ns}.new | sed 's/^/+{ns} /'
+    mv {WATCH_DIR}/{ns}.new {WATCH_DIR}/{ns}.old
+  fi""" for ns in namespaces
+    )
+    return f"""mkdir -p {WATCH_DIR}
+snapshot() {{
+{snapshot}
+}}
+snapshot old
+while true; do
+  sleep {interval}
+  snapshot new
+  changed=
+{compare}
+  if [ -n "$changed" ]; then
+    echo @@top
+    dumpsys activity activities | grep -m 1 -E 'mResumedActivity|topResumedActivity'
+    echo @@end
+  fi
+done
+"""
+
+def iter_watch_events(process):
+    """
+    Đọc các thay đổi từ output của script theo dõi
+    
+    Args:
+        process (subprocess.Popen): Tiến trình từ adb_helper.open_shell_stream
+        
+    Yields:
+        tuple: (thời điểm, {(namespace, key): (giá trị cũ, giá trị mới)}, ứng dụng tiền cảnh hoặc None)
+    """
+    timestamp = None
+    changes = {}
+    top = None
+    in_top = False
+    for line in process.stdout:
+        line = line.rstrip("\n")
+        if line.startswith("@@change "):
+            timestamp = int(line.split()[1]) if line.split()[1].isdigit() else time.time()
+            changes = {}
+            top = None
+            in_top = False
+        elif line == "@@top":
+            in_top = True
+        elif line == "@@end":
+            yield timestamp, changes, top
+        elif in_top:
+            match = re.search(r"\s([\w.]+)/", line)
+            top = match.group(1) if match else None
+        elif line[:1] in ("-", "+") and " " in line:
+            namespace, entry = line[1:].split(" ", 1)
+            key, _, value = entry.partition("=")
+            old, new = changes.get((namespace, key), (None, None))
+            changes[(namespace, key)] = (value, new) if line[0] == "-" else (old, value)
+
+def watch_settings(namespaces, keys=None, interval=1, serial=None):
+    """
+    Theo dõi và in ra các thay đổi cài đặt tới khi nhấn Ctrl+C
+    
+    Args:
+        namespaces (list): Các namespace cần theo dõi
+        keys (list, optional): Chỉ theo dõi các key này
+        interval (float): Khoảng thời gian giữa hai lần đọc (giây)
+        serial (str, optional): Serial của thiết bị
+        
+    Returns:
+        int: Số thay đổi đã ghi nhận
+    """
+    process = adb_helper.open_shell_stream(build_watch_script(namespaces, keys, interval), serial)
+    count = 0
+    try:
+        for timestamp, changes, top in iter_watch_events(process):
+            moment = time.strftime("%H:%M:%S", time.localtime(timestamp))
+            update_settings_cache({key: new for key, (_, new) in changes.items()}, serial)
+            for (namespace, key), (old, new) in changes.items():
+                count += 1
+                console.print(
+                    f"[cyan]{moment}[/cyan] {namespace}.[bold]{key}[/bold]: "
+                    f"[red]{old if old is not None else '(không có)'}[/red] → "
+                    f"[green]{new if new is not None else '(đã xóa)'}[/green]"
+                    + (f" [dim](tiền cảnh: {top})[/dim]" if top else "")
+                )
+                log.info(f"Cài đặt thay đổi {namespace}.{key}: {old} → {new} (tiền cảnh: {top or 'không rõ'})")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if process.poll() is None:
+            process.kill()
+        adb_helper.run_shell_script(f"rm -rf {WATCH_DIR}", serial=serial)
+    return count
+
+def watch_menu():
+    """Menu theo dõi thay đổi cài đặt"""
+    namespaces = questionary.checkbox("Chọn namespace cần theo dõi:", choices=NAMESPACES).ask()
+    if not namespaces:
+        return
+        
+    keys = questionary.text("Chỉ theo dõi các key (cách nhau bởi dấu phẩy, để trống để theo dõi tất cả):").ask()
+    keys = [k.strip() for k in (keys or "").split(",") if k.strip()]
+    
+    console.print("[yellow]Đang theo dõi thay đổi cài đặt. Nhấn Ctrl+C để dừng...[/yellow]")
+    count = watch_settings(namespaces, keys or None)
+    console.print(f"[bold green]✓[/bold green] Đã dừng theo dõi ({count} thay đổi)")
+    input("\nNhấn Enter để tiếp tục...")
 
 def settings_menu():
     """Menu tùy chỉnh hệ thống"""
@@ -86,6 +592,8 @@ def settings_menu():
                 "2️⃣ Cài đặt bảo mật (secure)",
                 "3️⃣ Cài đặt toàn cục (global)",
                 "4️⃣ Tùy chỉnh tùy ý (custom)",
+                "5️⃣ Nhật ký thay đổi và hoàn tác",
+                "6️⃣ Theo dõi thay đổi cài đặt (watch)",
                 "↩️ Quay lại"
             ]
         ).ask()
@@ -101,6 +609,10 @@ def settings_menu():
             show_settings_list("global")
         elif "custom" in namespace:
             custom_setting()
+        elif "Nhật ký" in namespace:
+            journal_menu()
+        elif "Theo dõi" in namespace:
+            watch_menu()
 
 def show_settings_list(namespace):
     """
@@ -116,6 +628,7 @@ def show_settings_list(namespace):
     table.add_column("Mô tả", style="green")
     table.add_column("Giá trị hiện tại", style="yellow")
     
+    load_namespaces([namespace], refresh=True)
     for setting in settings:
         current_value = get_current_setting(namespace, setting["name"])
         table.add_row(
@@ -137,6 +650,30 @@ def show_settings_list(namespace):
     selected_setting = next((s for s in settings if s["name"] == setting_name), None)
     change_setting(namespace, selected_setting)
 
+def write_setting(namespace, key, value, current_value, source):
+    """
+    Ghi một cài đặt qua giao dịch và chỉ báo thành công khi thiết bị đã nhận giá trị
+    
+    Args:
+        namespace (str): Namespace của cài đặt
+        key (str): Tên cài đặt
+        value (str): Giá trị mới
+        current_value (str): Giá trị hiện tại (để ghi log)
+        source (str): Chức năng thực hiện thay đổi (lưu vào nhật ký)
+        
+    Returns:
+        bool: True nếu ghi thành công
+    """
+    failures = {}
+    if apply_settings_transaction({(namespace, key): value}, source=source, failures=failures):
+        console.print(f"[bold green]✓[/bold green] Đã thay đổi [cyan]{key}[/cyan] thành [yellow]{value}[/yellow]")
+        log.info(f"Đã thay đổi {namespace}.{key} từ {current_value} thành {value}")
+        return True
+        
+    error = failures.get((namespace, key))
+    console.print("[bold red]✗[/bold red] Không thể thay đổi cài đặt" + (f": {error}" if error else ""))
+    return False
+
 def change_setting(namespace, setting):
     """
     Thay đổi giá trị của cài đặt
@@ -168,13 +705,7 @@ def change_setting(namespace, setting):
             return
     
     # Thực hiện thay đổi
-    result = run_adb_command(["adb", "shell", "settings", "put", namespace, setting["name"], value])
-    
-    if result is not None or result == "":  # ADB put thường không trả về output khi thành công
-        console.print(f"[bold green]✓[/bold green] Đã thay đổi [cyan]{setting['name']}[/cyan] thành [yellow]{value}[/yellow]")
-        log.info(f"Đã thay đổi {namespace}.{setting['name']} từ {current_value} thành {value}")
-    else:
-        console.print("[bold red]✗[/bold red] Không thể thay đổi cài đặt")
+    write_setting(namespace, setting["name"], value, current_value, source=f"settings:{namespace}")
 
 def custom_setting():
     """Tùy chỉnh cài đặt tùy ý"""
@@ -203,23 +734,267 @@ def custom_setting():
         return
         
     # Thực hiện thay đổi
-    result = run_adb_command(["adb", "shell", "settings", "put", namespace, key, value])
+    write_setting(namespace, key, value, current_value, source="settings:custom")
+
+# File đánh dấu trên thiết bị: còn tồn tại khi hết thời gian chờ thì cấu hình hiển thị bị khôi phục
+DISPLAY_PENDING_FILE = "/data/local/tmp/adb_toolbox_display.pending"
+
+# Thời gian chờ xác nhận trước khi tự khôi phục (giây)
+DISPLAY_REVERT_TIMEOUT = 20
+
+# Script đọc kích thước màn hình, DPI và tỷ lệ phông chữ trong một lệnh
+DISPLAY_STATE_SCRIPT = """echo @@size
+wm size
+echo @@density
+wm density
+echo @@font
+settings get system font_scale
+"""
+
+def parse_wm_display(output):
+    """
+    Phân tích output của "wm size" và "wm density" (có thể nối liền nhau)
     
-    if result is not None or result == "":
-        console.print(f"[bold green]✓[/bold green] Đã thay đổi [cyan]{key}[/cyan] thành [yellow]{value}[/yellow]")
-        log.info(f"Đã thay đổi {namespace}.{key} từ {current_value} thành {value}")
+    Args:
+        output (str): Output của lệnh
+        
+    Returns:
+        dict: {"size", "size_override", "density", "density_override"}, giá trị None nếu không có
+    """
+    state = {"size": None, "size_override": None, "density": None, "density_override": None}
+    for line in (output or "").splitlines():
+        kind, _, value = line.partition(":")
+        name = "size" if "size" in kind else "density" if "density" in kind else None
+        if name and "Physical" in kind:
+            state[name] = value.strip()
+        elif name and "Override" in kind:
+            state[f"{name}_override"] = value.strip()
+    return state
+
+def get_display_state(serial=None):
+    """
+    Đọc kích thước màn hình, DPI và tỷ lệ phông chữ trong một lệnh adb
+    
+    Args:
+        serial (str, optional): Serial của thiết bị
+        
+    Returns:
+        dict: {"size", "size_override", "density", "density_override", "font_scale"}, giá trị None nếu không có
+    """
+    blocks = adb_helper.parse_marked_output(adb_helper.run_shell_script(DISPLAY_STATE_SCRIPT, serial=serial))
+    state = parse_wm_display(blocks.get("size", "") + "\n" + blocks.get("density", ""))
+    font = blocks.get("font", "").strip()
+    state["font_scale"] = None if font in ("", "null") else font
+    return state
+
+def display_changes(state):
+    """
+    Chuyển trạng thái hiển thị thành các giá trị có thể ghi (và ghi nhật ký)
+    
+    Args:
+        state (dict): Kết quả từ get_display_state
+        
+    Returns:
+        dict: {(namespace, key): giá trị}
+    """
+    return {
+        (WM_NAMESPACE, "size"): state["size_override"],
+        (WM_NAMESPACE, "density"): state["density_override"],
+        ("system", "font_scale"): state["font_scale"]
+    }
+
+def validate_display_input(size, density, font):
+    """
+    Kiểm tra độ phân giải, DPI và tỷ lệ phông chữ trước khi thử trên thiết bị
+    
+    Args:
+        size (str): Độ phân giải dạng WxH hoặc "reset"
+        density (str): DPI (số nguyên) hoặc "reset"
+        font (str): Tỷ lệ phông chữ (số dương)
+        
+    Returns:
+        str: Thông báo lỗi, hoặc None nếu hợp lệ
+    """
+    if size != "reset" and not re.fullmatch(r"\d+x\d+", size):
+        return f"Độ phân giải không hợp lệ: {size} (cần dạng 1080x2400)"
+    if density != "reset" and not (density.isdigit() and int(density) > 0):
+        return f"DPI không hợp lệ: {density} (cần số nguyên dương)"
+    try:
+        if float(font) <= 0:
+            raise ValueError
+    except ValueError:
+        return f"Tỷ lệ phông chữ không hợp lệ: {font} (cần số dương, ví dụ 1.0)"
+    return None
+
+def apply_display_profile(changes, previous, serial=None, timeout=DISPLAY_REVERT_TIMEOUT, failures=None):
+    """
+    Áp dụng kích thước/DPI/phông chữ trong một lệnh và hẹn giờ tự khôi phục ngay trên thiết bị
+    
+    Bộ hẹn giờ chạy bằng nohup nên vẫn khôi phục được khi mất kết nối adb. Nếu thiết bị
+    từ chối một giá trị, các giá trị đã ghi được khôi phục ngay và không hẹn giờ.
+    
+    Args:
+        changes (dict): {(namespace, key): giá trị mới}
+        previous (dict): {(namespace, key): giá trị cũ}
+        serial (str, optional): Serial của thiết bị
+        timeout (int): Số giây chờ xác nhận
+        failures (dict, optional): Nhận {(namespace, key): thông báo lỗi} của các cài đặt ghi thất bại
+        
+    Returns:
+        str: Mã phiên trong nhật ký, hoặc None nếu thất bại
+    """
+    session = settings_journal.new_session_id()
+    revert = "; ".join(build_put_lines({key: previous.get(key) for key in changes}))
+    timer = (
+        f"sleep {timeout}; "
+        f"if [ \"$(cat {DISPLAY_PENDING_FILE} 2>/dev/null)\" = {session} ]; then "
+        f"{revert}; rm -f {DISPLAY_PENDING_FILE}; fi"
+    )
+    script = "\n".join(
+        [f"echo {session} > {DISPLAY_PENDING_FILE}", "failed="]
+        + build_checked_put_lines(changes, flag="failed")
+        + [
+            f"if [ -n \"$failed\" ]; then rm -f {DISPLAY_PENDING_FILE}; {revert} >/dev/null 2>&1; "
+            f"else nohup sh -c {adb_helper.quote(timer)} >/dev/null 2>&1 & fi"
+        ]
+    )
+    output = adb_helper.run_shell_script(script, serial=serial)
+    if output is None:
+        return None
+    failed = parse_put_failures(output)
+    if failed:
+        if failures is not None:
+            failures.update(failed)
+        log.error("dpi: thiết bị từ chối cấu hình hiển thị: " + "; ".join(
+            f"{namespace}/{key}: {message}" for (namespace, key), message in failed.items()
+        ))
+        return None
+        
+    settings_journal.record_changes(session, serial, "dpi", previous, changes)
+    update_settings_cache(changes, serial)
+    return session
+
+def confirm_display_profile(session, serial=None):
+    """
+    Xác nhận giữ cấu hình hiển thị (hủy bộ hẹn giờ khôi phục)
+    
+    Args:
+        session (str): Mã phiên từ apply_display_profile
+        serial (str, optional): Serial của thiết bị
+        
+    Returns:
+        bool: True nếu xác nhận kịp trước khi hết giờ
+    """
+    script = (
+        f"if [ \"$(cat {DISPLAY_PENDING_FILE} 2>/dev/null)\" = {session} ]; then "
+        f"rm -f {DISPLAY_PENDING_FILE}; echo OK; fi"
+    )
+    output = adb_helper.run_shell_script(script, serial=serial)
+    return bool(output) and "OK" in output
+
+def capture_screenshot(serial=None):
+    """
+    Chụp màn hình để kiểm tra cấu hình hiển thị
+    
+    Args:
+        serial (str, optional): Serial của thiết bị
+        
+    Returns:
+        str: Đường dẫn file ảnh, hoặc None nếu thất bại
+    """
+    path = os.path.join(adb_helper.data_dir("screenshots"), f"{serial or 'default'}_{time.strftime('%Y%m%d_%H%M%S')}.png")
+    try:
+        with open(path, "wb") as f:
+            result = adb_helper.run_process(adb_helper.adb_base(serial) + ["exec-out", "screencap", "-p"], stdout=f, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0 or not os.path.getsize(path):
+        os.remove(path)
+        return None
+    return path
+
+def display_lab(state, serial=None):
+    """
+    Thử một tổ hợp độ phân giải/DPI/phông chữ với tự khôi phục nếu không xác nhận
+    
+    Args:
+        state (dict): Kết quả từ get_display_state
+        serial (str, optional): Serial của thiết bị
+    """
+    size = questionary.text(
+        "Độ phân giải (ví dụ 1080x2400, 'reset' để về mặc định):",
+        default=state["size_override"] or state["size"] or ""
+    ).ask()
+    density = questionary.text(
+        "DPI ('reset' để về mặc định):",
+        default=state["density_override"] or state["density"] or ""
+    ).ask()
+    font = questionary.text("Tỷ lệ phông chữ:", default=state["font_scale"] or "1.0").ask()
+    if size is None or density is None or font is None:
+        return
+    size, density, font = size.strip(), density.strip(), font.strip()
+    error = validate_display_input(size, density, font)
+    if error:
+        console.print(f"[bold red]✗[/bold red] {error}")
+        return
+        
+    previous = display_changes(state)
+    wanted = {
+        (WM_NAMESPACE, "size"): None if size in ("reset", state["size"]) else size,
+        (WM_NAMESPACE, "density"): None if density in ("reset", state["density"]) else density,
+        ("system", "font_scale"): font
+    }
+    changes = {key: value for key, value in wanted.items() if previous.get(key) != value}
+    if not changes:
+        console.print("[yellow]Cấu hình hiển thị không thay đổi.[/yellow]")
+        return
+        
+    failures = {}
+    session = apply_display_profile(changes, previous, serial, failures=failures)
+    if not session:
+        console.print("[bold red]✗[/bold red] Không thể áp dụng cấu hình hiển thị")
+        for (namespace, key), message in failures.items():
+            console.print(f"[red]  {namespace}.{key}: {message}[/red]")
+        return
+    started = time.time()
+    log.info(f"Đã thử cấu hình hiển thị {changes} (phiên {session})")
+    
+    # Chờ giao diện vẽ lại trước khi chụp màn hình
+    time.sleep(2)
+    screenshot = capture_screenshot(serial)
+    if screenshot:
+        console.print(f"[green]Ảnh chụp màn hình để kiểm tra: {screenshot}[/green]")
+        
+    remaining = max(0, int(DISPLAY_REVERT_TIMEOUT - (time.time() - started)))
+    console.print(f"[yellow]Cấu hình sẽ tự khôi phục sau khoảng {remaining} giây nếu không được xác nhận.[/yellow]")
+    keep = questionary.confirm("Giữ cấu hình hiển thị mới?", default=False).ask()
+    
+    if keep and confirm_display_profile(session, serial):
+        console.print("[bold green]✓[/bold green] Đã giữ cấu hình hiển thị mới")
+        log.info(f"Đã xác nhận cấu hình hiển thị (phiên {session})")
+        return
+        
+    if keep:
+        # Bộ hẹn giờ trên thiết bị đã khôi phục: bộ nhớ đệm phải theo giá trị cũ
+        update_settings_cache({key: previous.get(key) for key in changes}, serial)
+        console.print("[bold red]✗[/bold red] Đã quá thời gian xác nhận, cấu hình đã được khôi phục")
     else:
-        console.print("[bold red]✗[/bold red] Không thể thay đổi cài đặt")
+        # Khôi phục ngay thay vì chờ hết giờ
+        confirm_display_profile(session, serial)
+        put_settings_batch({key: previous.get(key) for key in changes}, serial)
+        console.print("[bold green]✓[/bold green] Đã khôi phục cấu hình hiển thị trước đó")
+    settings_journal.record_changes(
+        settings_journal.new_session_id(), serial, f"revert:{session}", changes, {key: previous.get(key) for key in changes}
+    )
+    log.info(f"Đã khôi phục cấu hình hiển thị (phiên {session})")
 
 def dpi_menu():
     """Menu thay đổi DPI và scale màn hình"""
-    current_dpi = run_adb_command(["adb", "shell", "wm", "density"])
-    current_scale = get_current_setting("system", "font_scale")
-    
-    if current_dpi:
-        # Trích xuất số DPI từ output "Physical density: 420"
-        current_dpi = current_dpi.split(":")[-1].strip() if ":" in current_dpi else current_dpi
+    state = get_display_state()
+    current_dpi = state["density_override"] or state["density"] or ""
+    current_scale = state["font_scale"] or "null"
     
+    console.print(f"Độ phân giải hiện tại: [yellow]{state['size_override'] or state['size']}[/yellow]")
     console.print(f"DPI hiện tại: [yellow]{current_dpi}[/yellow]")
     console.print(f"Tỷ lệ phông chữ hiện tại: [yellow]{current_scale}[/yellow]")
     
@@ -229,6 +1004,7 @@ def dpi_menu():
             "1️⃣ Thay đổi DPI",
             "2️⃣ Thay đổi tỷ lệ phông chữ",
             "3️⃣ Khôi phục về mặc định",
+            "4️⃣ Thử cấu hình hiển thị (tự khôi phục)",
             "↩️ Quay lại"
         ]
     ).ask()
@@ -242,11 +1018,8 @@ def dpi_menu():
             default=current_dpi
         ).ask()
         
-        if new_dpi:
-            result = run_adb_command(["adb", "shell", "wm", "density", new_dpi])
-            console.print(f"[bold green]✓[/bold green] Đã thay đổi DPI thành [yellow]{new_dpi}[/yellow]")
+        if new_dpi and write_setting(WM_NAMESPACE, "density", new_dpi, current_dpi, source="dpi"):
             console.print("[yellow]Lưu ý: Một số thay đổi có thể yêu cầu khởi động lại thiết bị.[/yellow]")
-            log.info(f"Đã thay đổi DPI từ {current_dpi} thành {new_dpi}")
             
     elif "Thay đổi tỷ lệ phông chữ" in choice:
         new_scale = questionary.text(
@@ -255,15 +1028,22 @@ def dpi_menu():
         ).ask()
         
         if new_scale:
-            result = run_adb_command(["adb", "shell", "settings", "put", "system", "font_scale", new_scale])
-            console.print(f"[bold green]✓[/bold green] Đã thay đổi tỷ lệ phông chữ thành [yellow]{new_scale}[/yellow]")
-            log.info(f"Đã thay đổi tỷ lệ phông chữ từ {current_scale} thành {new_scale}")
+            write_setting("system", "font_scale", new_scale, current_scale, source="dpi")
             
     elif "Khôi phục về mặc định" in choice:
-        run_adb_command(["adb", "shell", "wm", "density", "reset"])
-        run_adb_command(["adb", "shell", "settings", "put", "system", "font_scale", "1.0"])
-        console.print("[bold green]✓[/bold green] Đã khôi phục DPI và tỷ lệ phông chữ về mặc định")
-        log.info("Đã khôi phục DPI và tỷ lệ phông chữ về mặc định")
+        failures = {}
+        if apply_settings_transaction(
+            {(WM_NAMESPACE, "density"): None, ("system", "font_scale"): "1.0"}, source="dpi", failures=failures
+        ):
+            console.print("[bold green]✓[/bold green] Đã khôi phục DPI và tỷ lệ phông chữ về mặc định")
+            log.info("Đã khôi phục DPI và tỷ lệ phông chữ về mặc định")
+        else:
+            console.print("[bold red]✗[/bold red] Không thể khôi phục DPI và tỷ lệ phông chữ về mặc định")
+            for (namespace, key), message in failures.items():
+                console.print(f"[red]  {namespace}.{key}: {message}[/red]")
+        
+    elif "Thử cấu hình hiển thị" in choice:
+        display_lab(state)
     
     input("\nNhấn Enter để tiếp tục...")
 
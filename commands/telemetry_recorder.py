@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module ghi telemetry pin và nhiệt độ dài hạn cho nhiều thiết bị (lưu dạng cột nhị phân)
+
+Chạy không cần giao diện:
+    python -m commands.telemetry_recorder record --interval 1
+    python -m commands.telemetry_recorder summary --serial <serial> --day 20240101
+    python -m commands.telemetry_recorder export --serial <serial> --day 20240101 --output out.csv
+"""
+
+import os
+import sys
+import csv
+import time
+import argparse
+import threading
+from array import array
+import questionary
+from rich.console import Console
+from rich.table import Table
+from utils import logger
+from utils import adb_helper
+from commands import device_check
+from commands import live_monitor
+
+console = Console()
+log = logger.setup_logger()
+
+# Các cột được lưu: tên -> (typecode của array, giá trị khi thiếu dữ liệu)
+COLUMNS = {
+    "ts": ("q", 0),                  # thời điểm (ms từ epoch)
+    "battery_level": ("h", -1),      # %
+    "battery_temp": ("h", -32768),   # 0.1 °C
+    "battery_voltage": ("h", -1),    # mV
+    "current": ("i", -2 ** 31),      # µA (dương: đang sạc, tùy thiết bị)
+    "thermal_max": ("h", -32768),    # 0.1 °C
+    "thermal_status": ("b", -1),     # trạng thái throttling của thermalservice
+    "mem_available": ("i", -1)       # KB
+}
+
+# Số mẫu giữ trong RAM cho mỗi thiết bị trước khi ghi xuống đĩa
+CHUNK_SIZE = 300
+
+# Chu kỳ kiểm tra thiết bị mới cắm vào (giây)
+DEVICE_SCAN_INTERVAL = 30
+
+# Các khối lấy thêm ngoài khối mặc định của live_monitor
+TELEMETRY_SECTIONS = {
+    "current": "cat /sys/class/power_supply/battery/current_now 2>/dev/null",
+    "throttle": "dumpsys thermalservice 2>/dev/null | grep -m 1 'Thermal Status'"
+}
+
+# File ghi số mẫu đã ghi đủ vào mọi cột, cập nhật sau cùng trong mỗi lần ghi
+COUNT_FILE = "rows.count"
+
+def get_telemetry_dir(serial, day=None):
+    """
+    Lấy thư mục lưu telemetry của một thiết bị trong một ngày
+
+    Args:
+        serial (str): Serial của thiết bị
+        day (str, optional): Ngày dạng YYYYMMDD, None để lấy thư mục gốc của thiết bị
+
+    Returns:
+        str: Đường dẫn thư mục
+    """
+    parts = [serial] + ([day] if day else [])
+    return adb_helper.data_dir("telemetry", *parts)
+
+def sample_to_row(timestamp, sections):
+    """
+    Chuyển một mẫu thô thành một hàng giá trị theo COLUMNS
+
+    Args:
+        timestamp (float): Thời điểm nhận mẫu
+        sections (dict): Các khối của mẫu
+
+    Returns:
+        dict: {tên cột: giá trị số nguyên}
+    """
+    sample = live_monitor.parse_sample(sections)
+    row = {name: missing for name, (_, missing) in COLUMNS.items()}
+    row["ts"] = int(timestamp * 1000)
+
+    if sample["battery_level"] is not None:
+        row["battery_level"] = sample["battery_level"]
+    if sample["battery_temp"] is not None:
+        row["battery_temp"] = sample["battery_temp"]
+    if sample["battery_voltage"] is not None:
+        row["battery_voltage"] = min(sample["battery_voltage"], 32767)
+    if sample["thermal_max"] is not None:
+        row["thermal_max"] = int(sample["thermal_max"] * 10)
+    if sample["mem_available"] is not None:
+        row["mem_available"] = sample["mem_available"]
+
+    current = sections.get("current", "").strip()
+    if current.lstrip("-").isdigit():
+        row["current"] = max(min(int(current), 2 ** 31 - 1), -2 ** 31 + 1)
+
+    status = sections.get("throttle", "").split(":")[-1].strip()
+    if status.isdigit():
+        row["thermal_status"] = int(status)
+
+    return row
+
+class ColumnWriter:
+    """Gom mẫu của một thiết bị trong RAM và ghi nối vào các file cột theo từng khối"""
+
+    def __init__(self, serial):
+        self.serial = serial
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.columns = {name: array(typecode) for name, (typecode, _) in COLUMNS.items()}
+        self.day = None
+
+    def append(self, row):
+        """Thêm một hàng, ghi xuống đĩa khi đủ CHUNK_SIZE mẫu hoặc khi sang ngày mới"""
+        day = time.strftime("%Y%m%d", time.localtime(row["ts"] / 1000))
+        with self.lock:
+            if self.day is not None and day != self.day:
+                self._flush_locked()
+            self.day = day
+            for name, value in row.items():
+                self.columns[name].append(value)
+            if len(self.columns["ts"]) >= CHUNK_SIZE:
+                self._flush_locked()
+
+    def flush(self):
+        """Ghi các mẫu còn lại xuống đĩa"""
+        with self.lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self.day or not len(self.columns["ts"]):
+            return
+        directory = get_telemetry_dir(self.serial, self.day)
+        committed = read_committed_rows(directory)
+        if committed is None:
+            committed = len(load_columns(self.serial, self.day)["ts"])
+        for name, values in self.columns.items():
+            path = os.path.join(directory, f"{name}.{values.typecode}")
+            with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+                # Đưa cột về đúng số mẫu đã ghi đủ: bỏ phần ghi dở của lần lỗi trước,
+                # bù giá trị thiếu nếu file cột bị mất
+                size = committed * values.itemsize
+                f.truncate(min(size, os.fstat(f.fileno()).st_size))
+                f.seek(0, os.SEEK_END)
+                missing = committed - f.tell() // values.itemsize
+                if missing > 0:
+                    array(values.typecode, [COLUMNS[name][1]] * missing).tofile(f)
+                values.tofile(f)
+        write_committed_rows(directory, committed + len(self.columns["ts"]))
+        self._reset()
+
+def read_committed_rows(directory):
+    """
+    Đọc số mẫu đã được ghi đủ vào mọi cột
+
+    Args:
+        directory (str): Thư mục telemetry của một ngày
+
+    Returns:
+        int: Số mẫu, None nếu chưa có file đếm (dữ liệu cũ)
+    """
+    try:
+        with open(os.path.join(directory, COUNT_FILE), "r", encoding="utf-8") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+def write_committed_rows(directory, rows):
+    """
+    Ghi số mẫu đã được ghi đủ vào mọi cột (thay thế nguyên tử)
+
+    Args:
+        directory (str): Thư mục telemetry của một ngày
+        rows (int): Số mẫu
+    """
+    path = os.path.join(directory, COUNT_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(str(rows))
+    os.replace(path + ".tmp", path)
+
+def load_columns(serial, day):
+    """
+    Đọc tất cả cột đã lưu của một thiết bị trong một ngày
+
+    Chỉ đọc tới số mẫu trong COUNT_FILE (phần ghi dở của lần ghi bị gián đoạn bị bỏ qua);
+    cột thiếu được điền giá trị thiếu dữ liệu. Dữ liệu cũ chưa có COUNT_FILE được cắt
+    về độ dài của cột ngắn nhất.
+
+    Args:
+        serial (str): Serial của thiết bị
+        day (str): Ngày dạng YYYYMMDD
+
+    Returns:
+        dict: {tên cột: array}
+    """
+    directory = get_telemetry_dir(serial, day)
+    columns = {}
+    for name, (typecode, _) in COLUMNS.items():
+        values = array(typecode)
+        path = os.path.join(directory, f"{name}.{typecode}")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            # Bỏ phần tử ghi dở ở cuối file
+            values.frombytes(data[:len(data) - len(data) % values.itemsize])
+        columns[name] = values
+
+    rows = read_committed_rows(directory)
+    if rows is None:
+        rows = min(len(values) for values in columns.values())
+    for name, values in columns.items():
+        del values[rows:]
+        if len(values) < rows:
+            values.extend([COLUMNS[name][1]] * (rows - len(values)))
+    return columns
+
+def summarize_columns(columns):
+    """
+    Tính min/max/trung bình của từng cột (bỏ qua giá trị thiếu)
+
+    Args:
+        columns (dict): Kết quả từ load_columns
+
+    Returns:
+        dict: Thống kê theo cột và thông tin chung (số mẫu, thời gian, thời gian bị throttling)
+    """
+    stats = {}
+    for name, (_, missing) in COLUMNS.items():
+        if name == "ts":
+            continue
+        values = [v for v in columns[name] if v != missing]
+        stats[name] = {
+            "min": min(values) if values else None,
+            "max": max(values) if values else None,
+            "mean": sum(values) / len(values) if values else None
+        }
+
+    ts = columns["ts"]
+    throttled = sum(1 for v in columns["thermal_status"] if v > 0)
+    levels = [v for v in columns["battery_level"] if v >= 0]
+    hours = (ts[-1] - ts[0]) / 3600000 if len(ts) > 1 else 0
+    return {
+        "samples": len(ts),
+        "start": time.strftime("%H:%M:%S", time.localtime(ts[0] / 1000)) if ts else "-",
+        "end": time.strftime("%H:%M:%S", time.localtime(ts[-1] / 1000)) if ts else "-",
+        "hours": hours,
+        "throttled_pct": 100.0 * throttled / len(ts) if ts else 0.0,
+        "level_per_hour": (levels[-1] - levels[0]) / hours if hours and len(levels) > 1 else None,
+        "columns": stats
+    }
+
+def export_csv(serial, day, output):
+    """
+    Xuất telemetry của một ngày ra file CSV
+
+    Args:
+        serial (str): Serial của thiết bị
+        day (str): Ngày dạng YYYYMMDD
+        output (str): Đường dẫn file CSV
+
+    Returns:
+        int: Số mẫu đã xuất
+    """
+    columns = load_columns(serial, day)
+    names = list(COLUMNS)
+    with open(output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        for i in range(len(columns["ts"])):
+            writer.writerow([
+                "" if columns[name][i] == COLUMNS[name][1] else columns[name][i]
+                for name in names
+            ])
+    return len(columns["ts"])
+
+def record_device(serial, interval, stop_event, writers):
+    """
+    Ghi telemetry liên tục của một thiết bị qua một shell duy nhất
+
+    Args:
+        serial (str): Serial của thiết bị
+        interval (float): Khoảng thời gian giữa hai mẫu (giây)
+        stop_event (threading.Event): Sự kiện dừng ghi
+        writers (dict): {serial: ColumnWriter} dùng chung
+    """
+    writer = writers.setdefault(serial, ColumnWriter(serial))
+    script = live_monitor.build_sampler_script(interval, extra_sections=TELEMETRY_SECTIONS)
+    process = adb_helper.open_shell_stream(script, serial)
+    try:
+        for timestamp, sections in live_monitor.iter_samples(process):
+            writer.append(sample_to_row(timestamp, sections))
+            if stop_event.is_set():
+                break
+    finally:
+        if process.poll() is None:
+            process.kill()
+        writer.flush()
+
+def record_all(interval=1, devices=None, stop_event=None):
+    """
+    Ghi telemetry cho mọi thiết bị đang kết nối, tự thêm thiết bị mới cắm vào
+
+    Args:
+        interval (float): Khoảng thời gian giữa hai mẫu (giây)
+        devices (list, optional): Chỉ ghi các thiết bị này
+        stop_event (threading.Event, optional): Sự kiện dừng ghi
+    """
+    stop_event = stop_event or threading.Event()
+    writers = {}
+    threads = {}
+    log.info(f"Bắt đầu ghi telemetry (chu kỳ {interval}s)")
+
+    try:
+        while not stop_event.is_set():
+            for serial in devices or device_check.get_connected_devices():
+                thread = threads.get(serial)
+                if thread is None or not thread.is_alive():
+                    thread = threading.Thread(
+                        target=record_device,
+                        args=(serial, interval, stop_event, writers),
+                        daemon=True
+                    )
+                    thread.start()
+                    threads[serial] = thread
+            stop_event.wait(DEVICE_SCAN_INTERVAL)
+    finally:
+        stop_event.set()
+        for writer in writers.values():
+            writer.flush()
+        log.info(f"Đã dừng ghi telemetry ({len(writers)} thiết bị)")
+
+def show_summary(serial, day):
+    """
+    Hiển thị tóm tắt telemetry của một thiết bị trong một ngày
+
+    Args:
+        serial (str): Serial của thiết bị
+        day (str): Ngày dạng YYYYMMDD
+    """
+    summary = summarize_columns(load_columns(serial, day))
+    if not summary["samples"]:
+        console.print(f"[yellow]Không có dữ liệu cho {serial} ngày {day}.[/yellow]")
+        return
+
+    console.print(
+        f"[bold cyan]{serial} - {day}[/bold cyan]: {summary['samples']} mẫu "
+        f"({summary['start']} → {summary['end']}, {summary['hours']:.1f} giờ), "
+        f"throttling {summary['throttled_pct']:.1f}% thời gian"
+    )
+    if summary["level_per_hour"] is not None:
+        console.print(f"Tốc độ thay đổi pin: [yellow]{summary['level_per_hour']:+.1f}%/giờ[/yellow]")
+
+    scales = {"battery_temp": 10, "thermal_max": 10}
+    table = Table(title="Thống kê telemetry")
+    table.add_column("Chỉ số", style="cyan")
+    table.add_column("Nhỏ nhất", style="green")
+    table.add_column("Lớn nhất", style="red")
+    table.add_column("Trung bình", style="yellow")
+    for name, stats in summary["columns"].items():
+        scale = scales.get(name, 1)
+        cells = ["-" if stats[k] is None else f"{stats[k] / scale:.1f}" for k in ("min", "max", "mean")]
+        table.add_row(name, *cells)
+    console.print(table)
+
+def select_recording():
+    """
+    Cho người dùng chọn thiết bị và ngày đã ghi
+
+    Returns:
+        tuple: (serial, day), hoặc (None, None) nếu không có dữ liệu
+    """
+    root = adb_helper.data_dir("telemetry")
+    serials = sorted(os.listdir(root))
+    if not serials:
+        console.print("[yellow]Chưa có dữ liệu telemetry nào.[/yellow]")
+        return None, None
+
+    serial = questionary.select("Chọn thiết bị:", choices=serials).ask()
+    if not serial:
+        return None, None
+    days = sorted(os.listdir(get_telemetry_dir(serial)), reverse=True)
+    day = questionary.select("Chọn ngày:", choices=days).ask() if days else None
+    return serial, day
+
+def telemetry_menu():
+    """Menu ghi và xem telemetry pin/nhiệt độ"""
+    choice = questionary.select(
+        "Chọn chức năng:",
+        choices=[
+            "1️⃣ Bắt đầu ghi (Ctrl+C để dừng)",
+            "2️⃣ Xem tóm tắt",
+            "3️⃣ Xuất CSV",
+            "↩️ Quay lại"
+        ]
+    ).ask()
+
+    if not choice or "Quay lại" in choice:
+        return
+
+    if "Bắt đầu ghi" in choice:
+        interval = questionary.text("Chu kỳ lấy mẫu (giây):", default="1").ask()
+        if not interval:
+            return
+        console.print("[yellow]Đang ghi telemetry cho mọi thiết bị. Nhấn Ctrl+C để dừng...[/yellow]")
+        try:
+            record_all(float(interval))
+        except KeyboardInterrupt:
+            pass
+        console.print("[bold green]✓[/bold green] Đã dừng ghi telemetry")
+
+    elif "Xem tóm tắt" in choice:
+        serial, day = select_recording()
+        if serial and day:
+            show_summary(serial, day)
+
+    elif "Xuất CSV" in choice:
+        serial, day = select_recording()
+        if serial and day:
+            output = questionary.path("Đường dẫn file CSV:", default=f"telemetry_{serial}_{day}.csv").ask()
+            if output:
+                count = export_csv(serial, day, output)
+                console.print(f"[bold green]✓[/bold green] Đã xuất {count} mẫu ra {output}")
+
+    input("\nNhấn Enter để tiếp tục...")
+
+def main(argv=None):
+    """Điểm vào khi chạy không cần giao diện"""
+    parser = argparse.ArgumentParser(description="Ghi telemetry pin và nhiệt độ cho các thiết bị Android")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record = subparsers.add_parser("record", help="Ghi telemetry cho mọi thiết bị đang kết nối")
+    record.add_argument("--interval", type=float, default=1, help="Chu kỳ lấy mẫu (giây)")
+    record.add_argument("--devices", nargs="*", help="Chỉ ghi các thiết bị này")
+
+    summary = subparsers.add_parser("summary", help="Tóm tắt telemetry đã ghi")
+    summary.add_argument("--serial", required=True)
+    summary.add_argument("--day", default=time.strftime("%Y%m%d"))
+
+    export = subparsers.add_parser("export", help="Xuất telemetry ra CSV")
+    export.add_argument("--serial", required=True)
+    export.add_argument("--day", default=time.strftime("%Y%m%d"))
+    export.add_argument("--output", required=True)
+
+    args = parser.parse_args(argv)
+    if args.command == "record":
+        try:
+            record_all(args.interval, args.devices)
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "summary":
+        show_summary(args.serial, args.day)
+    elif args.command == "export":
+        count = export_csv(args.serial, args.day, args.output)
+        console.print(f"[bold green]✓[/bold green] Đã xuất {count} mẫu ra {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
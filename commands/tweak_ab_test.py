@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module đo hiệu quả trước/sau (A/B) của các bộ tối ưu hiệu suất
+"""
+
+import re
+import math
+import statistics
+import questionary
+from rich.console import Console
+from rich.table import Table
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
+from utils import logger
+from utils import adb_helper
+from commands import device_check
+from commands import launch_benchmark
+from commands import system_settings
+
+console = Console()
+log = logger.setup_logger()
+
+# Các chỉ số được đo: tên hiển thị và hướng tốt (-1: càng nhỏ càng tốt, 1: càng lớn càng tốt)
+METRICS = {
+    "launch_ms": ("Khởi động cold (ms)", -1),
+    "janky_pct": ("Khung hình giật (%)", -1),
+    "mem_available_mb": ("RAM trống (MB)", 1)
+}
+
+# Giá trị t (hai phía, 95%) theo bậc tự do, dùng cho khoảng tin cậy với ít mẫu
+T_CRITICAL_95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306,
+    9: 2.262, 10: 2.228, 12: 2.179, 15: 2.131, 20: 2.086, 30: 2.042
+}
+
+# Số lần vuốt khi đo khung hình giật
+SWIPES = 10
+
+def t_critical(df):
+    """
+    Lấy giá trị t tới hạn 95% cho bậc tự do df
+
+    Args:
+        df (float): Bậc tự do
+
+    Returns:
+        float: Giá trị t
+    """
+    if df > 30:
+        return 1.96
+    # Dùng bậc tự do nhỏ hơn gần nhất để khoảng tin cậy không bị hẹp quá
+    return T_CRITICAL_95[max(k for k in T_CRITICAL_95 if k <= max(1, int(df)))]
+
+def delta_with_ci(before, after):
+    """
+    Tính chênh lệch trung bình (sau - trước) và khoảng tin cậy 95% (Welch)
+
+    Args:
+        before (list): Các giá trị trước khi áp dụng
+        after (list): Các giá trị sau khi áp dụng
+
+    Returns:
+        tuple: (chênh lệch, cận dưới, cận trên), None nếu không đủ dữ liệu
+    """
+    if len(before) < 2 or len(after) < 2:
+        return None
+
+    delta = statistics.mean(after) - statistics.mean(before)
+    var_b = statistics.variance(before) / len(before)
+    var_a = statistics.variance(after) / len(after)
+    se = math.sqrt(var_a + var_b)
+    if se == 0:
+        return delta, delta, delta
+
+    df = (var_a + var_b) ** 2 / (
+        (var_a ** 2 / (len(after) - 1) if var_a else 0) + (var_b ** 2 / (len(before) - 1) if var_b else 0)
+    )
+    margin = t_critical(df) * se
+    return delta, delta - margin, delta + margin
+
+def measure_jank_and_memory(package, component, serial=None):
+    """
+    Mở ứng dụng, vuốt tự động rồi đọc tỉ lệ khung hình giật và RAM trống trong một lệnh adb
+
+    Args:
+        package (str): Tên package
+        component (str): Activity khởi động
+        serial (str, optional): Serial của thiết bị
+
+    Returns:
+        dict: {"janky_pct": float, "mem_available_mb": float}
+    """
+    quoted = adb_helper.quote(package)
+    swipes = "\n".join(
+        "input swipe $((w/2)) $((h*3/4)) $((w/2)) $((h/4)) 300\n"
+        "input swipe $((w/2)) $((h/4)) $((w/2)) $((h*3/4)) 300"
+        for _ in range(SWIPES // 2)
+    )
+    script = f"""am start -n {adb_helper.quote(component)} >/dev/null 2>&1
+sleep 2
+set -- $(wm size | tail -n 1 | sed 's/.*: //; s/x/ /')
+w=$1; h=$2
+dumpsys gfxinfo {quoted} reset >/dev/null
+{swipes}
+echo @@gfx
+dumpsys gfxinfo {quoted} | grep -E 'Total frames rendered|Janky frames'
+echo @@mem
+grep MemAvailable /proc/meminfo
+input keyevent 3
+"""
+    blocks = adb_helper.parse_marked_output(adb_helper.run_shell_script(script, serial=serial))
+
+    metrics = {"janky_pct": None, "mem_available_mb": None}
+    total = re.search(r"Total frames rendered:\s*(\d+)", blocks.get("gfx", ""))
+    janky = re.search(r"Janky frames:\s*(\d+)", blocks.get("gfx", ""))
+    if total and janky and int(total.group(1)) > 0:
+        metrics["janky_pct"] = 100.0 * int(janky.group(1)) / int(total.group(1))
+    mem = re.search(r"MemAvailable:\s+(\d+)", blocks.get("mem", ""))
+    if mem:
+        metrics["mem_available_mb"] = int(mem.group(1)) / 1024
+    return metrics
+
+def measure_metrics(package, component, repetitions, serial=None, progress=None, task=None):
+    """
+    Đo bộ chỉ số nhiều lần
+
+    Args:
+        package (str): Tên package dùng để đo
+        component (str): Activity khởi động
+        repetitions (int): Số lần đo
+        serial (str, optional): Serial của thiết bị
+        progress (Progress, optional): Thanh tiến trình để cập nhật
+        task (int, optional): Task của thanh tiến trình
+
+    Returns:
+        dict: {tên chỉ số: [giá trị của từng lần đo]}
+    """
+    samples = {name: [] for name in METRICS}
+    for _ in range(repetitions):
+        launch = launch_benchmark.benchmark_app(package, 1, serial)
+        if launch and launch["cold"]["total"]:
+            samples["launch_ms"].append(launch["cold"]["total"][0])
+
+        for name, value in measure_jank_and_memory(package, component, serial).items():
+            if value is not None:
+                samples[name].append(value)
+
+        if progress is not None:
+            progress.advance(task)
+    return samples
+
+def evaluate(before, after):
+    """
+    So sánh hai bộ mẫu và xác định chỉ số nào tốt lên/xấu đi rõ rệt
+
+    Args:
+        before (dict): Mẫu trước khi áp dụng
+        after (dict): Mẫu sau khi áp dụng
+
+    Returns:
+        dict: {tên chỉ số: {"delta", "low", "high", "verdict"}}
+    """
+    report = {}
+    for name, (_, direction) in METRICS.items():
+        result = delta_with_ci(before[name], after[name])
+        if result is None:
+            report[name] = {"delta": None, "low": None, "high": None, "verdict": "không đủ dữ liệu"}
+            continue
+
+        delta, low, high = result
+        # Chỉ kết luận khi cả khoảng tin cậy nằm về một phía của 0
+        if low * direction > 0 and high * direction > 0:
+            verdict = "tốt hơn"
+        elif low * direction < 0 and high * direction < 0:
+            verdict = "tệ hơn"
+        else:
+            verdict = "không rõ"
+        report[name] = {"delta": delta, "low": low, "high": high, "verdict": verdict}
+    return report
+
+def show_report(profile_name, before, after, report):
+    """
+    Hiển thị kết quả đo trước/sau
+
+    Args:
+        profile_name (str): Tên bộ tối ưu
+        before (dict): Mẫu trước khi áp dụng
+        after (dict): Mẫu sau khi áp dụng
+        report (dict): Kết quả từ evaluate
+    """
+    table = Table(title=f"Hiệu quả của: {profile_name}")
+    table.add_column("Chỉ số", style="cyan")
+    table.add_column("Trước (TB)", style="yellow")
+    table.add_column("Sau (TB)", style="yellow")
+    table.add_column("Chênh lệch [KTC 95%]", style="magenta")
+    table.add_column("Kết luận", style="green")
+
+    for name, (label, _) in METRICS.items():
+        row = report[name]
+        mean_before = f"{statistics.mean(before[name]):.1f}" if before[name] else "-"
+        mean_after = f"{statistics.mean(after[name]):.1f}" if after[name] else "-"
+        delta = "-" if row["delta"] is None else f"{row['delta']:+.1f} [{row['low']:+.1f}, {row['high']:+.1f}]"
+        color = {"tốt hơn": "green", "tệ hơn": "red"}.get(row["verdict"], "yellow")
+        table.add_row(label, mean_before, mean_after, delta, f"[{color}]{row['verdict']}[/{color}]")
+
+    console.print(table)
+
+def run_ab_test(profile_name, profile, package, repetitions, serial=None):
+    """
+    Đo trước, áp dụng bộ tối ưu, đo sau và tự khôi phục nếu hiệu năng tệ hơn
+
+    Args:
+        profile_name (str): Tên bộ tối ưu
+        profile (dict): {(namespace, key): giá trị}
+        package (str): Package dùng để đo
+        repetitions (int): Số lần đo mỗi giai đoạn
+        serial (str, optional): Serial của thiết bị
+
+    Returns:
+        dict: Kết quả từ evaluate, hoặc None nếu thất bại
+    """
+    component = launch_benchmark.resolve_launch_component(package, serial)
+    if not component:
+        console.print(f"[bold red]Không tìm thấy activity khởi động của {package}![/bold red]")
+        return None
+
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+    ) as progress:
+        task = progress.add_task("[green]Đang đo trước khi áp dụng...", total=2 * repetitions)
+        before = measure_metrics(package, component, repetitions, serial, progress, task)
+
+        session = system_settings.apply_settings_transaction(profile, serial, source=f"tweak:A/B {profile_name}")
+        progress.update(task, description="[green]Đang đo sau khi áp dụng...")
+        after = measure_metrics(package, component, repetitions, serial, progress, task)
+
+    report = evaluate(before, after)
+    show_report(profile_name, before, after, report)
+
+    worse = [METRICS[name][0] for name, row in report.items() if row["verdict"] == "tệ hơn"]
+    if worse and session:
+        system_settings.revert_sessions([session], serial)
+        console.print(f"[bold red]✗[/bold red] Hiệu năng tệ hơn ({', '.join(worse)}), đã khôi phục cài đặt trước đó")
+        log.info(f"Đo A/B {profile_name} trên {serial or 'thiết bị mặc định'}: tệ hơn ({', '.join(worse)}), đã khôi phục")
+    else:
+        console.print(f"[bold green]✓[/bold green] Giữ nguyên bộ tối ưu: {profile_name}")
+        log.info(f"Đo A/B {profile_name} trên {serial or 'thiết bị mặc định'}: giữ nguyên")
+
+    return report
+
+def ab_test_menu(profiles, packages):
+    """
+    Menu đo hiệu quả trước/sau của một bộ tối ưu
+
+    Args:
+        profiles (dict): {tên bộ tối ưu: {(namespace, key): giá trị}}
+        packages (list): Danh sách package có thể dùng để đo
+    """
+    profile_name = questionary.select("Chọn bộ tối ưu cần đo:", choices=list(profiles) + ["↩️ Quay lại"]).ask()
+    if not profile_name or "Quay lại" in profile_name:
+        return
+
+    if not packages:
+        console.print("[bold red]Không tìm thấy ứng dụng nào![/bold red]")
+        return
+
+    package = questionary.select("Chọn ứng dụng dùng để đo:", choices=packages).ask()
+    repetitions = questionary.text("Số lần đo mỗi giai đoạn (>= 2):", default="3").ask()
+    if not package or not repetitions or not repetitions.isdigit() or int(repetitions) < 2:
+        return
+
+    devices = device_check.select_devices("Chọn thiết bị cần đo:")
+    for serial in devices:
+        console.print(f"[cyan]Thiết bị: {serial}[/cyan]")
+        run_ab_test(profile_name, profiles[profile_name], package, int(repetitions), serial)
+
+    input("\nNhấn Enter để tiếp tục...")
@@ -2,51 +2,36 @@
 # -*- coding: utf-8 -*-
 
 """
-<<<<<<< HEAD
 ADB Toolbox - Android device control tool with command line interface
-=======
-ADB Toolbox - Công cụ điều khiển thiết bị Android qua giao diện dòng lệnh
->>>>>>> c1b47df47117e069380ba3a26024af98f20a7b07
 """
 
 import os
 import sys
 import time
-import json
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 from rich.table import Table
 import questionary
 
-<<<<<<< HEAD
 # Import modules from commands directory
-=======
-# Import các module từ thư mục commands
->>>>>>> c1b47df47117e069380ba3a26024af98f20a7b07
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from commands import device_check
 from commands import system_settings
 from commands import performance_boost
-<<<<<<< HEAD
 from commands import app_management
 from commands import file_management
 from commands import custom_commands
+from commands import profiles
 from utils import logger
+from utils import adb_helper
 from utils import ui_helper
 
 # Initialize console
-=======
-from utils import logger
-from utils import ui_helper
-
-# Khởi tạo console
->>>>>>> c1b47df47117e069380ba3a26024af98f20a7b07
 console = Console()
 log = logger.setup_logger()
 
 def show_header():
-<<<<<<< HEAD
     """Display application header"""
     console.print(Panel(
         Text("ADB TOOLBOX", style="bold yellow"), 
@@ -86,51 +71,15 @@ def main_menu():
                 "🔄 Refresh Devices",
                 "❓ Help",
                 "❌ Exit"
-=======
-    """Hiển thị header của ứng dụng"""
-    console.print(Panel(
-        Text("ADB TOOLBOX", style="bold yellow"), 
-        subtitle="v1.0", 
-        style="bold blue"
-    ))
-    
-    console.print("[bold green]Chào mừng đến với ADB Toolbox![/bold green]")
-    console.print("Công cụ điều khiển thiết bị Android không cần nhớ lệnh ADB.\n")
-
-def main_menu():
-    """Hiển thị menu chính của ứng dụng"""
-    while True:
-        show_header()
-        
-        # Kiểm tra thiết bị đang kết nối
-        devices = device_check.get_connected_devices()
-        if devices:
-            console.print(f"[bold green]✓[/bold green] {len(devices)} thiết bị đang kết nối.")
-        else:
-            console.print("[bold red]✗[/bold red] Không có thiết bị Android nào đang kết nối!")
-            console.print("[yellow]Hãy kết nối thiết bị của bạn và bật chế độ gỡ lỗi (USB Debugging).[/yellow]\n")
-        
-        choice = questionary.select(
-            "Chọn tính năng:",
-            choices=[
-                "1️⃣ Kiểm tra thiết bị kết nối",
-                "2️⃣ Các lệnh ADB nhanh",
-                "3️⃣ Tuỳ chỉnh hệ thống ẩn",
-                "4️⃣ Dọn rác & Tăng tốc",
-                "5️⃣ Thay đổi DPI & Scale",
-                "6️⃣ Shortcut cấu hình sẵn",
-                "7️⃣ Xem lịch sử thao tác",
-                "🔄 Làm mới thiết bị",
-                "❓ Trợ giúp",
-                "❌ Thoát"
->>>>>>> c1b47df47117e069380ba3a26024af98f20a7b07
             ]
         ).ask()
         
         if not choice:
             continue
         
-<<<<<<< HEAD
+        # Tag every adb call made from this feature in the operation journal
+        logger.set_action(choice.split(" ", 1)[-1])
+        
         if "Check Connected Devices" in choice:
             device_check.check_devices_menu()
         elif "Quick ADB Commands" in choice:
@@ -177,19 +126,22 @@ def quick_commands_menu():
         return
     
     if "Reboot Device" in choice:
-        os.system("adb reboot")
+        adb_helper.run_adb(["reboot"])
         log.info("Device rebooted")
     elif "Reboot to Recovery" in choice:
-        os.system("adb reboot recovery")
+        adb_helper.run_adb(["reboot", "recovery"])
         log.info("Device rebooted to recovery")
     elif "Reboot to Bootloader" in choice:
-        os.system("adb reboot bootloader")
+        adb_helper.run_adb(["reboot", "bootloader"])
         log.info("Device rebooted to bootloader")
     elif "Device Info" in choice:
         ui_helper.run_command_and_display("adb shell getprop | grep model")
     elif "Show Logcat" in choice:
         console.print("[yellow]Showing logcat. Press Ctrl+C to stop...[/yellow]")
-        os.system("adb logcat")
+        try:
+            adb_helper.run_process(["adb", "logcat"])
+        except KeyboardInterrupt:
+            pass
     elif "Sideload" in choice:
         console.print("[yellow]Please select a ZIP file to sideload...[/yellow]")
         # Add file selection code here
@@ -197,153 +149,152 @@ def quick_commands_menu():
 def refresh_devices():
     """Refresh device list"""
     console.print("[yellow]Refreshing device list...[/yellow]")
-=======
-        if "Kiểm tra thiết bị kết nối" in choice:
-            device_check.check_devices_menu()
-        elif "Các lệnh ADB nhanh" in choice:
-            quick_commands_menu()
-        elif "Tuỳ chỉnh hệ thống ẩn" in choice:
-            system_settings.settings_menu()
-        elif "Dọn rác & Tăng tốc" in choice:
-            performance_boost.boost_menu()
-        elif "Thay đổi DPI & Scale" in choice:
-            system_settings.dpi_menu()
-        elif "Shortcut cấu hình sẵn" in choice:
-            load_presets()
-        elif "Xem lịch sử thao tác" in choice:
-            view_logs()
-        elif "Làm mới thiết bị" in choice:
-            refresh_devices()
-        elif "Trợ giúp" in choice:
-            show_help()
-        elif "Thoát" in choice:
-            console.print("[yellow]Cảm ơn bạn đã sử dụng ADB Toolbox! Tạm biệt.[/yellow]")
-            sys.exit(0)
-
-def quick_commands_menu():
-    """Menu các lệnh ADB nhanh"""
-    choices = [
-        "↩️ Quay lại",
-        "🔄 Khởi động lại thiết bị",
-        "🔄 Khởi động lại vào Recovery",
-        "🔄 Khởi động lại vào Bootloader",
-        "📱 Thông tin thiết bị",
-        "📊 Hiển thị logcat",
-        "🔌 Sideload (cài đặt ROM/ZIP)"
-    ]
-    
-    choice = questionary.select("Chọn lệnh nhanh:", choices=choices).ask()
-    
-    if not choice or "Quay lại" in choice:
-        return
-    
-    if "Khởi động lại thiết bị" in choice:
-        os.system("adb reboot")
-        log.info("Đã khởi động lại thiết bị")
-    elif "Khởi động lại vào Recovery" in choice:
-        os.system("adb reboot recovery")
-        log.info("Đã khởi động lại vào Recovery")
-    elif "Khởi động lại vào Bootloader" in choice:
-        os.system("adb reboot bootloader")
-        log.info("Đã khởi động lại vào Bootloader")
-    elif "Thông tin thiết bị" in choice:
-        ui_helper.run_command_and_display("adb shell getprop | grep model")
-    elif "Hiển thị logcat" in choice:
-        console.print("[yellow]Đang hiển thị logcat. Nhấn Ctrl+C để dừng...[/yellow]")
-        os.system("adb logcat")
-    elif "Sideload" in choice:
-        console.print("[yellow]Vui lòng chọn file ZIP để sideload...[/yellow]")
-        # Thêm code chọn file ở đây
-        
-def refresh_devices():
-    """Làm mới danh sách thiết bị"""
-    console.print("[yellow]Đang làm mới danh sách thiết bị...[/yellow]")
->>>>>>> c1b47df47117e069380ba3a26024af98f20a7b07
-    os.system("adb kill-server")
+    adb_helper.run_adb(["kill-server"])
     time.sleep(1)
-    os.system("adb start-server")
+    adb_helper.run_adb(["start-server"])
     time.sleep(1)
     device_check.check_devices_menu()
 
 def view_logs():
-<<<<<<< HEAD
     """View operation history"""
-=======
-    """Xem lịch sử thao tác"""
->>>>>>> c1b47df47117e069380ba3a26024af98f20a7b07
-    try:
-        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs/adb_toolbox.log"), "r") as f:
-            logs = f.readlines()
-            
-<<<<<<< HEAD
-        table = Table(title="Operation History")
-        table.add_column("Time", style="cyan")
-        table.add_column("Action", style="green")
-        
-        for log_line in logs[-20:]:  # Show only last 20 lines
-=======
-        table = Table(title="Lịch sử thao tác")
-        table.add_column("Thời gian", style="cyan")
-        table.add_column("Thao tác", style="green")
-        
-        for log_line in logs[-20:]:  # Chỉ hiển thị 20 dòng gần nhất
->>>>>>> c1b47df47117e069380ba3a26024af98f20a7b07
-            parts = log_line.strip().split(" - ", 1)
-            if len(parts) >= 2:
-                timestamp, action = parts
-                table.add_row(timestamp, action)
-        
-        console.print(table)
-    except Exception as e:
-<<<<<<< HEAD
-        console.print(f"[bold red]Error reading log file: {e}[/bold red]")
+    choice = questionary.select(
+        "Select view:",
+        choices=[
+            "1️⃣ Recent Log",
+            "2️⃣ ADB Operations (filter)",
+            "3️⃣ Slowest Commands",
+            "4️⃣ Failure Rate per Device",
+            "↩️ Back"
+        ]
+    ).ask()
+    
+    if not choice or "Back" in choice:
+        return
+    
+    if "Recent Log" in choice:
+        show_recent_log()
+    elif "ADB Operations" in choice:
+        show_operations()
+    elif "Slowest Commands" in choice:
+        show_slowest_commands()
+    elif "Failure Rate" in choice:
+        show_failure_rates()
     
     input("\nPress Enter to continue...")
 
-def load_presets():
-    """Load saved presets"""
-    preset_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config/presets.json")
+def show_recent_log():
+    """Show the last lines of the text log"""
+    table = Table(title="Operation History")
+    table.add_column("Time", style="cyan")
+    table.add_column("Action", style="green")
     
-    if not os.path.exists(preset_file):
-        console.print("[yellow]No presets saved yet.[/yellow]")
-=======
-        console.print(f"[bold red]Lỗi khi đọc file log: {e}[/bold red]")
+    for log_line in logger.get_logs(20):
+        parts = log_line.strip().split(" - ", 1)
+        if len(parts) >= 2:
+            timestamp, action = parts
+            table.add_row(timestamp, action)
     
-    input("\nNhấn Enter để tiếp tục...")
+    console.print(table)
 
-def load_presets():
-    """Tải các cấu hình đã lưu"""
-    preset_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config/presets.json")
+def ask_operation_filters():
+    """
+    Ask for operation journal filters
     
-    if not os.path.exists(preset_file):
-        console.print("[yellow]Chưa có cấu hình nào được lưu.[/yellow]")
->>>>>>> c1b47df47117e069380ba3a26024af98f20a7b07
+    Returns:
+        dict: Keyword arguments for logger.get_operations, or None if cancelled
+    """
+    serial = questionary.text("Device serial (empty for all):").ask()
+    action = questionary.text("Menu action contains (empty for all):").ask()
+    since = questionary.text("From (YYYY-MM-DD [HH:MM], empty for all):").ask()
+    until = questionary.text("Until (YYYY-MM-DD [HH:MM], inclusive, empty for now):").ask()
+    if serial is None or action is None or since is None or until is None:
+        return None
+    return {
+        "serial": serial.strip() or None,
+        "action": action.strip() or None,
+        "since": since.strip() or None,
+        "until": until.strip() or None
+    }
+
+def show_operations():
+    """Show recent adb operations matching the chosen filters"""
+    filters = ask_operation_filters()
+    if filters is None:
         return
+    min_duration = questionary.text("Minimum duration (ms):", default="0").ask()
+    failed_only = questionary.confirm("Failed commands only?", default=False).ask()
     
     try:
-        with open(preset_file, "r") as f:
-            presets = json.load(f)
-        
-<<<<<<< HEAD
-        choices = ["↩️ Back"] + list(presets.keys())
-        choice = questionary.select("Select preset:", choices=choices).ask()
-        
-        if not choice or "Back" in choice:
-            return
-        
-        commands = presets[choice]
-        console.print(f"[green]Running preset: {choice}[/green]")
-        
-        for cmd in commands:
-            console.print(f"[yellow]Running: {cmd}[/yellow]")
-            os.system(cmd)
-            time.sleep(0.5)
-            
-        console.print("[bold green]Complete![/bold green]")
-        input("Press Enter to continue...")
-            
-    except Exception as e:
-        console.print(f"[bold red]Error loading preset: {e}[/bold red]")
+        min_duration = float(min_duration or 0)
+    except ValueError:
+        console.print("[bold red]Invalid duration![/bold red]")
+        return
+    
+    events = logger.get_operations(limit=30, failed_only=failed_only, min_duration_ms=min_duration, **filters)
+    
+    table = Table(title=f"ADB Operations ({len(events)})")
+    table.add_column("Time", style="cyan")
+    table.add_column("Device", style="blue")
+    table.add_column("Command", style="green")
+    table.add_column("Exit", style="yellow")
+    table.add_column("Duration", style="magenta")
+    table.add_column("In/Out", style="white")
+    table.add_column("Action", style="cyan")
+    
+    for event in events:
+        exit_code = event.get("exit_code")
+        table.add_row(
+            event.get("time", ""),
+            event.get("serial") or "-",
+            event.get("label") or logger.command_key(event.get("argv", []), words=6),
+            "[yellow]interrupted[/yellow]" if event.get("interrupted") else
+            "[red]timeout/error[/red]" if exit_code is None else (str(exit_code) if exit_code == 0 else f"[red]{exit_code}[/red]"),
+            f"{event.get('duration_ms', 0):.0f} ms",
+            f"{event.get('bytes_in', 0)}/{event.get('bytes_out', 0)} B",
+            event.get("action") or "-"
+        )
+    
+    console.print(table)
+
+def show_slowest_commands():
+    """Show command types ranked by average duration"""
+    filters = ask_operation_filters()
+    if filters is None:
+        return
+    
+    table = Table(title="Slowest Commands")
+    table.add_column("Command", style="green")
+    table.add_column("Runs", style="cyan")
+    table.add_column("Avg", style="magenta")
+    table.add_column("Max", style="magenta")
+    table.add_column("Failures", style="red")
+    
+    for row in logger.slowest_commands(**filters):
+        table.add_row(row["command"], str(row["count"]), f"{row['avg_ms']:.0f} ms", f"{row['max_ms']:.0f} ms", str(row["failures"]))
+    
+    console.print(table)
+
+def show_failure_rates():
+    """Show the share of failed adb commands per device"""
+    filters = ask_operation_filters()
+    if filters is None:
+        return
+    
+    table = Table(title="Failure Rate per Device")
+    table.add_column("Device", style="blue")
+    table.add_column("Commands", style="cyan")
+    table.add_column("Failures", style="red")
+    table.add_column("Failure Rate", style="red")
+    table.add_column("Avg Duration", style="magenta")
+    
+    for row in logger.failure_rates(**filters):
+        table.add_row(row["serial"], str(row["count"]), str(row["failures"]), f"{row['rate']:.1%}", f"{row['avg_ms']:.0f} ms")
+    
+    console.print(table)
+
+def load_presets():
+    """Apply a saved desired-state profile"""
+    profiles.profiles_menu()
 
 def show_help():
     """Display help information"""
@@ -372,72 +323,15 @@ def show_help():
 if __name__ == "__main__":
     try:
         # Ensure logs directory exists
-=======
-        choices = ["↩️ Quay lại"] + list(presets.keys())
-        choice = questionary.select("Chọn cấu hình:", choices=choices).ask()
-        
-        if not choice or "Quay lại" in choice:
-            return
-        
-        commands = presets[choice]
-        console.print(f"[green]Đang chạy cấu hình: {choice}[/green]")
-        
-        for cmd in commands:
-            console.print(f"[yellow]Đang chạy: {cmd}[/yellow]")
-            os.system(cmd)
-            time.sleep(0.5)
-            
-        console.print("[bold green]Hoàn tất![/bold green]")
-        input("Nhấn Enter để tiếp tục...")
-            
-    except Exception as e:
-        console.print(f"[bold red]Lỗi khi tải cấu hình: {e}[/bold red]")
-
-def show_help():
-    """Hiển thị thông tin trợ giúp"""
-    help_text = """
-    [bold green]HƯỚNG DẪN SỬ DỤNG[/bold green]
-    
-    [cyan]1. Đảm bảo thiết bị Android của bạn được kết nối và đã bật USB Debugging.[/cyan]
-    [cyan]2. Chọn các tính năng từ menu chính để thực hiện.[/cyan]
-    [cyan]3. Với các tùy chỉnh hệ thống, hãy cẩn thận vì một số thay đổi có thể ảnh hưởng đến thiết bị.[/cyan]
-    
-    [bold yellow]Lưu ý:[/bold yellow] Các thao tác đều được ghi vào log để bạn có thể kiểm tra lại sau.
-    
-    [bold red]Khắc phục sự cố:[/bold red]
-    - Nếu thiết bị không được phát hiện, hãy kiểm tra:
-      + Cáp USB có được kết nối không
-      + USB Debugging đã được bật chưa
-      + Driver USB đã được cài đặt
-    - Khởi động lại công cụ ADB Toolbox nếu gặp vấn đề
-    
-    [bold green]Liên hệ hỗ trợ:[/bold green] example@email.com
-    """
-    
-    console.print(Panel(help_text, title="Trợ giúp", border_style="green"))
-    input("\nNhấn Enter để tiếp tục...")
-
-if __name__ == "__main__":
-    try:
-        # Đảm bảo thư mục logs tồn tại
->>>>>>> c1b47df47117e069380ba3a26024af98f20a7b07
         logs_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
         if not os.path.exists(logs_dir):
             os.makedirs(logs_dir)
             
         main_menu()
     except KeyboardInterrupt:
-<<<<<<< HEAD
         console.print("\n[yellow]Program stopped.[/yellow]")
         sys.exit(0)
     except Exception as e:
         console.print(f"[bold red]Unexpected error: {e}[/bold red]")
         log.error(f"Unexpected error: {e}")
-=======
-        console.print("\n[yellow]Đã dừng chương trình.[/yellow]")
-        sys.exit(0)
-    except Exception as e:
-        console.print(f"[bold red]Lỗi không mong muốn: {e}[/bold red]")
-        log.error(f"Lỗi không mong muốn: {e}")
->>>>>>> c1b47df47117e069380ba3a26024af98f20a7b07
         sys.exit(1) 
\ No newline at end of file
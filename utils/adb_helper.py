@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module hỗ trợ chạy lệnh ADB theo lô và trên nhiều thiết bị cho ADB Toolbox
+"""
+
+import os
+import sys
+import time
+import shlex
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from utils import logger
+
+# Số thiết bị tối đa được xử lý song song
+MAX_PARALLEL_DEVICES = 8
+
+def adb_base(serial=None):
+    """
+    Tạo phần đầu của lệnh ADB, có chỉ định thiết bị nếu cần
+
+    Args:
+        serial (str, optional): Serial của thiết bị
+
+    Returns:
+        list: Danh sách tham số ["adb"] hoặc ["adb", "-s", serial]
+    """
+    return ["adb", "-s", serial] if serial else ["adb"]
+
+def quote(value):
+    """
+    Bọc giá trị để dùng an toàn trong shell của thiết bị
+
+    Args:
+        value (str): Giá trị cần bọc
+
+    Returns:
+        str: Giá trị đã được bọc
+    """
+    return shlex.quote(str(value))
+
+def output_size(data):
+    """
+    Tính số byte của dữ liệu vào/ra của một tiến trình
+
+    Args:
+        data (str | bytes): Dữ liệu, có thể là None
+
+    Returns:
+        int: Số byte
+    """
+    if data is None:
+        return 0
+    return len(data.encode("utf-8", errors="replace") if isinstance(data, str) else data)
+
+def caller_label():
+    """
+    Tên hàm (ngoài module này) đã gọi vào adb_helper, dùng làm nhãn thao tác
+
+    Returns:
+        str: Nhãn dạng "<module>.<hàm>", hoặc None nếu không xác định được
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        name = frame.f_code.co_name
+        if module != __name__ and not name.startswith("<"):
+            return f"{module.rsplit('.', 1)[-1]}.{name}"
+        frame = frame.f_back
+    return None
+
+def run_process(command, label=None, **kwargs):
+    """
+    Chạy subprocess.run và ghi thời gian, mã thoát, số byte vào nhật ký thao tác
+
+    Nhận cùng tham số với subprocess.run và giữ nguyên hành vi (kể cả ngoại lệ).
+
+    Args:
+        command (list | str): Lệnh (chuỗi khi dùng shell=True)
+        label (str, optional): Nhãn của thao tác để gộp thống kê (mặc định theo lệnh)
+        **kwargs: Tham số của subprocess.run
+
+    Returns:
+        subprocess.CompletedProcess: Kết quả của lệnh
+    """
+    argv = shlex.split(command) if isinstance(command, str) else list(command)
+    returncode = None
+    bytes_out = 0
+    interrupted = False
+    started = time.perf_counter()
+    try:
+        result = subprocess.run(command, **kwargs)
+        returncode = result.returncode
+        bytes_out = output_size(result.stdout) + output_size(result.stderr)
+        return result
+    except subprocess.CalledProcessError as e:
+        returncode = e.returncode
+        bytes_out = output_size(e.output) + output_size(e.stderr)
+        raise
+    except KeyboardInterrupt:
+        # Người dùng dừng lệnh (ví dụ logcat): không tính là lệnh thất bại
+        interrupted = True
+        raise
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000
+        logger.log_operation(
+            argv, returncode, duration_ms, output_size(kwargs.get("input")), bytes_out, label, interrupted
+        )
+
+def run_adb(args, serial=None, input_text=None, timeout=None, label=None):
+    """
+    Chạy lệnh ADB trên một thiết bị
+
+    Args:
+        args (list): Tham số sau "adb" (ví dụ ["shell", "ls"])
+        serial (str, optional): Serial của thiết bị
+        input_text (str, optional): Dữ liệu gửi vào stdin
+        timeout (int, optional): Thời gian chờ tối đa (giây)
+        label (str, optional): Nhãn của thao tác trong nhật ký
+
+    Returns:
+        subprocess.CompletedProcess: Kết quả, hoặc None nếu không chạy được adb
+    """
+    try:
+        return run_process(
+            adb_base(serial) + list(args),
+            input=input_text,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            label=label
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+def run_shell_script(script, serial=None, timeout=None, as_root=False, label=None):
+    """
+    Chạy một đoạn script shell trên thiết bị chỉ với một lệnh adb
+
+    Script được gửi qua stdin của "sh" nên không cần bọc ký tự đặc biệt
+    và không bị giới hạn độ dài dòng lệnh.
+
+    Args:
+        script (str): Nội dung script
+        serial (str, optional): Serial của thiết bị
+        timeout (int, optional): Thời gian chờ tối đa (giây)
+        as_root (bool): Chạy script với quyền root (su)
+        label (str, optional): Nhãn của thao tác trong nhật ký (mặc định là hàm đã gọi),
+            vì mọi script đều có cùng lệnh "adb shell sh"
+
+    Returns:
+        str: Output của script, hoặc None nếu thất bại
+    """
+    shell = ["shell", "su", "-c", "sh"] if as_root else ["shell", "sh"]
+    label = label or f"script:{caller_label()}"
+    result = run_adb(shell, serial=serial, input_text=script, timeout=timeout, label=label)
+    if result is None:
+        return None
+    return result.stdout
+
+def open_shell_stream(script, serial=None, as_root=False):
+    """
+    Khởi chạy một script chạy lâu trên thiết bị và đọc output dần dần
+
+    Chỉ dùng một tiến trình adb cho cả phiên (ví dụ vòng lặp lấy mẫu định kỳ).
+
+    Args:
+        script (str): Nội dung script
+        serial (str, optional): Serial của thiết bị
+        as_root (bool): Chạy script với quyền root (su)
+
+    Returns:
+        subprocess.Popen: Tiến trình adb, đọc output qua thuộc tính stdout
+    """
+    shell = ["shell", "su", "-c", "sh"] if as_root else ["shell", "sh"]
+    process = subprocess.Popen(
+        adb_base(serial) + shell,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        bufsize=1
+    )
+    process.stdin.write(script)
+    process.stdin.close()
+    return process
+
+def parse_marked_output(output, marker="@@"):
+    """
+    Tách output của script thành các khối theo dòng đánh dấu
+
+    Mỗi khối bắt đầu bằng dòng "<marker><tên>" và kéo dài tới dòng đánh dấu kế tiếp.
+
+    Args:
+        output (str): Output của script
+        marker (str): Tiền tố đánh dấu
+
+    Returns:
+        dict: {tên khối: nội dung khối}
+    """
+    blocks = {}
+    name = None
+    lines = []
+    for line in (output or "").splitlines():
+        if line.startswith(marker):
+            if name is not None:
+                blocks[name] = "\n".join(lines)
+            name = line[len(marker):].strip()
+            lines = []
+        elif name is not None:
+            lines.append(line)
+    if name is not None:
+        blocks[name] = "\n".join(lines)
+    return blocks
+
+def chunked(items, size):
+    """
+    Chia danh sách thành các phần có kích thước tối đa size
+
+    Args:
+        items (list): Danh sách cần chia
+        size (int): Kích thước mỗi phần
+
+    Returns:
+        list: Danh sách các phần
+    """
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def run_on_devices(func, devices, max_workers=MAX_PARALLEL_DEVICES):
+    """
+    Chạy một hàm trên nhiều thiết bị song song
+
+    Args:
+        func (callable): Hàm nhận serial của thiết bị
+        devices (list): Danh sách serial
+        max_workers (int): Số thiết bị xử lý cùng lúc
+
+    Returns:
+        dict: {serial: kết quả của hàm}, kết quả là Exception nếu hàm lỗi
+    """
+    results = {}
+    if not devices:
+        return results
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(devices)))) as executor:
+        futures = {serial: executor.submit(func, serial) for serial in devices}
+        for serial, future in futures.items():
+            try:
+                results[serial] = future.result()
+            except Exception as e:
+                results[serial] = e
+    return results
+
+def data_dir(*parts):
+    """
+    Lấy (và tạo nếu chưa có) thư mục lưu dữ liệu của ứng dụng
+
+    Args:
+        *parts (str): Các thư mục con bên trong thư mục data
+
+    Returns:
+        str: Đường dẫn thư mục
+    """
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", *parts)
+    if not os.path.exists(path):
+        os.makedirs(path)
+    return path
+
+def config_path(*parts):
+    """
+    Lấy đường dẫn tới file cấu hình trong thư mục config
+
+    Args:
+        *parts (str): Các phần của đường dẫn bên trong thư mục config
+
+    Returns:
+        str: Đường dẫn file
+    """
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", *parts)
@@ -6,40 +6,276 @@ Module ghi log cho ứng dụng ADB Toolbox
 """
 
 import os
+import glob
+import gzip
+import json
+import queue
+import atexit
+import shutil
+import sqlite3
 import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
 
-def setup_logger():
+LOGGER_NAME = "adb_toolbox"
+
+# Logger con ghi nhật ký thao tác ADB dạng JSONL (mỗi dòng một sự kiện)
+OPERATION_LOGGER_NAME = LOGGER_NAME + ".operations"
+OPERATION_LOG_FILE = "operations.jsonl"
+
+# Chỉ mục phụ của nhật ký thao tác: thời gian/thiết bị -> (file, vị trí byte)
+OPERATION_INDEX_FILE = "operations.index.sqlite"
+
+# Xoay vòng file log theo dung lượng, file cũ được nén gzip
+MAX_LOG_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 20
+
+# Kích thước khối khi đọc ngược từ cuối file
+TAIL_BLOCK_SIZE = 64 * 1024
+
+# Thao tác menu hiện tại: mặc định cho cả tiến trình, có thể ghi đè theo từng luồng
+_action = None
+_local = threading.local()
+
+# Luồng ghi log nền dùng chung cho cả tiến trình
+_listener = None
+_lock = threading.Lock()
+
+# Điều kiện SQL của thao tác thất bại (thao tác bị người dùng dừng không tính)
+FAILED_SQL = "(NOT interrupted AND (exit_code IS NULL OR exit_code != 0))"
+
+# Khóa cập nhật chỉ mục (luồng đọc và luồng ghi khi xoay vòng)
+_index_lock = threading.Lock()
+
+class BufferedFileHandler(logging.FileHandler):
     """
-    Thiết lập logger cho ứng dụng
+    FileHandler không flush sau mỗi dòng; việc flush do luồng ghi nền đảm nhiệm
+    
+    Khi file vượt quá max_bytes, file được nén thành "<file>.<thời gian>.gz"
+    và chỉ giữ lại backup_count file nén gần nhất. on_rollover(file, file nén, file nén bị xóa)
+    được gọi trong khi giữ lock, cùng lúc đổi tên file nén và xóa file hiện tại.
+    """
+    
+    def __init__(self, filename, max_bytes=0, backup_count=0, on_rollover=None, lock=None, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.on_rollover = on_rollover
+        self.rollover_lock = lock or threading.Lock()
+        self.size = None
+        
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            if self.size is None:
+                self.size = os.path.getsize(self.baseFilename)
+            data = self.format(record) + self.terminator
+            self.stream.write(data)
+            self.size += len(data.encode(self.encoding or "utf-8", errors="replace"))
+            if self.max_bytes and self.size >= self.max_bytes:
+                self.rollover()
+        except Exception:
+            self.handleError(record)
+            
+    def rollover(self):
+        """Nén file hiện tại thành file lưu trữ và bắt đầu file mới"""
+        self.stream.close()
+        self.stream = None
+        # Tính lại kích thước khi ghi tiếp nếu xoay vòng thất bại
+        self.size = None
+        
+        # Tên theo thời gian (tới micro giây) để sắp xếp theo tên cũng là theo thời gian
+        archive = f"{self.baseFilename}.{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.gz"
+        # Nén ra file tạm (không khớp list_archives) để không ai đọc được file nén dở
+        temp = archive + ".tmp"
+        try:
+            with open(self.baseFilename, "rb") as src, gzip.open(temp, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+        except Exception:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+            
+        with self.rollover_lock:
+            archives = list_archives(self.baseFilename)
+            removed = (archives + [archive])[:-self.backup_count] if self.backup_count else []
+            os.replace(temp, archive)
+            try:
+                if self.on_rollover:
+                    self.on_rollover(self.baseFilename, archive, removed)
+            except Exception:
+                # Giữ file hiện tại, bỏ file nén để dữ liệu không bị lặp lại
+                os.remove(archive)
+                raise
+            os.remove(self.baseFilename)
+            for path in removed:
+                os.remove(path)
+        self.size = 0
+
+class FlushingQueueListener(QueueListener):
+    """QueueListener flush các handler mỗi khi hàng đợi trống, trước khi chờ bản ghi mới"""
+    
+    def dequeue(self, block):
+        if block and self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+        return self.queue.get(block)
+
+def get_log_file(name="adb_toolbox.log"):
+    """
+    Lấy đường dẫn file log (tạo thư mục logs nếu chưa có)
     
+    Args:
+        name (str): Tên file trong thư mục logs
+        
     Returns:
-        logging.Logger: Logger đã được cấu hình
+        str: Đường dẫn file log
     """
-    # Tạo thư mục logs nếu chưa có
     logs_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
-    if not os.path.exists(logs_dir):
-        os.makedirs(logs_dir)
+    os.makedirs(logs_dir, exist_ok=True)
+    return os.path.join(logs_dir, name)
+
+def list_archives(path):
+    """
+    Liệt kê các file nén đã xoay vòng của một file log, cũ trước mới sau
+    
+    Args:
+        path (str): Đường dẫn file log
+        
+    Returns:
+        list: Đường dẫn các file .gz
+    """
+    return sorted(glob.glob(glob.escape(path) + ".*.gz"))
+
+def open_log(path):
+    """
+    Mở file log (thường hoặc đã nén) ở chế độ nhị phân
+    
+    Args:
+        path (str): Đường dẫn file
         
-    log_file = os.path.join(logs_dir, "adb_toolbox.log")
+    Returns:
+        file: Đối tượng file
+    """
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+def tail_lines(path, limit, block_size=TAIL_BLOCK_SIZE):
+    """
+    Đọc các dòng cuối của file bằng cách đọc ngược từng khối từ cuối file
     
-    # Cấu hình logger
-    logger = logging.getLogger("adb_toolbox")
-    logger.setLevel(logging.INFO)
+    Args:
+        path (str): Đường dẫn file (không nén)
+        limit (int): Số dòng cần lấy
+        block_size (int): Kích thước mỗi khối đọc
+        
+    Returns:
+        list: Các dòng (đã giải mã), cũ trước mới sau
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= limit:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+            
+    lines = data.splitlines(keepends=True)
+    # Dòng đầu có thể bị cắt dở nếu chưa đọc tới đầu file
+    if position > 0:
+        lines = lines[1:]
+    return [line.decode("utf-8", errors="replace") for line in lines[-limit:]] if limit else []
+
+def is_operation_record(record):
+    """
+    Kiểm tra bản ghi có thuộc nhật ký thao tác ADB không
     
-    # Tạo file handler
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
-    file_handler.setLevel(logging.INFO)
+    Args:
+        record (logging.LogRecord): Bản ghi log
+        
+    Returns:
+        bool: True nếu bản ghi đến từ logger thao tác
+    """
+    return record.name == OPERATION_LOGGER_NAME
+
+def setup_logger():
+    """
+    Thiết lập logger cho ứng dụng
     
-    # Tạo formatter
-    formatter = logging.Formatter('%(asctime)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    file_handler.setFormatter(formatter)
+    Chỉ cấu hình một lần cho cả tiến trình: logger ghi vào hàng đợi (không chặn),
+    một luồng nền ghi hàng đợi ra file. Các lần gọi sau trả về cùng logger.
     
-    # Thêm handler vào logger
-    logger.addHandler(file_handler)
+    Returns:
+        logging.Logger: Logger đã được cấu hình
+    """
+    global _listener
     
+    logger = logging.getLogger(LOGGER_NAME)
+    with _lock:
+        if _listener is not None:
+            return logger
+            
+        logger.setLevel(logging.INFO)
+        
+        # Tạo file handler (chạy trong luồng nền)
+        file_handler = BufferedFileHandler(
+            get_log_file(), MAX_LOG_BYTES, LOG_BACKUP_COUNT, encoding='utf-8', delay=True
+        )
+        file_handler.setLevel(logging.INFO)
+        
+        # Tạo formatter
+        formatter = logging.Formatter('%(asctime)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+        file_handler.setFormatter(formatter)
+        file_handler.addFilter(lambda record: not is_operation_record(record))
+        
+        # Nhật ký thao tác ADB: message đã là một dòng JSON
+        operation_handler = BufferedFileHandler(
+            get_log_file(OPERATION_LOG_FILE), MAX_LOG_BYTES, LOG_BACKUP_COUNT,
+            on_rollover=move_index_to_archive, lock=_index_lock, encoding='utf-8', delay=True
+        )
+        operation_handler.setLevel(logging.INFO)
+        operation_handler.setFormatter(logging.Formatter('%(message)s'))
+        operation_handler.addFilter(is_operation_record)
+        
+        # Logger chỉ đưa bản ghi vào hàng đợi
+        log_queue = queue.Queue(-1)
+        logger.addHandler(QueueHandler(log_queue))
+        
+        _listener = FlushingQueueListener(log_queue, file_handler, operation_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logger)
+        
     return logger
 
+def flush_logs():
+    """Chờ luồng nền ghi hết các bản ghi đang trong hàng đợi ra file"""
+    if _listener is None:
+        return
+    _listener.queue.join()
+    for handler in _listener.handlers:
+        handler.flush()
+
+def shutdown_logger():
+    """Dừng luồng ghi log nền và đóng file log"""
+    global _listener
+    
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        logger = logging.getLogger(LOGGER_NAME)
+        for handler in list(logger.handlers):
+            if isinstance(handler, QueueHandler):
+                logger.removeHandler(handler)
+        _listener = None
+
 def log_command(command, result=None):
     """
     Ghi log lệnh ADB đã chạy
@@ -70,19 +306,362 @@ def get_logs(limit=20):
     """
     Lấy lịch sử log gần đây
     
+    Chỉ đọc phần cuối file log; nếu chưa đủ dòng thì đọc tiếp các file nén gần nhất.
+    
     Args:
         limit (int): Số lượng dòng log muốn lấy
         
     Returns:
         list: Danh sách các dòng log
     """
-    logs_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
-    log_file = os.path.join(logs_dir, "adb_toolbox.log")
+    flush_logs()
+    log_file = get_log_file()
+    
+    lines = tail_lines(log_file, limit) if os.path.exists(log_file) else []
+    for archive in reversed(list_archives(log_file)):
+        if len(lines) >= limit:
+            break
+        with open_log(archive) as f:
+            older = deque(f, maxlen=limit - len(lines))
+        lines = [line.decode("utf-8", errors="replace") for line in older] + lines
+        
+    return lines
+
+def set_action(name):
+    """
+    Đặt thao tác menu hiện tại cho cả tiến trình (gắn vào mỗi sự kiện ADB)
+    
+    Args:
+        name (str): Tên thao tác, None để xóa
+    """
+    global _action
+    _action = name
+
+@contextmanager
+def action_scope(name):
+    """
+    Ghi đè thao tác hiện tại trong luồng đang chạy (ví dụ các công việc chạy song song)
+    
+    Args:
+        name (str): Tên thao tác
+    """
+    previous = getattr(_local, "action", None)
+    _local.action = name
+    try:
+        yield
+    finally:
+        _local.action = previous
+
+def get_action():
+    """
+    Lấy thao tác menu hiện tại
     
-    if not os.path.exists(log_file):
-        return []
+    Returns:
+        str: Tên thao tác, hoặc None
+    """
+    return getattr(_local, "action", None) or _action
+
+def get_serial(argv):
+    """
+    Lấy serial thiết bị từ tham số của lệnh adb
+    
+    Args:
+        argv (list): Tham số của lệnh
+        
+    Returns:
+        str: Serial, hoặc None nếu lệnh không chỉ định thiết bị
+    """
+    if "-s" in argv[:-1]:
+        return argv[argv.index("-s") + 1]
+    return None
+
+def log_operation(argv, returncode, duration_ms, bytes_in=0, bytes_out=0, label=None, interrupted=False):
+    """
+    Ghi một sự kiện thao tác ADB vào nhật ký JSONL (không chặn)
+    
+    Args:
+        argv (list): Tham số của lệnh
+        returncode (int): Mã thoát, None nếu không chạy được hoặc hết thời gian chờ
+        duration_ms (float): Thời gian chạy (mili giây)
+        bytes_in (int): Số byte gửi vào stdin
+        bytes_out (int): Số byte nhận từ stdout và stderr
+        label (str, optional): Nhãn của thao tác (ví dụ hàm đã chạy script)
+        interrupted (bool): Người dùng đã dừng lệnh (Ctrl+C)
+    """
+    event = {
+        "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "serial": get_serial(argv),
+        "argv": list(argv),
+        "exit_code": returncode,
+        "duration_ms": round(duration_ms, 1),
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_out,
+        "action": get_action(),
+        "label": label,
+        "interrupted": interrupted
+    }
+    setup_logger()
+    logging.getLogger(OPERATION_LOGGER_NAME).info(json.dumps(event, ensure_ascii=False))
+
+def open_index():
+    """
+    Mở (và tạo nếu chưa có) chỉ mục phụ của nhật ký thao tác
+    
+    Returns:
+        sqlite3.Connection: Kết nối tới chỉ mục
+    """
+    conn = sqlite3.connect(get_log_file(OPERATION_INDEX_FILE), timeout=30)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, indexed_bytes INTEGER);
+        CREATE TABLE IF NOT EXISTS entries (
+            file TEXT, offset INTEGER, time TEXT, serial TEXT, action TEXT,
+            command TEXT, exit_code INTEGER, duration_ms REAL, interrupted INTEGER DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS entries_time ON entries (time);
+        CREATE INDEX IF NOT EXISTS entries_serial ON entries (serial, time);
+    """)
+    # Chỉ mục tạo trước khi có cột interrupted
+    if "interrupted" not in [row[1] for row in conn.execute("PRAGMA table_info(entries)")]:
+        conn.execute("ALTER TABLE entries ADD COLUMN interrupted INTEGER DEFAULT 0")
+    return conn
+
+def index_file(conn, path, name, start=0):
+    """
+    Thêm vào chỉ mục các sự kiện của một file log kể từ vị trí start
+    
+    Args:
+        conn (sqlite3.Connection): Kết nối tới chỉ mục
+        path (str): Đường dẫn file (thường hoặc .gz)
+        name (str): Tên file lưu trong chỉ mục
+        start (int): Vị trí byte (chưa nén) bắt đầu đọc
+    """
+    rows = []
+    offset = start
+    with open_log(path) as f:
+        f.seek(start)
+        for line in f:
+            # Dòng chưa ghi xong: để lần cập nhật sau
+            if not line.endswith(b"\n"):
+                break
+            try:
+                event = json.loads(line)
+                rows.append((
+                    name, offset, event.get("time"), event.get("serial"), event.get("action"),
+                    operation_key(event), event.get("exit_code"), event.get("duration_ms", 0),
+                    int(bool(event.get("interrupted")))
+                ))
+            except ValueError:
+                pass
+            offset += len(line)
+            
+    conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?)", (name, offset))
+
+def update_index():
+    """Đưa vào chỉ mục các sự kiện mới (file hiện tại) và các file nén chưa có trong chỉ mục"""
+    operation_file = get_log_file(OPERATION_LOG_FILE)
+    with _index_lock, open_index() as conn:
+        indexed = dict(conn.execute("SELECT name, indexed_bytes FROM files"))
+        for archive in list_archives(operation_file):
+            name = os.path.basename(archive)
+            if name not in indexed:
+                index_file(conn, archive, name)
+                
+        name = os.path.basename(operation_file)
+        if os.path.exists(operation_file):
+            start = indexed.get(name, 0)
+            if os.path.getsize(operation_file) < start:
+                # File đã bị thay thế: lập chỉ mục lại từ đầu
+                conn.execute("DELETE FROM entries WHERE file = ?", (name,))
+                start = 0
+            index_file(conn, operation_file, name, start)
+    conn.close()
+
+def move_index_to_archive(path, archive, removed):
+    """
+    Cập nhật chỉ mục khi nhật ký thao tác được xoay vòng (gọi từ luồng ghi log)
+    
+    Người gọi phải giữ _index_lock cho tới khi đã xóa file log cũ. Nếu hàm lỗi,
+    chỉ mục được giữ nguyên (giao dịch bị hủy).
+    
+    Args:
+        path (str): File log vừa được nén
+        archive (str): File nén mới
+        removed (list): Các file nén cũ sẽ bị xóa
+    """
+    name, archive_name = os.path.basename(path), os.path.basename(archive)
+    conn = open_index()
+    try:
+        with conn:
+            start = dict(conn.execute("SELECT name, indexed_bytes FROM files")).get(name, 0)
+            index_file(conn, path, name, start)
+            conn.execute("UPDATE entries SET file = ? WHERE file = ?", (archive_name, name))
+            conn.execute("UPDATE files SET name = ? WHERE name = ?", (archive_name, name))
+            for old in removed:
+                conn.execute("DELETE FROM entries WHERE file = ?", (os.path.basename(old),))
+                conn.execute("DELETE FROM files WHERE name = ?", (os.path.basename(old),))
+    finally:
+        conn.close()
+
+def build_filters(serial=None, action=None, failed_only=False, min_duration_ms=0, since=None, until=None):
+    """
+    Tạo điều kiện SQL cho các bộ lọc nhật ký thao tác
+    
+    Args:
+        serial (str, optional): Lọc theo serial
+        action (str, optional): Lọc theo thao tác menu (chứa chuỗi này)
+        failed_only (bool): Chỉ lấy lệnh thất bại
+        min_duration_ms (float): Thời gian chạy tối thiểu
+        since (str, optional): Từ thời điểm ("YYYY-MM-DD[ HH:MM:SS]")
+        until (str, optional): Tới thời điểm, tính cả thời điểm đó ("YYYY-MM-DD" gồm cả ngày,
+            "YYYY-MM-DD HH:MM" gồm cả phút)
+        
+    Returns:
+        tuple: (mệnh đề WHERE, tham số)
+    """
+    clauses, params = ["1"], []
+    if serial:
+        clauses.append("serial = ?")
+        params.append(serial)
+    if action:
+        clauses.append("action LIKE ?")
+        params.append(f"%{action}%")
+    if failed_only:
+        clauses.append(FAILED_SQL)
+    if min_duration_ms:
+        clauses.append("duration_ms >= ?")
+        params.append(min_duration_ms)
+    if since:
+        clauses.append("time >= ?")
+        params.append(since)
+    if until:
+        # Thời gian lưu dạng "YYYY-MM-DD HH:MM:SS": mọi thời điểm có tiền tố until đều được tính
+        clauses.append("time <= ?")
+        params.append(until + "\uffff")
+    return " AND ".join(clauses), params
+
+def query_index(sql, params):
+    """
+    Cập nhật chỉ mục rồi chạy một truy vấn trên đó
+    
+    Args:
+        sql (str): Câu truy vấn
+        params (list): Tham số
+        
+    Returns:
+        list: Các dòng kết quả
+    """
+    flush_logs()
+    update_index()
+    with open_index() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    conn.close()
+    return rows
+
+def get_operations(limit=None, **filters):
+    """
+    Đọc và lọc các sự kiện thao tác ADB qua chỉ mục (kể cả trong các file nén)
+    
+    Args:
+        limit (int, optional): Chỉ lấy số sự kiện gần nhất này
+        **filters: Bộ lọc của build_filters (serial, action, failed_only, min_duration_ms, since, until)
+        
+    Returns:
+        list: Các sự kiện (dict), cũ trước mới sau
+    """
+    where, params = build_filters(**filters)
+    sql = f"SELECT file, offset FROM entries WHERE {where} ORDER BY time DESC, rowid DESC"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    rows = query_index(sql, params)
+    
+    # Đọc các dòng theo từng file, vị trí tăng dần để file nén chỉ giải nén một lượt
+    locations = {}
+    for name, offset in rows:
+        locations.setdefault(name, []).append(offset)
+    events = {}
+    for name, offsets in locations.items():
+        path = get_log_file(name)
+        if not os.path.exists(path):
+            continue
+        with open_log(path) as f:
+            for offset in sorted(offsets):
+                f.seek(offset)
+                events[(name, offset)] = json.loads(f.readline())
+                
+    return [events[row] for row in reversed(rows) if row in events]
+
+def command_key(argv, words=3):
+    """
+    Rút gọn lệnh adb thành khóa để gộp thống kê (bỏ "adb" và "-s <serial>")
+    
+    Args:
+        argv (list): Tham số của lệnh
+        words (int): Số từ giữ lại
+        
+    Returns:
+        str: Khóa của lệnh, ví dụ "shell sh" hoặc "shell pm list"
+    """
+    args = list(argv[1:] if argv[:1] == ["adb"] else argv)
+    if args[:1] == ["-s"]:
+        args = args[2:]
+    return " ".join(args[:words])
+
+def operation_key(event):
+    """
+    Khóa gộp thống kê của một sự kiện: nhãn nếu có, ngược lại là lệnh rút gọn
+    
+    Các script chạy qua run_shell_script đều có lệnh "adb shell sh", nên phải gộp theo nhãn.
+    
+    Args:
+        event (dict): Sự kiện từ nhật ký thao tác
+        
+    Returns:
+        str: Khóa của thao tác
+    """
+    return event.get("label") or command_key(event.get("argv", []))
+
+def slowest_commands(limit=10, **filters):
+    """
+    Gộp thời gian chạy theo loại lệnh và xếp hạng chậm nhất
+    
+    Args:
+        limit (int): Số loại lệnh trả về
+        **filters: Bộ lọc của build_filters
         
-    with open(log_file, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
+    Returns:
+        list: [{"command", "count", "avg_ms", "max_ms", "failures"}] sắp xếp theo thời gian trung bình
+    """
+    where, params = build_filters(**filters)
+    rows = query_index(
+        f"""SELECT command, COUNT(*), AVG(duration_ms), MAX(duration_ms),
+               SUM{FAILED_SQL}
+            FROM entries WHERE {where} GROUP BY command ORDER BY AVG(duration_ms) DESC LIMIT ?""",
+        params + [limit]
+    )
+    return [
+        {"command": command, "count": count, "avg_ms": avg_ms, "max_ms": max_ms, "failures": failures}
+        for command, count, avg_ms, max_ms, failures in rows
+    ]
+
+def failure_rates(**filters):
+    """
+    Tính tỷ lệ lệnh thất bại theo thiết bị
+    
+    Args:
+        **filters: Bộ lọc của build_filters
         
-    return lines[-limit:] if len(lines) > limit else lines 
\ No newline at end of file
+    Returns:
+        list: [{"serial", "count", "failures", "rate", "avg_ms"}] sắp xếp theo tỷ lệ thất bại
+    """
+    where, params = build_filters(**filters)
+    rows = query_index(
+        f"""SELECT COALESCE(serial, '(mặc định)'), COUNT(*), SUM{FAILED_SQL}, AVG(duration_ms)
+            FROM entries WHERE {where} GROUP BY serial""",
+        params
+    )
+    result = [
+        {"serial": serial, "count": count, "failures": failures, "rate": failures / count, "avg_ms": avg_ms}
+        for serial, count, failures, avg_ms in rows
+    ]
+    return sorted(result, key=lambda row: row["rate"], reverse=True)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Module nhật ký thay đổi cài đặt (append-only) cho ADB Toolbox
+"""
+
+import os
+import json
+import time
+import uuid
+from . import adb_helper
+
+def get_journal_file():
+    """
+    Lấy đường dẫn file nhật ký
+
+    Returns:
+        str: Đường dẫn file JSONL
+    """
+    return os.path.join(adb_helper.data_dir(), "settings_journal.jsonl")
+
+def new_session_id():
+    """
+    Tạo mã phiên mới, sắp xếp được theo thời gian
+
+    Returns:
+        str: Mã phiên
+    """
+    return f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+def record_changes(session, serial, source, previous, changes):
+    """
+    Ghi các thay đổi của một phiên vào nhật ký
+
+    Args:
+        session (str): Mã phiên
+        serial (str): Serial của thiết bị (None nếu là thiết bị mặc định)
+        source (str): Chức năng đã thực hiện thay đổi
+        previous (dict): {(namespace, key): giá trị cũ}
+        changes (dict): {(namespace, key): giá trị mới}
+    """
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+    lines = []
+    for (namespace, key), value in changes.items():
+        lines.append(json.dumps({
+            "session": session,
+            "time": timestamp,
+            "serial": serial,
+            "source": source,
+            "namespace": namespace,
+            "key": key,
+            "old": previous.get((namespace, key)),
+            "new": value
+        }, ensure_ascii=False))
+
+    with open(get_journal_file(), "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+def load_entries(serial=None, any_device=False):
+    """
+    Đọc các mục trong nhật ký
+
+    Args:
+        serial (str, optional): Chỉ lấy mục của thiết bị này
+        any_device (bool): Lấy mục của mọi thiết bị
+
+    Returns:
+        list: Danh sách mục theo thứ tự ghi
+    """
+    journal_file = get_journal_file()
+    if not os.path.exists(journal_file):
+        return []
+
+    entries = []
+    with open(journal_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if any_device or entry["serial"] == serial:
+                entries.append(entry)
+    return entries
+
+def list_sessions(entries, source_prefix=None):
+    """
+    Gom các mục nhật ký theo phiên, phiên mới nhất đứng đầu
+
+    Args:
+        entries (list): Các mục từ load_entries
+        source_prefix (str, optional): Chỉ lấy phiên có source bắt đầu bằng chuỗi này
+
+    Returns:
+        list: [{"session", "time", "serial", "source", "count"}]
+    """
+    sessions = {}
+    for entry in entries:
+        if source_prefix and not entry["source"].startswith(source_prefix):
+            continue
+        session = sessions.setdefault(entry["session"], {
+            "session": entry["session"],
+            "time": entry["time"],
+            "serial": entry["serial"],
+            "source": entry["source"],
+            "count": 0
+        })
+        session["count"] += 1
+    return list(reversed(list(sessions.values())))
+
+def list_undoable_sessions(entries):
+    """
+    Lấy các phiên còn có thể hoàn tác (chưa bị hoàn tác và không phải phiên hoàn tác)
+
+    Args:
+        entries (list): Các mục từ load_entries
+
+    Returns:
+        list: Các phiên như list_sessions, phiên mới nhất đứng đầu
+    """
+    sessions = list_sessions(entries)
+    reverted = set()
+    for session in sessions:
+        reverted.update(reverted_by(session))
+    return [s for s in sessions if not s["source"].startswith("revert:") and s["session"] not in reverted]
+
+def restore_values(entries, sessions):
+    """
+    Tính giá trị cần ghi lại để hoàn tác các phiên
+
+    Với mỗi cài đặt, lấy giá trị cũ của lần thay đổi sớm nhất trong các phiên đã chọn.
+
+    Args:
+        entries (list): Các mục từ load_entries
+        sessions (iterable): Các mã phiên cần hoàn tác
+
+    Returns:
+        dict: {(namespace, key): giá trị cũ}, None nghĩa là xóa cài đặt
+    """
+    sessions = set(sessions)
+    values = {}
+    for entry in entries:
+        key = (entry["namespace"], entry["key"])
+        if entry["session"] in sessions and key not in values:
+            values[key] = entry["old"]
+    return values
+
+def reverted_by(session):
+    """
+    Lấy các phiên mà một phiên hoàn tác đã hoàn tác
+
+    Args:
+        session (dict): Phiên từ list_sessions
+
+    Returns:
+        list: Mã các phiên, rỗng nếu không phải phiên hoàn tác
+    """
+    if not session["source"].startswith("revert:"):
+        return []
+    return session["source"][len("revert:"):].split(",")
+
+def later_changes(entries, sessions, ignore=()):
+    """
+    Tìm các cài đặt của các phiên đã chọn mà một phiên sau đó cũng đã thay đổi
+
+    Hoàn tác các cài đặt này sẽ ghi đè thay đổi mới hơn.
+
+    Args:
+        entries (list): Các mục từ load_entries
+        sessions (iterable): Các mã phiên cần hoàn tác
+        ignore (iterable): Các phiên không tính là thay đổi mới hơn
+            (ví dụ các phiên trong khoảng đang hoàn tác đã được hoàn tác trước đó)
+
+    Returns:
+        dict: {(namespace, key): [mã các phiên sau đã thay đổi cài đặt]}
+    """
+    sessions = set(sessions)
+    ignore = set(ignore)
+    touched = set()
+    conflicts = {}
+    for entry in entries:
+        key = (entry["namespace"], entry["key"])
+        if entry["session"] in sessions:
+            touched.add(key)
+        elif entry["session"] in ignore:
+            continue
+        elif key in touched and entry["session"] not in conflicts.setdefault(key, []):
+            conflicts[key].append(entry["session"])
+    return {key: later for key, later in conflicts.items() if later}
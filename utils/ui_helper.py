@@ -6,7 +6,6 @@ Module hỗ trợ giao diện người dùng cho ADB Toolbox
 """
 
 import os
-import subprocess
 import sys
 import time
 from rich.console import Console
@@ -17,6 +16,7 @@ from rich.text import Text
 from rich.rule import Rule
 from rich.prompt import Prompt
 from . import logger
+from . import adb_helper
 
 console = Console()
 log = logger.setup_logger()
@@ -53,7 +53,7 @@ def run_command_and_display(command, title=None):
         task = progress.add_task("[green]Đang chạy lệnh...", total=1)
         
         try:
-            result = subprocess.run(
+            result = adb_helper.run_process(
                 command,
                 shell=True,
                 capture_output=True,
@@ -125,7 +125,7 @@ def progress_operation(description, operations, on_complete=None):
             
             try:
                 if "command" in operation:
-                    result = subprocess.run(
+                    result = adb_helper.run_process(
                         operation["command"],
                         shell=True,
                         capture_output=True,